@@ -0,0 +1,194 @@
+"""
+Artefacts de démarrage à chaud : structures dérivées (partitions, fusions,
+agrégations, tables de correspondance) sérialisées sur disque et relues au
+redémarrage du processus quand leurs entrées n'ont pas changé, au lieu d'être
+recalculées par le premier utilisateur.
+Chaque artefact est indexé par une clé décrivant ses entrées : empreintes des
+instantanés des sources (df.attrs["digest"], voir sources.read_source) et
+paramètres éventuels. Il n'est relu que si le format (SCHEMA_VERSION), le code
+de l'application, la version de pandas et les identifiants des clés encodées
+(keys.py, sauvegardés dans le même dossier) sont ceux de son enregistrement ;
+sinon il est recalculé et remplacé.
+Format : pickle (en-tête puis valeur), écrit dans un fichier temporaire puis
+renommé, pour qu'un autre processus ne lise jamais un fichier incomplet.
+Ce module n'importe pas Streamlit.
+"""
+import glob
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+import threading
+
+import pandas as pd
+
+import config
+from instrumentation import timed
+from keys import get_registry
+
+logger = logging.getLogger(__name__)
+
+# À incrémenter quand le format des artefacts change
+SCHEMA_VERSION = 1
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+KEYS_FILE = "keys.pkl"
+
+_code_version = None
+
+
+def code_version():
+    """Empreinte des modules de l'application (racine et pages) : un déploiement invalide les artefacts."""
+    global _code_version
+    if _code_version is None:
+        digest = hashlib.sha256()
+        for path in sorted(glob.glob(os.path.join(APP_DIR, "*.py")) + glob.glob(os.path.join(APP_DIR, "pages", "*.py"))):
+            with open(path, "rb") as f:
+                digest.update(f.read())
+        _code_version = digest.hexdigest()
+    return _code_version
+
+
+def sources_key(digests):
+    """Clé d'artefact à partir des empreintes des sources {nom: empreinte} ; None si l'une est inconnue."""
+    if not digests or any(digest is None for digest in digests.values()):
+        return None
+    return tuple(sorted(digests.items()))
+
+
+def frame_digests(frames):
+    """Empreintes des DataFrames {nom: df} lus par sources.read_source (None si absente)."""
+    return {name: df.attrs.get("digest") for name, df in frames.items()}
+
+
+def partitions_key(name, digest):
+    """Clé de l'artefact des partitions hebdomadaires de la source `name` d'empreinte `digest`."""
+    key = sources_key({name: digest})
+    return key and (key, config.PARTITION_DATE_COLUMNS[name])
+
+
+class ArtifactStore:
+    """
+    Dossier d'artefacts `directory` : au plus `max_per_name` fichiers par nom d'artefact,
+    les moins récemment utilisés étant supprimés en premier.
+    """
+
+    def __init__(self, directory, max_per_name=4):
+        self.directory = directory
+        self.max_per_name = max_per_name
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._saved_sizes = None
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, name, key):
+        digest = hashlib.sha256(repr((SCHEMA_VERSION, code_version(), key)).encode()).hexdigest()[:24]
+        return os.path.join(self.directory, f"{name}-{digest}.pkl")
+
+    def _header(self, key):
+        registry = get_registry()
+        sizes = registry.sizes()
+        return {
+            "schema": SCHEMA_VERSION,
+            "code": code_version(),
+            "pandas": pd.__version__,
+            "key": repr(key),
+            "keys_sizes": sizes,
+            "keys_fingerprint": registry.fingerprint(sizes),
+        }
+
+    def _write(self, path, *objects):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for obj in objects:
+                    pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    # --- Clés encodées ---
+    def restore_keys(self):
+        """
+        Restaure les dictionnaires de clés sauvegardés (keys.py), à appeler avant le premier
+        chargement d'une source. Retourne False s'il n'y en a pas ou s'ils ne sont pas compatibles.
+        """
+        path = os.path.join(self.directory, KEYS_FILE)
+        if not os.path.exists(path):
+            return False
+        try:
+            with open(path, "rb") as f:
+                saved = pickle.load(f)
+            if saved.get("schema") != SCHEMA_VERSION:
+                return False
+            restored = get_registry().restore(saved["keys"])
+        except Exception as e:
+            logger.warning("Clés sauvegardées illisibles (%s) : %s", path, e)
+            return False
+        if not restored:
+            logger.warning("Clés sauvegardées incompatibles avec les clés déjà encodées : artefacts recalculés")
+        return restored
+
+    def _save_keys(self):
+        registry = get_registry()
+        sizes = registry.sizes()
+        if sizes != self._saved_sizes:
+            self._write(os.path.join(self.directory, KEYS_FILE), {"schema": SCHEMA_VERSION, "keys": registry.state()})
+            self._saved_sizes = sizes
+
+    # --- Lecture et écriture ---
+    def load(self, name, key):
+        """Valeur enregistrée pour (`name`, `key`), ou None si absente ou invalide."""
+        path = self._path(name, key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                header = pickle.load(f)
+                current = self._header(key)
+                if any(header.get(field) != current[field] for field in ("schema", "code", "pandas", "key")):
+                    return None
+                # Identifiants encodés : les clés connues à l'enregistrement doivent avoir les mêmes identifiants
+                if get_registry().fingerprint(header["keys_sizes"]) != header["keys_fingerprint"]:
+                    return None
+                value = pickle.load(f)
+        except Exception as e:
+            logger.warning("Artefact %s illisible, recalculé : %s", path, e)
+            return None
+        os.utime(path)
+        return value
+
+    def save(self, name, key, value):
+        """Enregistre `value` pour (`name`, `key`) ; une erreur d'écriture est journalisée, pas levée."""
+        try:
+            with self._lock:
+                self._save_keys()
+            self._write(self._path(name, key), self._header(key), value)
+            self._prune(name)
+        except Exception as e:
+            logger.warning("Enregistrement de l'artefact %s échoué : %s", name, e)
+
+    def _prune(self, name):
+        paths = sorted(glob.glob(os.path.join(self.directory, f"{name}-*.pkl")), key=os.path.getmtime, reverse=True)
+        for path in paths[self.max_per_name:]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def get_or_build(self, name, key, build):
+        """Valeur de (`name`, `key`) relue depuis le disque, sinon `build()` puis enregistrée."""
+        with timed(f"artefact {name}", "chargement"):
+            value = self.load(name, key)
+        if value is not None:
+            self.hits += 1
+            return value
+        self.misses += 1
+        value = build()
+        with timed(f"enregistrement artefact {name}", "autre"):
+            self.save(name, key, value)
+        return value
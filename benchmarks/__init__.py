@@ -0,0 +1,8 @@
+"""
+Benchmarks des fonctions et pipelines de données de l'application.
+
+Usage :
+    python -m benchmarks.run --scale weekend
+    python -m benchmarks.run --scale saison --xlsx /tmp/bench_xlsx
+    python -m benchmarks.synthetic --scale national --output /tmp/bench_xlsx
+"""
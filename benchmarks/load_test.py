@@ -0,0 +1,108 @@
+"""
+Test de charge des chemins d'écriture Google Sheets sur le backend local (storage.py).
+Simule plusieurs désignateurs concurrents qui chargent les désignations, désignent
+puis suppriment, et rapporte latences, erreurs de quota et appels API par action.
+Le client passe par la passerelle (gateway.py) sauf avec --sans-passerelle.
+
+Usage :
+    python -m benchmarks.load_test --designateurs 8 --iterations 20 --latence 0.05 --quota 0.02
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+
+from streamlit import logger as streamlit_logger
+
+import config
+import utils
+from benchmarks.run import prepare
+from benchmarks.synthetic import generate_dataset
+from gateway import SheetsGateway
+from storage import LocalSheetsClient
+
+
+def designateur(client, data, iterations, seed, results, lock):
+    """Boucle d'un désignateur : chargement, désignation puis suppression d'une désignation."""
+    rencontres = data["rencontres"].sample(n=iterations, replace=True, random_state=seed)
+    arbitres = data["arbitres"].sample(n=iterations, replace=True, random_state=seed + 1)
+    for (_, rencontre), (_, arbitre) in zip(rencontres.iterrows(), arbitres.iterrows()):
+        role = config.ALL_ROLES[seed % len(config.ALL_ROLES)]
+        actions = [
+            ("chargement", lambda: not utils.load_designations_from_sheets(client, config.DESIGNATIONS_URL).empty),
+            ("designation", lambda: utils.enregistrer_designation(client, config.DESIGNATIONS_URL, rencontre, arbitre, "00", role)),
+            ("suppression", lambda: utils.supprimer_designation(
+                client, config.DESIGNATIONS_URL, rencontre['RENCONTRE NUMERO'],
+                arbitre[config.COLUMN_MAPPING['arbitres_nom']], arbitre[config.COLUMN_MAPPING['arbitres_prenom']], role)),
+        ]
+        for action, run_action in actions:
+            client.start_thread_count()
+            start = time.perf_counter()
+            ok = run_action()
+            duration = time.perf_counter() - start
+            with lock:
+                results[action]["durations"].append(duration)
+                results[action]["errors"] += 0 if ok else 1
+                results[action]["calls"].update(client.thread_call_counts())
+
+
+def run(designateurs, iterations, latence, quota, scale="weekend", passerelle=True):
+    data = prepare(generate_dataset(scale))
+    path = os.path.join(tempfile.mkdtemp(), "load_test.sqlite3")
+    gateway = SheetsGateway() if passerelle else None
+    client = LocalSheetsClient(path, latency=latence, quota_error_rate=quota, seed=0)
+    if gateway:
+        client = gateway.wrap(client)
+    # Feuille des désignations pré-remplie avec les désignations synthétiques
+    designations = data["designations"]
+    client.open_by_url(config.DESIGNATIONS_URL).get_worksheet(0).update(
+        [config.DESIGNATIONS_COLUMNS] + designations[config.DESIGNATIONS_COLUMNS].astype(str).values.tolist()
+    )
+    client.call_counts.clear()
+
+    results = defaultdict(lambda: {"durations": [], "errors": 0, "calls": Counter()})
+    lock = threading.Lock()
+    threads = [
+        threading.Thread(target=designateur, args=(client, data, iterations, seed, results, lock), name=f"designateur-{seed}")
+        for seed in range(designateurs)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    total = time.perf_counter() - start
+
+    print(f"{designateurs} désignateurs x {iterations} itérations en {total:.1f} s "
+          f"(latence {latence * 1000:.0f} ms, quota {quota:.0%})")
+    for action, result in results.items():
+        durations = sorted(result["durations"])
+        p95 = durations[int(0.95 * (len(durations) - 1))]
+        calls_per_action = {method: round(count / len(durations), 2) for method, count in result["calls"].items()}
+        print(f"  {action:<12} médiane {statistics.median(durations) * 1000:8.1f} ms  p95 {p95 * 1000:8.1f} ms  "
+              f"erreurs {result['errors']:4d}  appels API/action {calls_per_action}")
+    print(f"  total appels API : {sum(client.call_counts.values())} {dict(client.call_counts)}")
+    if gateway:
+        print(f"  passerelle : {gateway.stats()}")
+    client.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge des écritures Google Sheets (backend local).")
+    parser.add_argument("--designateurs", type=int, default=4)
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--latence", type=float, default=0.0, help="Latence simulée par appel API (s)")
+    parser.add_argument("--quota", type=float, default=0.0, help="Proportion d'appels en erreur de quota")
+    parser.add_argument("--sans-passerelle", action="store_true", help="Appels directs, sans regroupement ni limitation de débit")
+    args = parser.parse_args()
+    # Les appels st.error hors session Streamlit ne produisent que des avertissements
+    streamlit_logger.set_log_level("error")
+    run(args.designateurs, args.iterations, args.latence, args.quota, passerelle=not args.sans_passerelle)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Chronomètre les fonctions critiques et les pipelines de données des pages
+sur des jeux synthétiques (voir benchmarks/synthetic.py), sans navigateur.
+Chaque exécution est ajoutée à benchmarks/results.jsonl pour suivre
+l'évolution des temps d'un commit à l'autre.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import time
+
+import pandas as pd
+
+import config
+import pipeline
+from benchmarks.synthetic import SCALES, generate_dataset, write_workbooks
+from capacity import build_capacity
+from distances import DistanceMatrix
+from keys import encode_columns
+from partitions import WeeklyPartitions
+from sources import read_options, read_source
+
+RESULTS_FILE = os.path.join(os.path.dirname(__file__), "results.jsonl")
+
+# Nombre d'arbitres évalués pour le statut d'une rencontre (liste de candidats)
+CANDIDATS_PAR_MATCH = 200
+
+
+def prepare(datasets):
+    """Reproduit le pré-traitement de app.initialize_data sur les jeux synthétiques."""
+    data = {name: df.copy() for name, df in datasets.items()}
+    for name in ["rencontres", "rencontres_ffr", "designations"]:
+        df = data[name]
+        if "NUMERO DE RENCONTRE" in df.columns:
+            df.rename(columns={"NUMERO DE RENCONTRE": "RENCONTRE NUMERO"}, inplace=True)
+    for name, df in data.items():
+        encode_columns(df, config.KEY_COLUMNS.get(name))
+    data["rencontres"]["rencontres_date_dt"] = pd.to_datetime(data["rencontres"][config.COLUMN_MAPPING['rencontres_date']], errors='coerce')
+    data["dispo"]["DATE_dt"] = pd.to_datetime(data["dispo"][config.COLUMN_MAPPING['dispo_date']], errors='coerce')
+    return data
+
+
+# --- Cas de benchmark ---
+# Chaque cas reçoit les données préparées et retourne une fonction sans argument à chronométrer.
+
+def case_statut_arbitres(data):
+    rencontre = data["rencontres"].iloc[0]
+    licences = data["arbitres"]["licence_id"].head(CANDIDATS_PAR_MATCH).tolist()
+    dispo_df = data["dispo"]
+    return lambda: [pipeline.get_arbitre_status_for_date(licence, rencontre['rencontres_date_dt'], dispo_df) for licence in licences]
+
+
+def case_statut_arbitres_semaine(data):
+    """Même statut, sur la seule partition hebdomadaire de la rencontre (page Désignation)."""
+    rencontre = data["rencontres"].iloc[0]
+    licences = data["arbitres"]["licence_id"].head(CANDIDATS_PAR_MATCH).tolist()
+    dispo_semaine = WeeklyPartitions(data["dispo"], "DATE_dt").for_date(rencontre['rencontres_date_dt'])
+    return lambda: [pipeline.get_arbitre_status_for_date(licence, rencontre['rencontres_date_dt'], dispo_semaine) for licence in licences]
+
+
+def case_liste_candidats(data):
+    """Liste complète des candidats d'une rencontre, hors cache (page Désignation, filtres stricts)."""
+    rencontre = data["rencontres"].iloc[0]
+    dispo_semaine = WeeklyPartitions(data["dispo"], "DATE_dt").for_date(rencontre['rencontres_date_dt'])
+    categories_df, competitions_df = config.load_static_categories(), config.load_static_competitions()
+    distances = DistanceMatrix.load()
+    return lambda: pipeline.build_candidates(rencontre, data["arbitres"], categories_df, competitions_df, data["clubs"], dispo_semaine, True, distances)
+
+
+def case_partitionnement_dispo(data):
+    return lambda: WeeklyPartitions(data["dispo"], "DATE_dt")
+
+
+def case_departement_clubs(data):
+    premier_weekend = data["rencontres"]["rencontres_date_dt"].dt.isocalendar().week.iloc[0]
+    equipes = data["rencontres"].loc[data["rencontres"]["rencontres_date_dt"].dt.isocalendar().week == premier_weekend, config.COLUMN_MAPPING['rencontres_locaux']].tolist()
+    club_df = data["clubs"]
+    return lambda: [pipeline.get_department_from_club_name_or_code(equipe, club_df, config.COLUMN_MAPPING) for equipe in equipes]
+
+
+def case_grille_dispo(data):
+    return lambda: pipeline.build_dispo_grid(data["arbitres"], data["dispo"])
+
+
+def case_grille_dispo_weekends(data):
+    """Grille limitée aux week-ends affichés par défaut (page Disponibilités)."""
+    partitions = WeeklyPartitions(data["dispo"], "DATE_dt")
+    dispo_df = partitions.select(partitions.weeks()[:config.WEEKENDS_AFFICHES])
+    return lambda: pipeline.build_dispo_grid(data["arbitres"], dispo_df)
+
+
+def case_highlight_grille(data):
+    display_grille, grille_style = pipeline.build_dispo_grid(data["arbitres"], data["dispo"])
+    return lambda: pipeline.highlight_designated_cells(display_grille.copy(), grille_style, config.COLUMN_MAPPING)
+
+
+def case_fusion_ffr(data):
+    return lambda: pipeline.merge_ffr_data(data["rencontres_ffr"], data["arbitres"], data["clubs"])
+
+
+def case_recap(data):
+    return lambda: pipeline.build_recap(data["rencontres"], data["designations"])
+
+
+def case_plan_de_charge(data):
+    categories_df, competitions_df = config.load_static_categories(), config.load_static_competitions()
+    return lambda: build_capacity(data["rencontres"], data["rencontres_ffr"], data["designations"], data["dispo"], data["arbitres"], categories_df, competitions_df)
+
+
+CASES = {
+    "statut_arbitres": case_statut_arbitres,
+    "statut_arbitres_semaine": case_statut_arbitres_semaine,
+    "liste_candidats": case_liste_candidats,
+    "partitionnement_dispo": case_partitionnement_dispo,
+    "departement_clubs": case_departement_clubs,
+    "grille_dispo": case_grille_dispo,
+    "grille_dispo_weekends": case_grille_dispo_weekends,
+    "highlight_grille": case_highlight_grille,
+    "fusion_ffr": case_fusion_ffr,
+    "recap": case_recap,
+    "plan_de_charge": case_plan_de_charge,
+}
+
+
+def time_call(func, repeat):
+    """Exécute `func` `repeat` fois et retourne les statistiques en secondes."""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return {"min": min(durations), "median": statistics.median(durations), "mean": statistics.fmean(durations)}
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def previous_results(scale):
+    """Dernier résultat connu par cas pour l'échelle donnée."""
+    previous = {}
+    if os.path.exists(RESULTS_FILE):
+        with open(RESULTS_FILE, encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                if record["scale"] == scale:
+                    previous[record["case"]] = record
+    return previous
+
+
+def run(scale, repeat, cases, xlsx_dir=None, seed=42, record=True):
+    datasets = generate_dataset(scale, seed)
+    timed = {name: CASES[name] for name in cases}
+    if xlsx_dir:
+        paths = write_workbooks(datasets, xlsx_dir)
+        for name, path in paths.items():
+            timed[f"lecture_xlsx_{name}"] = lambda data, name=name, path=path: (lambda: read_source(path, **read_options(name)))
+    data = prepare(datasets)
+
+    previous = previous_results(scale)
+    revision = git_revision()
+    results = []
+    for name, make_case in timed.items():
+        stats = time_call(make_case(data), repeat)
+        result = {"timestamp": pd.Timestamp.now().isoformat(timespec="seconds"), "revision": revision,
+                  "scale": scale, "case": name, "repeat": repeat, **stats}
+        results.append(result)
+        delta = ""
+        if name in previous:
+            delta = f"  ({(stats['median'] / previous[name]['median'] - 1) * 100:+.1f} % vs {previous[name]['revision']})"
+        print(f"{name:<32} médiane {stats['median'] * 1000:10.1f} ms   min {stats['min'] * 1000:10.1f} ms{delta}")
+
+    if record:
+        with open(RESULTS_FILE, "a", encoding="utf-8") as f:
+            for result in results:
+                f.write(json.dumps(result) + "\n")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks des pipelines de désignation.")
+    parser.add_argument("--scale", choices=SCALES, default="weekend")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--case", action="append", choices=CASES, help="Cas à exécuter (tous par défaut)")
+    parser.add_argument("--xlsx", metavar="DOSSIER", help="Écrit les classeurs synthétiques et chronomètre leur lecture")
+    parser.add_argument("--no-record", action="store_true", help="N'ajoute pas les résultats à l'historique")
+    args = parser.parse_args()
+    run(args.scale, args.repeat, args.case or list(CASES), args.xlsx, args.seed, record=not args.no_record)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Profil de démarrage à froid de chaque page : un processus neuf par page, sur des
+classeurs synthétiques (voir benchmarks/synthetic.py) et le backend Google Sheets
+local, rapporte la durée des imports déclenchés par la page, celle de sa première
+exécution et les imports les plus longs (voir instrumentation.profile_imports).
+La préparation (streamlit et son banc de test, déjà chargés par le serveur en
+production) est mesurée à part.
+
+Usage :
+    python -m benchmarks.startup [--page app.py] [--scale weekend] [--imports 5]
+"""
+import os
+
+# Avant tout autre import : les imports suivants sont mesurés
+os.environ.setdefault("DESIGNATION_PROFILE_STARTUP", "1")
+
+import argparse  # noqa: E402
+import json  # noqa: E402
+import subprocess  # noqa: E402
+import sys  # noqa: E402
+import tempfile  # noqa: E402
+import time  # noqa: E402
+
+import instrumentation  # noqa: E402
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def pages():
+    return ["app.py"] + sorted(page for page in os.listdir(os.path.join(APP_DIR, "pages")) if page.endswith(".py"))
+
+
+def page_path(page):
+    return os.path.join(APP_DIR, page) if page == "app.py" else os.path.join(APP_DIR, "pages", page)
+
+
+def profile_page(page):
+    """Exécute `page` une fois (processus enfant) et retourne son profil de démarrage."""
+    start = time.perf_counter()
+    from streamlit import logger as streamlit_logger
+    from streamlit.testing.v1 import AppTest
+    streamlit_logger.set_log_level("error")
+    preparation_ms = (time.perf_counter() - start) * 1000
+
+    at = AppTest.from_file(page_path(page), default_timeout=300)
+    start = time.perf_counter()
+    at.run()
+    total_ms = (time.perf_counter() - start) * 1000
+    reports = instrumentation.startup_report()
+    return {
+        "page": page,
+        "preparation_ms": round(preparation_ms, 1),
+        "total_ms": round(total_ms, 1),
+        "startup": reports[0] if reports else None,
+        "exceptions": [str(e.value) for e in at.exception],
+    }
+
+
+def run_child(page, data_dir, work_dir):
+    env = dict(
+        os.environ,
+        DESIGNATION_SOURCES_DIR=data_dir,
+        DESIGNATION_SHEETS_BACKEND="local",
+        DESIGNATION_LOCAL_SHEETS_PATH=os.path.join(work_dir, f"{page}.sqlite3"),
+        DESIGNATION_ARTIFACTS_DIR="",
+        DESIGNATION_TIMINGS_EXPORT_FILE="",
+    )
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.startup", "--enfant", page],
+        cwd=APP_DIR, env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profil de démarrage à froid des pages.")
+    parser.add_argument("--page", action="append", help="Page à profiler (toutes par défaut), ex. app.py ou 1_🏠_Home.py")
+    parser.add_argument("--scale", default="weekend", help="Taille des données synthétiques (voir benchmarks/synthetic.py)")
+    parser.add_argument("--imports", type=int, default=5, help="Nombre d'imports les plus longs affichés par page")
+    parser.add_argument("--enfant", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.enfant:
+        print(json.dumps(profile_page(args.enfant), ensure_ascii=False))
+        return
+
+    from benchmarks.synthetic import generate_dataset, write_workbooks
+    work_dir = tempfile.mkdtemp()
+    data_dir = os.path.join(work_dir, "sources")
+    write_workbooks(generate_dataset(args.scale), data_dir)
+    for page in args.page or pages():
+        profile = run_child(page, data_dir, work_dir)
+        startup = profile["startup"] or {}
+        print(f"{page:<32} préparation {profile['preparation_ms']:7.0f} ms  imports {startup.get('imports_ms') or 0:7.0f} ms  "
+              f"première exécution {startup.get('render_ms', profile['total_ms']):7.0f} ms"
+              + (f"  exceptions {profile['exceptions']}" if profile["exceptions"] else ""))
+        for entry in startup.get("imports", [])[:args.imports]:
+            print(f"    {entry['duration_ms']:7.0f} ms  {entry['module']} ({entry['by']}, {entry['modules']} modules)")
+
+
+if __name__ == "__main__":
+    main()
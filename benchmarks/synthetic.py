@@ -0,0 +1,201 @@
+"""
+Générateur de jeux de données synthétiques au format des exports RS_OVALE.
+Produit des DataFrames (et optionnellement des classeurs XLSX) pour les
+rencontres (024), disponibilités (022), arbitres (052), clubs (007),
+désignations FFR (023) et désignations manuelles, à différentes échelles.
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+import config
+
+# --- Échelles disponibles ---
+SCALES = {
+    # Un week-end de ligue
+    "weekend": {"clubs": 120, "arbitres": 400, "weekends": 1, "matchs_par_weekend": 150},
+    # Une saison de ligue
+    "saison": {"clubs": 250, "arbitres": 700, "weekends": 35, "matchs_par_weekend": 180},
+    # Échelle nationale
+    "national": {"clubs": 1800, "arbitres": 5000, "weekends": 35, "matchs_par_weekend": 900},
+}
+
+NOMS = ["MARTIN", "BERNARD", "DUBOIS", "THOMAS", "ROBERT", "RICHARD", "PETIT", "DURAND", "LEROY", "MOREAU",
+        "SIMON", "LAURENT", "LEFEBVRE", "MICHEL", "GARCIA", "DAVID", "BERTRAND", "ROUX", "VINCENT", "FOURNIER"]
+PRENOMS = ["Jean", "Pierre", "Marie", "Louis", "Paul", "Julie", "Camille", "Lucas", "Léa", "Hugo",
+           "Emma", "Antoine", "Chloé", "Nicolas", "Sarah", "Thomas", "Manon", "Maxime", "Inès", "Romain"]
+VILLES = ["RUGBY CLUB", "STADE", "US", "AS", "RC", "SC", "CA", "UNION SPORTIVE", "OLYMPIQUE", "ENTENTE"]
+DISPONIBILITES = ["OUI", "NON", "WE", "Samedi", "Dimanche"]
+DEPARTEMENTS = [f"{d:02d}" for d in range(1, 96) if d != 20]
+
+def _weekend_dates(n_weekends, start):
+    """Retourne les samedis et dimanches des `n_weekends` week-ends suivant `start`."""
+    first_saturday = start + pd.Timedelta(days=(5 - start.weekday()) % 7)
+    saturdays = pd.date_range(first_saturday, periods=n_weekends, freq="7D")
+    return saturdays, saturdays + pd.Timedelta(days=1)
+
+
+def generate_clubs(rng, n_clubs):
+    dpts = rng.choice(DEPARTEMENTS, size=n_clubs)
+    codes = [f"{i:04d}{chr(65 + i % 26)}" for i in range(1000, 1000 + n_clubs)]
+    noms = [f"{rng.choice(VILLES)} {rng.choice(NOMS)} {i}" for i in range(n_clubs)]
+    cps = [f"{dpt}{rng.integers(0, 999):03d}" for dpt in dpts]
+    return pd.DataFrame({
+        config.COLUMN_MAPPING['club_nom']: noms,
+        config.COLUMN_MAPPING['club_code']: codes,
+        config.COLUMN_MAPPING['club_dpt']: dpts,
+        config.COLUMN_MAPPING['club_cp']: cps,
+    })
+
+
+def generate_arbitres(rng, n_arbitres, clubs_df):
+    categories = config.load_static_categories()['CATEGORIE'].to_numpy()
+    # Les catégories de ligue sont les plus représentées
+    poids = np.array([1, 1, 2, 1, 2, 4, 6, 8, 12, 14, 14, 12, 10, 5, 4, 4], dtype=float)
+    club_idx = rng.integers(0, len(clubs_df), size=n_arbitres)
+    dpts = clubs_df[config.COLUMN_MAPPING['club_dpt']].to_numpy()[club_idx]
+    return pd.DataFrame({
+        config.COLUMN_MAPPING['arbitres_affiliation']: np.arange(1_000_000, 1_000_000 + n_arbitres),
+        config.COLUMN_MAPPING['arbitres_nom']: rng.choice(NOMS, size=n_arbitres),
+        config.COLUMN_MAPPING['arbitres_prenom']: rng.choice(PRENOMS, size=n_arbitres),
+        config.COLUMN_MAPPING['arbitres_categorie']: rng.choice(categories, size=n_arbitres, p=poids / poids.sum()),
+        config.COLUMN_MAPPING['arbitres_club_code']: clubs_df[config.COLUMN_MAPPING['club_code']].to_numpy()[club_idx],
+        'Club': clubs_df[config.COLUMN_MAPPING['club_nom']].to_numpy()[club_idx],
+        config.COLUMN_MAPPING['arbitres_dpt_residence']: dpts,
+        'DPT DE RESIDENCE': dpts.astype(int),
+        'Nombre  de matchs à arbitrer': rng.integers(4, 20, size=n_arbitres),
+    })
+
+
+def generate_rencontres(rng, scale, clubs_df, start):
+    saturdays, sundays = _weekend_dates(scale["weekends"], start)
+    n_matchs = scale["weekends"] * scale["matchs_par_weekend"]
+    equipes = (clubs_df[config.COLUMN_MAPPING['club_nom']] + " (" + clubs_df[config.COLUMN_MAPPING['club_code']] + ")").to_numpy()
+    weekend_idx = np.repeat(np.arange(scale["weekends"]), scale["matchs_par_weekend"])
+    jours = np.where(rng.random(n_matchs) < 0.4, saturdays[weekend_idx], sundays[weekend_idx])
+    heures = pd.to_timedelta(rng.choice([13, 15, 17, 20], size=n_matchs), unit="h")
+    locaux = rng.integers(0, len(equipes), size=n_matchs)
+    visiteurs = (locaux + rng.integers(1, len(equipes), size=n_matchs)) % len(equipes)
+    competitions = config.load_static_competitions()['NOM'].to_numpy()
+    return pd.DataFrame({
+        config.COLUMN_MAPPING['rencontres_numero']: np.arange(500_000, 500_000 + n_matchs),
+        config.COLUMN_MAPPING['rencontres_date']: pd.DatetimeIndex(jours) + heures,
+        # Colonne C : arbitre désigné dans l'export (majoritairement vide)
+        'ARBITRE': np.where(rng.random(n_matchs) < 0.3, rng.choice(NOMS, size=n_matchs), None),
+        config.COLUMN_MAPPING['rencontres_competition']: rng.choice(competitions, size=n_matchs),
+        config.COLUMN_MAPPING['rencontres_locaux']: equipes[locaux],
+        config.COLUMN_MAPPING['rencontres_visiteurs']: equipes[visiteurs],
+        'Structure Organisatrice Nom': "Ligue Synthétique",
+    })
+
+
+def generate_dispo(rng, scale, arbitres_df, start):
+    saturdays, sundays = _weekend_dates(scale["weekends"], start)
+    dates = np.sort(np.concatenate([saturdays, sundays]))
+    licences = arbitres_df[config.COLUMN_MAPPING['arbitres_affiliation']].to_numpy()
+    grid_licences = np.repeat(licences, len(dates))
+    grid_dates = np.tile(dates, len(licences))
+    # ~10 % de disponibilités non renseignées
+    renseigne = rng.random(len(grid_licences)) > 0.1
+    n = renseigne.sum()
+    return pd.DataFrame({
+        config.COLUMN_MAPPING['dispo_licence']: grid_licences[renseigne],
+        config.COLUMN_MAPPING['dispo_date']: grid_dates[renseigne],
+        config.COLUMN_MAPPING['dispo_disponibilite']: rng.choice(DISPONIBILITES, size=n, p=[0.55, 0.25, 0.1, 0.05, 0.05]),
+        config.COLUMN_MAPPING['dispo_designation']: (rng.random(n) < 0.15).astype(int),
+    })
+
+
+def _designer(rng, rencontres_df, arbitres_df, fraction):
+    """Tire des désignations (rencontre, rôle, arbitre) pour une fraction des rencontres."""
+    matchs = rencontres_df.sample(frac=fraction, random_state=int(rng.integers(0, 2**31)))
+    lignes = matchs.loc[matchs.index.repeat(len(config.ALL_ROLES))].reset_index(drop=True)
+    lignes['FONCTION ARBITRE'] = np.tile(config.ALL_ROLES, len(matchs))
+    arbitres = arbitres_df.iloc[rng.integers(0, len(arbitres_df), size=len(lignes))].reset_index(drop=True)
+    return lignes, arbitres
+
+
+def generate_ffr_designations(rng, rencontres_df, arbitres_df, clubs_df):
+    lignes, arbitres = _designer(rng, rencontres_df, arbitres_df, fraction=0.3)
+    cps = clubs_df[config.COLUMN_MAPPING['club_cp']].to_numpy()
+    return pd.DataFrame({
+        'NUMERO RENCONTRE': lignes[config.COLUMN_MAPPING['rencontres_numero']],
+        config.COLUMN_MAPPING['rencontres_date']: lignes[config.COLUMN_MAPPING['rencontres_date']],
+        config.COLUMN_MAPPING['rencontres_competition']: lignes[config.COLUMN_MAPPING['rencontres_competition']],
+        config.COLUMN_MAPPING['rencontres_locaux']: lignes[config.COLUMN_MAPPING['rencontres_locaux']],
+        config.COLUMN_MAPPING['rencontres_visiteurs']: lignes[config.COLUMN_MAPPING['rencontres_visiteurs']],
+        config.COLUMN_MAPPING['ffr_fonction_arbitre']: lignes['FONCTION ARBITRE'],
+        'Nom': arbitres[config.COLUMN_MAPPING['arbitres_nom']],
+        config.COLUMN_MAPPING['ffr_prenom']: arbitres[config.COLUMN_MAPPING['arbitres_prenom']],
+        config.COLUMN_MAPPING['ffr_dpt_residence']: arbitres['DPT DE RESIDENCE'],
+        'NUMERO LICENCE': arbitres[config.COLUMN_MAPPING['arbitres_affiliation']],
+        'TERRAIN CODE POSTAL': rng.choice(cps, size=len(lignes)),
+    })
+
+
+def generate_manual_designations(rng, rencontres_df, arbitres_df):
+    lignes, arbitres = _designer(rng, rencontres_df, arbitres_df, fraction=0.1)
+    values = [
+        lignes[config.COLUMN_MAPPING['rencontres_date']].dt.strftime("%d/%m/%Y"),
+        lignes['FONCTION ARBITRE'],
+        arbitres[config.COLUMN_MAPPING['arbitres_nom']],
+        arbitres[config.COLUMN_MAPPING['arbitres_prenom']],
+        arbitres[config.COLUMN_MAPPING['arbitres_dpt_residence']],
+        arbitres[config.COLUMN_MAPPING['arbitres_affiliation']],
+        lignes['Structure Organisatrice Nom'],
+        lignes[config.COLUMN_MAPPING['rencontres_competition']],
+        lignes[config.COLUMN_MAPPING['rencontres_numero']],
+        lignes[config.COLUMN_MAPPING['rencontres_locaux']],
+        lignes[config.COLUMN_MAPPING['rencontres_visiteurs']],
+        rng.choice(DEPARTEMENTS, size=len(lignes)),
+    ]
+    return pd.DataFrame(dict(zip(config.DESIGNATIONS_COLUMNS, values)))
+
+
+def generate_dataset(scale="weekend", seed=42, start=None):
+    """
+    Génère un jeu de données complet à l'échelle demandée.
+    Retourne un dict {nom du jeu: DataFrame} avec les clés
+    rencontres, dispo, arbitres, clubs, rencontres_ffr, designations.
+    """
+    params = SCALES[scale]
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp(start) if start is not None else pd.Timestamp.now().normalize()
+    clubs_df = generate_clubs(rng, params["clubs"])
+    arbitres_df = generate_arbitres(rng, params["arbitres"], clubs_df)
+    rencontres_df = generate_rencontres(rng, params, clubs_df, start)
+    return {
+        "rencontres": rencontres_df,
+        "dispo": generate_dispo(rng, params, arbitres_df, start),
+        "arbitres": arbitres_df,
+        "clubs": clubs_df,
+        "rencontres_ffr": generate_ffr_designations(rng, rencontres_df, arbitres_df, clubs_df),
+        "designations": generate_manual_designations(rng, rencontres_df, arbitres_df),
+    }
+
+
+def write_workbooks(datasets, output_dir):
+    """Écrit chaque jeu de données dans `output_dir/<nom>.xlsx` et retourne les chemins."""
+    os.makedirs(output_dir, exist_ok=True)
+    paths = {}
+    for name, df in datasets.items():
+        paths[name] = os.path.join(output_dir, f"{name}.xlsx")
+        df.to_excel(paths[name], index=False)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Génère des classeurs synthétiques RS_OVALE.")
+    parser.add_argument("--scale", choices=SCALES, default="weekend")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", required=True, help="Dossier de sortie des fichiers XLSX")
+    args = parser.parse_args()
+    datasets = generate_dataset(args.scale, args.seed)
+    for name, path in write_workbooks(datasets, args.output).items():
+        print(f"{name}: {len(datasets[name])} lignes -> {path}")
+
+
+if __name__ == "__main__":
+    main()
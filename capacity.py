@@ -0,0 +1,156 @@
+"""
+Plan de charge par week-end et par bande de niveaux : postes d'arbitres à
+pourvoir (rencontres x rôles) face aux arbitres disponibles et éligibles.
+La bande d'une rencontre est l'intervalle [NIVEAU MIN, NIVEAU MAX] de sa
+compétition (config.load_static_competitions) ; un arbitre est éligible si le
+niveau de sa catégorie (config.load_static_categories) est dans l'intervalle,
+comme pour les filtres stricts de la page Désignation. Les bandes se
+chevauchent : un même arbitre compte dans chaque bande qui l'accepte.
+Tous les calculs sont des agrégations groupées sur les instantanés, sans
+boucle par rencontre ni par arbitre.
+Ce module n'importe pas Streamlit.
+"""
+import pandas as pd
+
+import config
+from keys import MISSING
+
+# Mots-clés d'une disponibilité le week-end (mêmes règles que get_arbitre_status_for_date)
+AVAILABLE_PATTERN = "oui|we|samedi|dimanche"
+
+CAPACITY_COLUMNS = [
+    "semaine", "Bande", "NIVEAU MIN", "NIVEAU MAX", "Rencontres", "Postes requis", "Postes pourvus",
+    "À pourvoir", "Disponibles", "Libres", "Marge",
+]
+
+
+def _weeks(dates):
+    dates = pd.to_datetime(dates, errors="coerce")
+    return (dates - pd.to_timedelta(dates.dt.weekday, unit="D")).dt.normalize()
+
+
+def band_label(niveau_min, niveau_max):
+    return f"Niveaux {niveau_min}-{niveau_max}" if niveau_min != niveau_max else f"Niveau {niveau_min}"
+
+
+def match_bands(rencontres_df, competitions_df, categories_df):
+    """
+    Une ligne par rencontre : rencontre_id, semaine et bande de niveaux de sa compétition.
+    Une compétition absente du référentiel accepte tous les niveaux.
+    """
+    niveaux = categories_df[config.COLUMN_MAPPING['categories_niveau']]
+    competitions = competitions_df[[config.COLUMN_MAPPING['competitions_nom'], "NIVEAU MIN", "NIVEAU MAX"]]
+    rencontres = rencontres_df.drop_duplicates(subset=["rencontre_id"])
+    bands = pd.DataFrame({
+        "rencontre_id": rencontres["rencontre_id"].to_numpy(),
+        "semaine": _weeks(rencontres["rencontres_date_dt"]).to_numpy(),
+        "competition": rencontres[config.COLUMN_MAPPING['rencontres_competition']].to_numpy(),
+    }).merge(competitions, left_on="competition", right_on=config.COLUMN_MAPPING['competitions_nom'], how="left")
+    bands["NIVEAU MIN"] = bands["NIVEAU MIN"].fillna(niveaux.min())
+    bands["NIVEAU MAX"] = bands["NIVEAU MAX"].fillna(niveaux.max())
+    # Intervalles saisis à l'envers dans le référentiel
+    bornes = bands[["NIVEAU MIN", "NIVEAU MAX"]].astype(int)
+    bands["NIVEAU MIN"], bands["NIVEAU MAX"] = bornes.min(axis=1), bornes.max(axis=1)
+    return bands.dropna(subset=["semaine"])[["rencontre_id", "semaine", "NIVEAU MIN", "NIVEAU MAX"]]
+
+
+def designation_entries(rencontres_ffr_df, designations_df):
+    """Désignations FFR et manuelles : rencontre_id, licence_id, FONCTION ARBITRE et semaine."""
+    parts = []
+    date_col = config.COLUMN_MAPPING['rencontres_date']
+    if not rencontres_ffr_df.empty and {"rencontre_id", "licence_id", date_col}.issubset(rencontres_ffr_df.columns):
+        parts.append(pd.DataFrame({
+            "rencontre_id": rencontres_ffr_df["rencontre_id"].to_numpy(),
+            "licence_id": rencontres_ffr_df["licence_id"].to_numpy(),
+            "FONCTION ARBITRE": rencontres_ffr_df[config.COLUMN_MAPPING['ffr_fonction_arbitre']].to_numpy(),
+            "semaine": _weeks(rencontres_ffr_df[date_col]).to_numpy(),
+        }))
+    if not designations_df.empty and {"rencontre_id", "licence_id", "DATE"}.issubset(designations_df.columns):
+        parts.append(pd.DataFrame({
+            "rencontre_id": designations_df["rencontre_id"].to_numpy(),
+            "licence_id": designations_df["licence_id"].to_numpy(),
+            "FONCTION ARBITRE": designations_df["FONCTION ARBITRE"].to_numpy(),
+            "semaine": _weeks(pd.to_datetime(designations_df["DATE"], dayfirst=True, errors="coerce")).to_numpy(),
+        }))
+    if not parts:
+        return pd.DataFrame(columns=["rencontre_id", "licence_id", "FONCTION ARBITRE", "semaine"])
+    return pd.concat(parts, ignore_index=True)
+
+
+def available_referees(dispo_df, arbitres_df, categories_df):
+    """
+    Arbitres disponibles le samedi ou le dimanche de chaque semaine, avec le niveau de leur catégorie :
+    une ligne par (semaine, licence_id). La colonne 'occupé' signale une désignation déjà
+    reportée dans les disponibilités (colonne DESIGNATION) pour ce week-end.
+    """
+    columns = ["semaine", "licence_id", "Niveau", "occupé"]
+    if dispo_df.empty or not {"licence_id", "DATE_dt"}.issubset(dispo_df.columns):
+        return pd.DataFrame(columns=columns)
+    dispo = dispo_df[(dispo_df["licence_id"] != MISSING) & dispo_df["DATE_dt"].dt.weekday.isin([5, 6])]
+    disponible = dispo[config.COLUMN_MAPPING['dispo_disponibilite']].astype(str).str.lower().str.contains(AVAILABLE_PATTERN, regex=True)
+    if "DESIGNATION" in dispo.columns:
+        occupe = dispo["DESIGNATION"].notna() & ~dispo["DESIGNATION"].astype(str).str.strip().isin(["", "0"])
+    else:
+        occupe = pd.Series(False, index=dispo.index)
+    semaines = pd.DataFrame({
+        "semaine": _weeks(dispo["DATE_dt"]).to_numpy(),
+        "licence_id": dispo["licence_id"].to_numpy(),
+        "disponible": disponible.to_numpy(),
+        "occupé": occupe.to_numpy(),
+    }).groupby(["semaine", "licence_id"], sort=False).agg(disponible=("disponible", "any"), occupé=("occupé", "any")).reset_index()
+    semaines = semaines[semaines["disponible"]]
+    niveaux = arbitres_df[["licence_id", config.COLUMN_MAPPING['arbitres_categorie']]].merge(
+        categories_df, left_on=config.COLUMN_MAPPING['arbitres_categorie'], right_on=config.COLUMN_MAPPING['categories_nom'], how="inner",
+    )
+    niveaux = niveaux.drop_duplicates(subset=["licence_id"])[["licence_id", config.COLUMN_MAPPING['categories_niveau']]]
+    semaines = semaines.merge(niveaux.rename(columns={config.COLUMN_MAPPING['categories_niveau']: "Niveau"}), on="licence_id", how="inner")
+    return semaines[columns]
+
+
+def build_capacity(rencontres_df, rencontres_ffr_df, designations_df, dispo_df, arbitres_df, categories_df, competitions_df):
+    """
+    Une ligne par (semaine, bande) ayant des rencontres à désigner (colonnes CAPACITY_COLUMNS) :
+    - Postes requis : rencontres x rôles de config.ALL_ROLES, Postes pourvus : rôles déjà désignés
+      (FFR ou manuels), À pourvoir : la différence ;
+    - Disponibles : arbitres éligibles disponibles le week-end, Libres : ceux qui ne sont pas
+      encore désignés ce week-end ;
+    - Marge : Libres - À pourvoir (négative : pénurie).
+    """
+    if rencontres_df.empty or "rencontre_id" not in rencontres_df.columns:
+        return pd.DataFrame(columns=CAPACITY_COLUMNS)
+    bands = match_bands(rencontres_df, competitions_df, categories_df)
+    group = ["semaine", "NIVEAU MIN", "NIVEAU MAX"]
+
+    entries = designation_entries(rencontres_ffr_df, designations_df)
+    pourvus = (
+        entries[entries["FONCTION ARBITRE"].isin(config.ALL_ROLES) & (entries["rencontre_id"] != MISSING)]
+        .drop_duplicates(subset=["rencontre_id", "FONCTION ARBITRE"])
+        .groupby("rencontre_id").size().rename("pourvus")
+    )
+    bands = bands.merge(pourvus, left_on="rencontre_id", right_index=True, how="left")
+    capacity = bands.groupby(group).agg(Rencontres=("rencontre_id", "size"), pourvus=("pourvus", "sum")).reset_index()
+    capacity["Postes requis"] = capacity["Rencontres"] * len(config.ALL_ROLES)
+    capacity["Postes pourvus"] = capacity["pourvus"].astype(int)
+    capacity["À pourvoir"] = (capacity["Postes requis"] - capacity["Postes pourvus"]).clip(lower=0)
+
+    # Arbitres disponibles x bandes de la même semaine, filtrés par niveau
+    disponibles = available_referees(dispo_df, arbitres_df, categories_df)
+    designes = entries.loc[entries["licence_id"] != MISSING, ["semaine", "licence_id"]].drop_duplicates().assign(designé=True)
+    disponibles = disponibles.merge(designes, on=["semaine", "licence_id"], how="left")
+    disponibles["libre"] = ~(disponibles["occupé"].astype(bool) | disponibles["designé"].fillna(False).astype(bool))
+    eligibles = capacity[group].merge(disponibles, on="semaine", how="inner")
+    eligibles = eligibles[eligibles["Niveau"].between(eligibles["NIVEAU MIN"], eligibles["NIVEAU MAX"])]
+    offre = eligibles.groupby(group).agg(Disponibles=("licence_id", "nunique"), Libres=("libre", "sum"))
+    capacity = capacity.merge(offre, left_on=group, right_index=True, how="left")
+    capacity[["Disponibles", "Libres"]] = capacity[["Disponibles", "Libres"]].fillna(0).astype(int)
+    capacity["Marge"] = capacity["Libres"] - capacity["À pourvoir"]
+    capacity["Bande"] = [band_label(niveau_min, niveau_max) for niveau_min, niveau_max in zip(capacity["NIVEAU MIN"], capacity["NIVEAU MAX"])]
+    return capacity.sort_values(group)[CAPACITY_COLUMNS].reset_index(drop=True)
+
+
+def shortages(capacity, since=None):
+    """Lignes en pénurie (Marge < 0), à partir de la semaine `since` si précisée."""
+    short = capacity[capacity["Marge"] < 0]
+    if since is not None:
+        short = short[short["semaine"] >= since]
+    return short
@@ -0,0 +1,304 @@
+"""
+Ligne de commande, sans navigateur : validation des sources, préchauffage
+(chargement de toutes les sources et construction des index) et traitements
+par lots, avec le détail des durées mesurées (instrumentation.py).
+Destinée aux tâches planifiées, avant l'arrivée des désignateurs, et au
+profilage des traitements hors de l'application.
+Ce module n'importe pas Streamlit.
+
+    python cli.py valider
+    python cli.py prechauffer --mesures mesures.jsonl    # enregistre aussi les artefacts (artifacts.py)
+    python cli.py executer recap --sortie recap.xlsx
+    python cli.py --source dispo=/tmp/dispo.xlsx executer grille_dispo
+"""
+import argparse
+import logging
+import os
+import sys
+
+import pandas as pd
+
+import config
+import pipeline
+import sheets
+from artifacts import ArtifactStore, frame_digests, partitions_key, sources_key
+from capacity import build_capacity, shortages
+from conflicts import ConflictIndex
+from distances import DistanceMatrix
+from exports import write_sheets
+from instrumentation import begin_run, current_spans, export_metrics, summarize, timed
+from keys import MISSING
+from partitions import WeeklyPartitions, week_start
+from sources import load_source, prepare_source, read_options, read_source
+from workload import WorkloadView
+
+# Sources lues par l'application (config.SOURCES), hors désignations manuelles lues par sheets.py
+DATA_SOURCES = [name for name in config.SOURCES if name != "designations"]
+
+
+# --- Chargement ---
+
+def load_designations():
+    """Désignations manuelles : base locale (importée depuis la feuille si vide) ou feuille Google Sheets."""
+    if config.DESIGNATIONS_STORE == "sqlite":
+        return sheets.load_designations(None, store=sheets.open_designation_store(sheets.create_client))
+    return sheets.load_designations(sheets.create_client())
+
+
+def source_reader():
+    """Lecteur par l'API Google Sheets si config.SOURCE_READER == "api", sinon None (exports)."""
+    return sheets.SheetsValuesReader(sheets.create_client) if config.SOURCE_READER == "api" else None
+
+
+def load_all(names):
+    """
+    Charge les sources `names` (et "designations" pour les désignations manuelles).
+    Retourne ({nom: DataFrame}, {nom: message d'erreur}) ; une source en erreur est vide.
+    """
+    data, errors = {}, {}
+    reader = source_reader()
+    for name in names:
+        try:
+            with timed(f"chargement {name}", "chargement"):
+                data[name] = load_designations() if name == "designations" else load_source(name, reader=reader)
+        except Exception as e:
+            errors[name] = str(e)
+            data[name] = pd.DataFrame()
+    return data, errors
+
+
+# --- Traitements par lots : {nom: (sources utilisées, fonction(données) -> DataFrame)} ---
+
+def _recap(data):
+    return pipeline.build_recap(data["rencontres"], data["designations"])
+
+
+def _capacite(data):
+    return build_capacity(
+        data["rencontres"], data["rencontres_ffr"], data["designations"], data["dispo"], data["arbitres"],
+        config.load_static_categories(), config.load_static_competitions(),
+    )
+
+
+def _charge(data):
+    return WorkloadView.from_sources(data["rencontres_ffr"], data["designations"]).table(data["arbitres"])
+
+
+def _conflits(data):
+    return ConflictIndex.from_sources(data["rencontres_ffr"], data["designations"], data["dispo"]).conflicts()
+
+
+def _deplacements(data):
+    return pipeline.travel_by_weekend(data["designations"], data["rencontres_ffr"], DistanceMatrix.load())
+
+
+def _fusion_ffr(data):
+    return pipeline.merge_ffr_data(data["rencontres_ffr"], data["arbitres"], data["clubs"])
+
+
+def _grille_dispo(data):
+    grille, _ = pipeline.build_dispo_grid(data["arbitres"], data["dispo"])
+    return grille if grille is not None else pd.DataFrame()
+
+
+PIPELINES = {
+    "recap": (("rencontres", "designations"), _recap),
+    "capacite": (("rencontres", "rencontres_ffr", "designations", "dispo", "arbitres"), _capacite),
+    "charge": (("rencontres_ffr", "designations", "arbitres"), _charge),
+    "conflits": (("rencontres_ffr", "designations", "dispo"), _conflits),
+    "deplacements": (("rencontres_ffr", "designations"), _deplacements),
+    "fusion_ffr": (("rencontres_ffr", "arbitres", "clubs"), _fusion_ffr),
+    "grille_dispo": (("arbitres", "dispo"), _grille_dispo),
+}
+
+
+# --- Commandes ---
+
+def validate_source(name, reader=None):
+    """
+    Anomalies de la source `name` : colonnes attendues (config.SOURCE_COLUMNS) absentes,
+    identifiants non renseignés (config.KEY_COLUMNS) et dates illisibles.
+    Retourne (lignes, liste de messages bloquants, liste d'avertissements).
+    """
+    options = read_options(name)
+    with timed(f"lecture {name}", "chargement"):
+        # Lecture sans projection, pour voir les colonnes réellement présentes
+        if reader is not None and reader.handles(config.SOURCES[name]):
+            df = reader.read(config.SOURCES[name], dtype=options["dtype"], dates=options["dates"])
+        else:
+            df = read_source(config.SOURCES[name], dtype=options["dtype"], dates=options["dates"])
+    if df.empty:
+        return 0, ["source vide"], []
+    errors, warnings = [], []
+    expected = options["columns"] or []
+    missing = [column for column in expected if column not in df.columns]
+    if missing:
+        warnings.append(f"colonnes absentes : {', '.join(missing)}")
+    projected = df[[column for column in df.columns if column in expected]] if expected else df
+    with timed(f"pré-traitement {name}", "traitement"):
+        prepared = prepare_source(name, projected.copy())
+    for id_column, (_, column) in config.KEY_COLUMNS.get(name, {}).items():
+        if id_column not in prepared.columns:
+            errors.append(f"clé {column} absente")
+            continue
+        absent = (prepared[id_column] == MISSING).mean()
+        if absent == 1:
+            errors.append(f"{column} jamais renseigné")
+        elif absent > 0:
+            warnings.append(f"{column} non renseigné sur {absent:.1%} des lignes")
+    for column in config.SOURCE_DATE_COLUMNS.get(name, []):
+        if column in prepared.columns:
+            invalid = pd.to_datetime(prepared[column], errors="coerce").isna().mean()
+            if invalid > 0:
+                warnings.append(f"{column} illisible ou vide sur {invalid:.1%} des lignes")
+    return len(df), errors, warnings
+
+
+def command_valider(args):
+    failed = False
+    reader = source_reader()
+    for name in args.sources or DATA_SOURCES:
+        try:
+            rows, errors, warnings = validate_source(name, reader)
+        except Exception as e:
+            rows, errors, warnings = 0, [str(e)], []
+        failed = failed or bool(errors) or (args.strict and bool(warnings))
+        status = "ERREUR" if errors else ("AVERTISSEMENT" if warnings else "OK")
+        print(f"{name:<16} {rows:>8} lignes   {status}")
+        for message in errors + warnings:
+            print(f"    - {message}")
+    try:
+        with timed("chargement designations", "chargement"):
+            designations_df = load_designations()
+        missing = [column for column in config.DESIGNATIONS_COLUMNS if column not in designations_df.columns]
+        status = f"colonnes absentes : {', '.join(missing)}" if missing and not designations_df.empty else "OK"
+        print(f"{'designations':<16} {len(designations_df):>8} lignes   {status}")
+    except Exception as e:
+        failed = True
+        print(f"{'designations':<16} {0:>8} lignes   ERREUR")
+        print(f"    - {e}")
+    return 1 if failed else 0
+
+
+def command_prechauffer(args):
+    # Artefacts de démarrage à chaud relus par l'application (mêmes noms et clés que utils.warm_start)
+    store = ArtifactStore(config.ARTIFACTS_DIR, max_per_name=config.ARTIFACTS_PER_NAME) if config.ARTIFACTS_DIR else None
+    if store:
+        store.restore_keys()
+
+    def warm(name, key, build):
+        return store.get_or_build(name, key, build) if store and key else build()
+
+    data, errors = load_all(DATA_SOURCES + ["designations"])
+    digests = frame_digests(data)
+    with timed("partitions hebdomadaires", "traitement"):
+        partitions = {
+            name: warm(f"partitions_{name}", partitions_key(name, digests[name]), lambda name=name, column=column: WeeklyPartitions(data[name], column))
+            for name, column in config.PARTITION_DATE_COLUMNS.items()
+        }
+    with timed("localisation des clubs", "traitement"):
+        warm(
+            "localisation_clubs", sources_key({name: digests[name] for name in ("rencontres", "clubs")}),
+            lambda: pipeline.club_locations(data["rencontres"].get(config.COLUMN_MAPPING['rencontres_locaux'], []), data["clubs"]),
+        )
+    with timed("fusion FFR", "traitement"):
+        warm("fusion_ffr", sources_key({name: digests[name] for name in ("rencontres_ffr", "arbitres", "clubs")}), lambda: _fusion_ffr(data))
+    with timed("index des conflits", "traitement"):
+        conflicts = _conflits(data)
+    with timed("charge des arbitres", "traitement"):
+        _charge(data)
+    with timed("plan de charge", "traitement"):
+        capacity = _capacite(data)
+    with timed("récapitulatif", "traitement"):
+        _recap(data)
+    with timed("matrice des distances", "chargement"):
+        DistanceMatrix.load()
+
+    for name, df in data.items():
+        print(f"{name:<16} {len(df):>8} lignes" + (f"   ERREUR : {errors[name]}" if name in errors else ""))
+    print(f"{'semaines':<16} {len(partitions['rencontres'].weeks()):>8} (rencontres), {len(partitions['dispo'].weeks())} (disponibilités)")
+    print(f"{'conflits':<16} {len(conflicts):>8}")
+    print(f"{'pénuries':<16} {len(shortages(capacity, since=week_start(pd.Timestamp.now()))):>8} (week-ends à venir)")
+    if store:
+        print(f"{'artefacts':<16} {store.hits:>8} relus, {store.misses} enregistrés dans {config.ARTIFACTS_DIR}")
+    return 1 if errors else 0
+
+
+def command_executer(args):
+    names, build = PIPELINES[args.traitement]
+    data, errors = load_all(names)
+    for name, message in errors.items():
+        print(f"{name} : {message}", file=sys.stderr)
+    if errors:
+        return 1
+    with timed(args.traitement, "traitement"):
+        result = build(data)
+    if args.sortie:
+        fmt = "xlsx" if args.sortie.endswith(".xlsx") else "csv"
+        with timed(f"écriture {args.sortie}", "rendu"):
+            content, _ = write_sheets([(args.traitement, result)], fmt)
+            with open(args.sortie, "wb") as f:
+                f.write(content)
+        print(f"{len(result)} lignes écrites dans {args.sortie}")
+    else:
+        print(result.head(args.lignes).to_string(index=False))
+        if len(result) > args.lignes:
+            print(f"... {len(result)} lignes au total")
+    return 0
+
+
+COMMANDS = {"valider": command_valider, "prechauffer": command_prechauffer, "executer": command_executer}
+
+
+def print_timings(detail=False):
+    """Durées totales par catégorie, et le détail de chaque mesure si `detail`."""
+    spans = current_spans()
+    print()
+    print("Durées (ms) : " + ", ".join(f"{category} {total:.0f}" for category, total in summarize(spans).items()))
+    if detail:
+        for span in spans:
+            print(f"{'  ' * span['depth']}{span['label']:<40} {span['category']:<12} {span['duration_ms']:>10.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Chargement, validation et traitements par lots des données de désignation.")
+    parser.add_argument("--source", action="append", default=[], metavar="NOM=CHEMIN",
+                        help="Remplace l'URL d'une source de config.SOURCES (fichier local ou autre export)")
+    parser.add_argument("--detail", action="store_true", help="Affiche chaque mesure, pas seulement les totaux")
+    parser.add_argument("--mesures", metavar="FICHIER", default=config.TIMINGS_EXPORT_FILE,
+                        help="Ajoute le rapport des mesures au fichier JSONL (DESIGNATION_TIMINGS_FILE par défaut)")
+    subparsers = parser.add_subparsers(dest="commande", required=True)
+
+    valider = subparsers.add_parser("valider", help="Vérifie colonnes, identifiants et dates de chaque source")
+    valider.add_argument("sources", nargs="*", metavar="SOURCE", help=f"Sources à vérifier parmi {', '.join(DATA_SOURCES)} (toutes par défaut)")
+    valider.add_argument("--strict", action="store_true", help="Les avertissements font aussi échouer la commande")
+
+    subparsers.add_parser("prechauffer", help="Charge toutes les sources et construit les index et tableaux")
+
+    executer = subparsers.add_parser("executer", help="Exécute un traitement par lots")
+    executer.add_argument("traitement", choices=PIPELINES)
+    executer.add_argument("--sortie", metavar="FICHIER", help="Écrit le résultat (.xlsx ou .csv) au lieu de l'afficher")
+    executer.add_argument("--lignes", type=int, default=20, help="Lignes affichées sans --sortie")
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(name)s : %(message)s")
+    for override in args.source:
+        name, _, path = override.partition("=")
+        if name not in config.SOURCES or not path:
+            parser.error(f"--source {override} : attendu NOM=CHEMIN avec NOM parmi {', '.join(config.SOURCES)}")
+        config.SOURCES[name] = os.path.abspath(path) if os.path.exists(path) else path
+
+    unknown = [name for name in getattr(args, "sources", []) if name not in DATA_SOURCES]
+    if unknown:
+        parser.error(f"sources inconnues : {', '.join(unknown)}")
+
+    begin_run(f"CLI {args.commande}")
+    code = COMMANDS[args.commande](args)
+    print_timings(args.detail)
+    if args.mesures:
+        export_metrics(args.mesures)
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
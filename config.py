@@ -8,6 +8,7 @@ ARBITRES = RS_OVALE-052
 RENCONTRES_OVALE = RS_OVALE-023
 CLUBS = RS_OVALE-007
 """
+import os
 import pandas as pd
 
 # --- URLs des Google Sheets ---
@@ -18,9 +19,93 @@ CLUB_URL = "https://docs.google.com/spreadsheets/d/1GLWS4jOmwv-AOtkFZ5-b5JcjaSpB
 DESIGNATIONS_URL = "https://docs.google.com/spreadsheets/d/1gaPIT5477GOLNfTU0ITwbjNK1TjuO8q-yYN2YasDezg/export?format=xlsx"
 RENCONTRES_FFR_URL = "https://docs.google.com/spreadsheets/d/1ViKipszuqE5LPbTcFk2QvmYq4ZNQZVs9LbzrUVC4p4Y/export?format=xlsx"
 
+# --- Sources de données par nom ---
+SOURCES = {
+    "rencontres": RENCONTRES_URL,
+    "dispo": DISPO_URL,
+    "arbitres": ARBITRES_URL,
+    "clubs": CLUB_URL,
+    "designations": DESIGNATIONS_URL,
+    "rencontres_ffr": RENCONTRES_FFR_URL,
+}
+# Dossier de classeurs locaux <nom>.xlsx remplaçant les sources présentes (tests hors ligne, benchmarks/startup.py)
+SOURCES_DIR = os.environ.get("DESIGNATION_SOURCES_DIR", "")
+if SOURCES_DIR:
+    SOURCES.update({
+        name: os.path.join(SOURCES_DIR, f"{name}.xlsx")
+        for name in SOURCES if os.path.exists(os.path.join(SOURCES_DIR, f"{name}.xlsx"))
+    })
+
+# --- Rafraîchissement en arrière-plan : périodicité de rechargement par source (secondes) ---
+# Les désignations manuelles, écrites par l'application, sont lues à la demande et ne figurent pas ici.
+REFRESH_INTERVALS = {
+    "rencontres": 600,
+    "dispo": 300,
+    "arbitres": 3600,
+    "clubs": 86400,
+    "rencontres_ffr": 300,
+}
+
+# --- Téléchargement des exports XLSX (fetch.py) ---
+# Délais en secondes ; un export trop lent échoue au lieu de bloquer l'initialisation
+FETCH_CONNECT_TIMEOUT = float(os.environ.get("DESIGNATION_FETCH_CONNECT_TIMEOUT", "10"))
+FETCH_TIMEOUT = float(os.environ.get("DESIGNATION_FETCH_TIMEOUT", "30"))
+# Nouvelles tentatives (délai doublé à chaque fois) sur erreur réseau, 429 et 5xx
+FETCH_RETRIES = int(os.environ.get("DESIGNATION_FETCH_RETRIES", "3"))
+FETCH_BACKOFF = float(os.environ.get("DESIGNATION_FETCH_BACKOFF", "1"))
+# Attente maximale du tout premier chargement d'une source par une page (secondes)
+FIRST_LOAD_TIMEOUT = float(os.environ.get("DESIGNATION_FIRST_LOAD_TIMEOUT", "90"))
+
 # --- Fichier de clé de service ---
 SERVICE_ACCOUNT_FILE = 'designation-cle.json'
 
+# --- Backend Google Sheets ---
+# "gspread" : Google Sheets réel ; "local" : feuilles émulées dans une base SQLite (tests hors ligne, tests de charge)
+SHEETS_BACKEND = os.environ.get("DESIGNATION_SHEETS_BACKEND", "gspread")
+LOCAL_SHEETS_PATH = os.environ.get("DESIGNATION_LOCAL_SHEETS_PATH", "local_sheets.sqlite3")
+# Latence simulée par appel API (secondes) et proportion d'appels en erreur de quota (0 à 1)
+LOCAL_SHEETS_LATENCY = float(os.environ.get("DESIGNATION_LOCAL_SHEETS_LATENCY", "0"))
+LOCAL_SHEETS_QUOTA_ERROR_RATE = float(os.environ.get("DESIGNATION_LOCAL_SHEETS_QUOTA_ERROR_RATE", "0"))
+
+# --- Passerelle Google Sheets (gateway.py), partagée par toutes les sessions ---
+# Requêtes API par minute (quota par utilisateur : 60 lectures et 60 écritures), 0 : pas de limite
+SHEETS_READS_PER_MINUTE = int(os.environ.get("DESIGNATION_SHEETS_READS_PER_MINUTE", "60"))
+SHEETS_WRITES_PER_MINUTE = int(os.environ.get("DESIGNATION_SHEETS_WRITES_PER_MINUTE", "60"))
+# Requêtes envoyables immédiatement avant limitation (comprises dans le quota par minute)
+SHEETS_BURST = int(os.environ.get("DESIGNATION_SHEETS_BURST", "10"))
+# Nouvelles tentatives sur 429 (et 5xx en lecture), attente doublée à chaque fois (FETCH_BACKOFF)
+SHEETS_RETRIES = int(os.environ.get("DESIGNATION_SHEETS_RETRIES", "4"))
+# Durée de conservation des classeurs et feuilles ouverts (secondes)
+SHEETS_HANDLE_TTL = float(os.environ.get("DESIGNATION_SHEETS_HANDLE_TTL", "600"))
+
+# --- Base locale des désignations ---
+# "sheets" : la feuille DESIGNATIONS_URL est la référence ; "sqlite" : base locale publiée vers la feuille en arrière-plan
+DESIGNATIONS_STORE = os.environ.get("DESIGNATION_DESIGNATIONS_STORE", "sheets")
+DESIGNATIONS_DB_PATH = os.environ.get("DESIGNATION_DESIGNATIONS_DB_PATH", "designations.sqlite3")
+# Délai de regroupement des publications vers la feuille (secondes)
+DESIGNATIONS_EXPORT_DELAY = float(os.environ.get("DESIGNATION_DESIGNATIONS_EXPORT_DELAY", "2"))
+
+# --- Artefacts de démarrage à chaud (artifacts.py) ---
+# Dossier des structures dérivées sérialisées, relues au redémarrage si leurs sources n'ont pas changé (désactivé si vide)
+ARTIFACTS_DIR = os.environ.get("DESIGNATION_ARTIFACTS_DIR", "")
+# Artefacts conservés par structure (clés différentes : filtres, versions des sources)
+ARTIFACTS_PER_NAME = int(os.environ.get("DESIGNATION_ARTIFACTS_PER_NAME", "4"))
+
+# --- Instantanés partagés entre réplicas (snapshot_store.py) ---
+# Dossier sur un volume commun à tous les réplicas (désactivé si vide). Avec la base locale
+# des désignations (DESIGNATIONS_STORE = "sqlite"), DESIGNATIONS_DB_PATH doit aussi y être.
+SHARED_SNAPSHOTS_DIR = os.environ.get("DESIGNATION_SHARED_SNAPSHOTS_DIR", "")
+# Fichiers conservés par source (un réplica peut lire la version précédente pendant une publication)
+SHARED_SNAPSHOTS_KEEP = int(os.environ.get("DESIGNATION_SHARED_SNAPSHOTS_KEEP", "2"))
+# Périodicité de surveillance du manifeste par chaque réplica (secondes)
+SHARED_SNAPSHOTS_POLL = float(os.environ.get("DESIGNATION_SHARED_SNAPSHOTS_POLL", "2"))
+
+# --- Instrumentation ---
+# Panneau des durées dans la barre latérale (également activable avec ?debug=1 dans l'URL)
+DEBUG_TIMINGS = os.environ.get("DESIGNATION_DEBUG_TIMINGS", "0") == "1"
+# Fichier JSONL recevant les mesures de chaque exécution de page (désactivé si vide)
+TIMINGS_EXPORT_FILE = os.environ.get("DESIGNATION_TIMINGS_FILE", "")
+
 # --- Mappings de Colonnes (consolidés) ---
 COLUMN_MAPPING = {
     # Rencontres
@@ -66,6 +151,126 @@ COLUMN_MAPPING = {
     "ffr_dpt_residence": "DPT DE RESIDENCE",
 }
 
+# --- Colonnes de la feuille des désignations manuelles (ordre d'écriture) ---
+DESIGNATIONS_COLUMNS = [
+    "DATE", "FONCTION ARBITRE", "NOM", "PRENOM", "DPT DE RESIDENCE", "NUMERO LICENCE",
+    "Structure Organisatrice Nom", "COMPETITION NOM", "RENCONTRE NUMERO", "LOCAUX", "VISITEURS", "DPT TERRAIN",
+]
+
+# --- Projection à la lecture des exports ---
+# Colonnes conservées par source (les autres ne sont pas lues) ; une source absente est lue entièrement.
+SOURCE_COLUMNS = {
+    "rencontres": [
+        COLUMN_MAPPING["rencontres_numero"], COLUMN_MAPPING["rencontres_date"], COLUMN_MAPPING["rencontres_competition"],
+        COLUMN_MAPPING["rencontres_locaux"], COLUMN_MAPPING["rencontres_visiteurs"], "Structure Organisatrice Nom",
+    ],
+    "dispo": [
+        COLUMN_MAPPING["dispo_licence"], COLUMN_MAPPING["dispo_date"],
+        COLUMN_MAPPING["dispo_disponibilite"], COLUMN_MAPPING["dispo_designation"],
+    ],
+    "arbitres": [
+        COLUMN_MAPPING["arbitres_affiliation"], COLUMN_MAPPING["arbitres_nom"], COLUMN_MAPPING["arbitres_prenom"],
+        COLUMN_MAPPING["arbitres_categorie"], COLUMN_MAPPING["arbitres_club_code"], "Club",
+        COLUMN_MAPPING["arbitres_dpt_residence"], "DPT DE RESIDENCE", "Nombre  de matchs à arbitrer",
+    ],
+    "clubs": [COLUMN_MAPPING["club_nom"], COLUMN_MAPPING["club_code"], COLUMN_MAPPING["club_dpt"], COLUMN_MAPPING["club_cp"]],
+    "rencontres_ffr": [
+        "NUMERO RENCONTRE", COLUMN_MAPPING["rencontres_date"], COLUMN_MAPPING["rencontres_competition"],
+        COLUMN_MAPPING["rencontres_locaux"], COLUMN_MAPPING["rencontres_visiteurs"], COLUMN_MAPPING["ffr_fonction_arbitre"],
+        "Nom", COLUMN_MAPPING["ffr_prenom"], COLUMN_MAPPING["ffr_dpt_residence"], "NUMERO LICENCE", "TERRAIN CODE POSTAL",
+    ],
+}
+# Premières colonnes conservées quel que soit leur en-tête (lues par position) : la colonne C des
+# rencontres (arbitre désigné) est comptée par position par la tuile « Rencontres » de l'accueil
+SOURCE_LEADING_COLUMNS = {"rencontres": 3}
+# Types imposés à la lecture (identifiants lus comme texte, sans passage par float)
+SOURCE_DTYPES = {
+    "rencontres": {COLUMN_MAPPING["rencontres_numero"]: str},
+    "clubs": {COLUMN_MAPPING["club_code"]: str},
+    "rencontres_ffr": {"NUMERO RENCONTRE": str},
+}
+# Colonnes de dates (typées par le classeur XLSX, converties à la lecture d'un export CSV)
+SOURCE_DATE_COLUMNS = {
+    "rencontres": [COLUMN_MAPPING["rencontres_date"]],
+    "dispo": [COLUMN_MAPPING["dispo_date"]],
+    "rencontres_ffr": [COLUMN_MAPPING["rencontres_date"]],
+}
+# --- Clés de jointure encodées (keys.py) ---
+# Colonnes d'identifiants entiers ajoutées à chaque instantané : {colonne id: (type de clé, colonne source)}
+# Les pages joignent et filtrent sur ces colonnes plutôt que de comparer des textes.
+KEY_COLUMNS = {
+    "rencontres": {
+        "rencontre_id": ("rencontre", COLUMN_MAPPING["rencontres_numero"]),
+        "locaux_id": ("equipe", COLUMN_MAPPING["rencontres_locaux"]),
+        "visiteurs_id": ("equipe", COLUMN_MAPPING["rencontres_visiteurs"]),
+    },
+    "dispo": {"licence_id": ("licence", COLUMN_MAPPING["dispo_licence"])},
+    "arbitres": {
+        "licence_id": ("licence", COLUMN_MAPPING["arbitres_affiliation"]),
+        "club_id": ("club", COLUMN_MAPPING["arbitres_club_code"]),
+    },
+    "clubs": {"club_id": ("club", COLUMN_MAPPING["club_code"])},
+    "rencontres_ffr": {
+        "rencontre_id": ("rencontre", "NUMERO RENCONTRE"),
+        "licence_id": ("licence", "NUMERO LICENCE"),
+        "locaux_id": ("equipe", COLUMN_MAPPING["rencontres_locaux"]),
+    },
+    "designations": {
+        "rencontre_id": ("rencontre", "RENCONTRE NUMERO"),
+        "licence_id": ("licence", "NUMERO LICENCE"),
+    },
+}
+# --- Validation des classeurs téléversés (validation.py, page Mise à jour des données) ---
+# Colonnes dont l'absence bloque la publication : clés de jointure et colonnes de dates
+# (les autres colonnes lues par l'application sont facultatives)
+REQUIRED_COLUMNS = {
+    "rencontres": [COLUMN_MAPPING["rencontres_numero"], COLUMN_MAPPING["rencontres_date"]],
+    "dispo": [COLUMN_MAPPING["dispo_licence"], COLUMN_MAPPING["dispo_date"]],
+    "arbitres": [COLUMN_MAPPING["arbitres_affiliation"], COLUMN_MAPPING["arbitres_club_code"]],
+    "clubs": [COLUMN_MAPPING["club_code"]],
+    "rencontres_ffr": ["NUMERO RENCONTRE", "NUMERO LICENCE", COLUMN_MAPPING["rencontres_date"]],
+    "designations": ["RENCONTRE NUMERO", "NUMERO LICENCE", "DATE"],
+}
+# Colonnes identifiant une ligne : les doublons bloquent la publication
+UNIQUE_COLUMNS = {
+    "rencontres": [COLUMN_MAPPING["rencontres_numero"]],
+    "dispo": [COLUMN_MAPPING["dispo_licence"], COLUMN_MAPPING["dispo_date"]],
+    "arbitres": [COLUMN_MAPPING["arbitres_affiliation"]],
+    "clubs": [COLUMN_MAPPING["club_code"]],
+    # Une rencontre peut compter plusieurs lignes de même fonction (4e/5e arbitre) : la licence les distingue
+    "rencontres_ffr": ["NUMERO RENCONTRE", COLUMN_MAPPING["ffr_fonction_arbitre"], "NUMERO LICENCE"],
+}
+# Colonnes dont les valeurs doivent figurer dans un référentiel statique :
+# {source: {colonne: (référentiel "competitions" ou "categories", valeur inconnue bloquante)}}
+REFERENCE_COLUMNS = {
+    "rencontres": {COLUMN_MAPPING["rencontres_competition"]: ("competitions", True)},
+    "rencontres_ffr": {COLUMN_MAPPING["rencontres_competition"]: ("competitions", True)},
+    "designations": {"COMPETITION NOM": ("competitions", True)},
+    # Un arbitre de catégorie inconnue n'a pas de niveau : il n'est jamais proposé, sans autre conséquence
+    "arbitres": {COLUMN_MAPPING["arbitres_categorie"]: ("categories", False)},
+}
+# Types de clés (keys.py) dont une valeur vide est tolérée (avertissement seulement)
+OPTIONAL_KEY_KINDS = {"equipe"}
+# Numéros de ligne cités par anomalie dans le rapport
+VALIDATION_MAX_ROWS = 20
+
+# --- Partitionnement hebdomadaire (partitions.py) ---
+# Colonne de dates (ajoutée par sources.prepare_source) servant à ranger chaque source par semaine
+PARTITION_DATE_COLUMNS = {
+    "rencontres": "rencontres_date_dt",
+    "dispo": "DATE_dt",
+}
+# Nombre de week-ends (courant inclus) affichés par défaut dans la grille des disponibilités
+WEEKENDS_AFFICHES = 2
+# Si > 0, les pages de travail ne chargent que le week-end courant et les suivants (N week-ends au total)
+STARTUP_WEEKENDS = int(os.environ.get("DESIGNATION_STARTUP_WEEKENDS", "0"))
+
+# Format de téléchargement des exports Google Sheets : "xlsx" ou "csv" (plus rapide à lire, première feuille seulement)
+EXPORT_FORMAT = os.environ.get("DESIGNATION_EXPORT_FORMAT", "xlsx")
+# Lecture des sources : "export" (téléchargement de l'export) ou "api" (valeurs lues par l'API Google Sheets
+# avec le compte de service, colonnes de SOURCE_COLUMNS seulement ; l'export reste lu en cas d'échec)
+SOURCE_READER = os.environ.get("DESIGNATION_SOURCE_READER", "export")
+
 # --- Configuration pour la page de Désignation ---
 ROLE_ICONS = {
     "Arbitre de champ": "🧑‍⚖️",
@@ -76,7 +281,28 @@ ROLE_ICONS = {
     "default": "❓"
 }
 ALL_ROLES = ["Arbitre de champ", "Arbitre Assistant 1", "Arbitre Assistant 2"]
+# Listes de candidats précalculées en arrière-plan pour les rencontres suivantes de la liste (prefetch.py)
+CANDIDATE_PREFETCH_COUNT = int(os.environ.get("DESIGNATION_CANDIDATE_PREFETCH_COUNT", "3"))
+CANDIDATE_CACHE_SIZE = int(os.environ.get("DESIGNATION_CANDIDATE_CACHE_SIZE", "32"))
 
+# --- Liste des rencontres (pagination côté serveur) ---
+# Seule la page affichée est envoyée à la grille
+MATCH_LIST_PAGE_SIZES = [25, 50, 100, 250]
+MATCH_LIST_COLUMNS = {
+    COLUMN_MAPPING["rencontres_date"]: "Date",
+    COLUMN_MAPPING["rencontres_competition"]: "Compétition",
+    COLUMN_MAPPING["rencontres_locaux"]: "Locaux",
+    COLUMN_MAPPING["rencontres_visiteurs"]: "Visiteurs",
+}
+
+# --- Exports en masse (exports.py) ---
+# Générations simultanées et nombre de fichiers conservés en mémoire
+BULK_EXPORT_WORKERS = int(os.environ.get("DESIGNATION_BULK_EXPORT_WORKERS", "2"))
+BULK_EXPORT_ARTIFACTS = int(os.environ.get("DESIGNATION_BULK_EXPORT_ARTIFACTS", "16"))
+BULK_EXPORT_KINDS = {
+    "competitions": "Feuilles par compétition",
+    "convocations": "Convocations par arbitre",
+}
 
 # --- Liste des compétitions à filtrer par défaut ---
 COMPETITIONS_FILTRE_DEFAUT = [
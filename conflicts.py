@@ -0,0 +1,212 @@
+"""
+Détection des doubles désignations d'un même arbitre le même jour.
+Trois sources sont rassemblées en une table d'affectations (licence, date) :
+    - les désignations FFR (RS_OVALE-023, rencontres_ffr),
+    - les désignations manuelles (feuille ou base locale),
+    - la colonne DESIGNATION des disponibilités (arbitre déjà désigné ce jour-là).
+Il y a conflit pour un couple (licence, date) si l'arbitre y est affecté à
+au moins deux rencontres différentes, ou s'il a une désignation manuelle alors
+que les disponibilités le signalent déjà désigné sans désignation FFR ce jour-là.
+Ce module n'importe pas Streamlit.
+"""
+import threading
+
+import pandas as pd
+
+import config
+
+# Colonnes de la table des affectations
+ENTRY_COLUMNS = ["LICENCE", "DATE", "SOURCE", "RENCONTRE", "FONCTION", "NOM", "PRENOM"]
+
+SOURCE_FFR = "FFR"
+SOURCE_MANUELLE = "Manuelle"
+SOURCE_DISPO = "Disponibilités"
+
+
+def normalize_licence(values):
+    """Numéros de licence en texte sans décimales (12345, 12345.0 et "12345" sont identiques)."""
+    values = pd.Series(values)
+    numeric = pd.to_numeric(values, errors='coerce')
+    as_int = numeric.round().astype('Int64').astype(str)
+    return as_int.where(numeric.notna(), values.astype(str).str.strip()).reset_index(drop=True)
+
+
+def _dates(values, dayfirst=False):
+    return pd.to_datetime(pd.Series(values), dayfirst=dayfirst, errors='coerce').dt.normalize().reset_index(drop=True)
+
+
+def _column(df, column):
+    return df[column].reset_index(drop=True) if column in df.columns else pd.Series([None] * len(df), dtype=object)
+
+
+def _entries(source, licences, dates, rencontres, fonctions, noms, prenoms):
+    entries = pd.DataFrame({
+        "LICENCE": normalize_licence(licences),
+        "DATE": dates,
+        "SOURCE": source,
+        "RENCONTRE": rencontres.astype(str).where(rencontres.notna(), None),
+        "FONCTION": fonctions,
+        "NOM": noms,
+        "PRENOM": prenoms,
+    })
+    return entries[entries["DATE"].notna() & entries["LICENCE"].ne("") & entries["LICENCE"].ne("nan")]
+
+
+def build_entries(rencontres_ffr_df, designations_df, dispo_df):
+    """Table des affectations des trois sources (colonnes ENTRY_COLUMNS)."""
+    parts = []
+    if not rencontres_ffr_df.empty and "NUMERO LICENCE" in rencontres_ffr_df.columns:
+        numero = "NUMERO RENCONTRE" if "NUMERO RENCONTRE" in rencontres_ffr_df.columns else "RENCONTRE NUMERO"
+        parts.append(_entries(
+            SOURCE_FFR,
+            rencontres_ffr_df["NUMERO LICENCE"],
+            _dates(_column(rencontres_ffr_df, config.COLUMN_MAPPING['rencontres_date'])),
+            _column(rencontres_ffr_df, numero),
+            _column(rencontres_ffr_df, config.COLUMN_MAPPING['ffr_fonction_arbitre']),
+            _column(rencontres_ffr_df, "Nom" if "Nom" in rencontres_ffr_df.columns else "NOM"),
+            _column(rencontres_ffr_df, config.COLUMN_MAPPING['ffr_prenom']),
+        ))
+    if not designations_df.empty and "NUMERO LICENCE" in designations_df.columns:
+        parts.append(_entries(
+            SOURCE_MANUELLE,
+            designations_df["NUMERO LICENCE"],
+            _dates(_column(designations_df, "DATE"), dayfirst=True),
+            _column(designations_df, "RENCONTRE NUMERO"),
+            _column(designations_df, "FONCTION ARBITRE"),
+            _column(designations_df, "NOM"),
+            _column(designations_df, "PRENOM"),
+        ))
+    designation_col = config.COLUMN_MAPPING['dispo_designation']
+    if not dispo_df.empty and designation_col in dispo_df.columns:
+        # Même règle que get_arbitre_status_for_date : toute valeur autre que vide ou 0
+        flag = dispo_df[designation_col].astype(str).str.strip()
+        designes = dispo_df[dispo_df[designation_col].notna() & ~flag.isin(["", "0", "nan"])]
+        dates = designes["DATE_dt"] if "DATE_dt" in designes.columns else designes[config.COLUMN_MAPPING['dispo_date']]
+        parts.append(_entries(
+            SOURCE_DISPO,
+            designes[config.COLUMN_MAPPING['dispo_licence']],
+            _dates(dates),
+            pd.Series([None] * len(designes), dtype=object),
+            _column(designes, designation_col).astype(str),
+            pd.Series([None] * len(designes), dtype=object),
+            pd.Series([None] * len(designes), dtype=object),
+        ))
+    if not parts:
+        return pd.DataFrame(columns=ENTRY_COLUMNS)
+    return pd.concat(parts, ignore_index=True)[ENTRY_COLUMNS]
+
+
+def summarize_entries(entries):
+    """
+    Couples (licence, date) en conflit, avec le motif, les rencontres et les sources concernées.
+    Le motif est calculé de façon vectorisée pour tous les couples ; les libellés
+    (rencontres, sources) ne sont construits que pour les couples en conflit.
+    """
+    keys = ["LICENCE", "DATE"]
+    columns = ["NOM", "PRENOM", "RENCONTRES", "SOURCES", "MOTIF"]
+    if entries.empty:
+        return pd.DataFrame(columns=keys + columns).set_index(keys)
+    grouped = entries.groupby(keys, sort=False)
+    nb_rencontres = grouped["RENCONTRE"].nunique()
+    has_source = grouped["SOURCE"].value_counts().unstack(fill_value=0).gt(0)
+    has_source = has_source.reindex(index=nb_rencontres.index, columns=[SOURCE_FFR, SOURCE_MANUELLE, SOURCE_DISPO], fill_value=False)
+    motif = pd.Series("", index=nb_rencontres.index)
+    motif[has_source[SOURCE_MANUELLE] & has_source[SOURCE_DISPO] & ~has_source[SOURCE_FFR]] = (
+        "Désignation manuelle alors que l'arbitre est déjà désigné (disponibilités)"
+    )
+    motif[nb_rencontres >= 2] = "Plusieurs rencontres le même jour"
+    motif = motif[motif != ""]
+    if motif.empty:
+        return pd.DataFrame(columns=keys + columns).set_index(keys)
+    in_conflict = entries.set_index(keys).loc[motif.index]
+    details = in_conflict.groupby(level=keys, sort=False)
+    return pd.DataFrame({
+        "NOM": details["NOM"].first(),
+        "PRENOM": details["PRENOM"].first(),
+        "RENCONTRES": details["RENCONTRE"].agg(lambda values: ", ".join(sorted(set(values.dropna())))),
+        "SOURCES": details["SOURCE"].agg(lambda values: ", ".join(sorted(set(values)))),
+        "MOTIF": motif,
+    })
+
+
+class ConflictIndex:
+    """
+    Index des affectations par (licence, date) et des conflits correspondants (`conflicts`).
+    Les ajouts et suppressions de désignations manuelles ne recalculent que le couple concerné.
+    """
+
+    def __init__(self, entries):
+        self._lock = threading.Lock()
+        self._entries = entries.reset_index(drop=True)
+        self._summary = summarize_entries(self._entries)
+
+    @classmethod
+    def from_sources(cls, rencontres_ffr_df, designations_df, dispo_df):
+        return cls(build_entries(rencontres_ffr_df, designations_df, dispo_df))
+
+    # --- Lecture ---
+    def conflicts(self):
+        """Couples (licence, date) en conflit, triés par date."""
+        return self._summary.reset_index().sort_values(["DATE", "NOM", "PRENOM"], na_position="last").reset_index(drop=True)
+
+    def entries_for(self, licence, date):
+        key = (normalize_licence([licence])[0], pd.Timestamp(date).normalize())
+        mask = (self._entries["LICENCE"] == key[0]) & (self._entries["DATE"] == key[1])
+        return self._entries[mask]
+
+    def check_candidates(self, licences, date, rencontre=None):
+        """
+        Contrôle groupé avant désignation : pour chaque licence, rencontres déjà affectées
+        le jour `date` (hors `rencontre`) et drapeau « déjà désigné » des disponibilités.
+        Retourne un dict {licence normalisée: message}, limité aux licences concernées.
+        """
+        if self._entries.empty or pd.isna(date):
+            return {}
+        day = self._entries[self._entries["DATE"] == pd.Timestamp(date).normalize()]
+        day = day[day["LICENCE"].isin(set(normalize_licence(list(licences))))]
+        if rencontre is not None:
+            day = day[day["RENCONTRE"].ne(str(rencontre))]
+        messages = {}
+        for licence, rows in day.groupby("LICENCE"):
+            rencontres = sorted(set(rows["RENCONTRE"].dropna()))
+            if rencontres:
+                messages[licence] = f"Déjà désigné(e) ce jour ({', '.join(rows['SOURCE'].unique())}) : rencontre {', '.join(rencontres)}"
+            else:
+                messages[licence] = "Déjà désigné(e) ce jour (disponibilités)"
+        return messages
+
+    # --- Mise à jour incrémentale ---
+    def _refresh_key(self, licence, date):
+        key = (licence, date)
+        subset = self._entries[(self._entries["LICENCE"] == licence) & (self._entries["DATE"] == date)]
+        summary = self._summary.drop(index=key, errors="ignore")
+        if not subset.empty:
+            summary = pd.concat([summary, summarize_entries(subset)])
+        self._summary = summary
+
+    def add_manual(self, record):
+        """Ajoute une désignation manuelle (dict aux colonnes de la feuille)."""
+        entry = build_entries(pd.DataFrame(), pd.DataFrame([record]), pd.DataFrame())
+        if entry.empty:
+            return
+        with self._lock:
+            self._entries = pd.concat([self._entries, entry], ignore_index=True)
+            self._refresh_key(entry["LICENCE"].iloc[0], entry["DATE"].iloc[0])
+
+    def remove_manual(self, rencontre_numero, nom, prenom, fonction):
+        """Retire la première désignation manuelle correspondante."""
+        with self._lock:
+            self._remove_manual(rencontre_numero, nom, prenom, fonction)
+
+    def _remove_manual(self, rencontre_numero, nom, prenom, fonction):
+        entries = self._entries
+        mask = (
+            (entries["SOURCE"] == SOURCE_MANUELLE) & (entries["RENCONTRE"] == str(rencontre_numero))
+            & (entries["NOM"] == nom) & (entries["PRENOM"] == prenom) & (entries["FONCTION"] == fonction)
+        )
+        if not mask.any():
+            return
+        index = mask.idxmax()
+        licence, date = entries.at[index, "LICENCE"], entries.at[index, "DATE"]
+        self._entries = entries.drop(index=index).reset_index(drop=True)
+        self._refresh_key(licence, date)
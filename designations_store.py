@@ -0,0 +1,208 @@
+"""
+Base SQLite locale des désignations manuelles (système de référence).
+Les écritures sont transactionnelles et les lectures indexées par rencontre,
+licence et date ; la feuille DESIGNATIONS_URL n'est plus qu'une cible de
+publication, alimentée en arrière-plan par SheetMirror.
+Ce module n'importe pas Streamlit.
+"""
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+
+import config
+
+logger = logging.getLogger(__name__)
+
+
+def _quote(column):
+    return '"' + column.replace('"', '""') + '"'
+
+
+def _date_iso(value):
+    """Date de la feuille (jj/mm/aaaa) au format ISO pour l'index, ou None."""
+    date = pd.to_datetime(value, dayfirst=True, errors='coerce')
+    return None if pd.isna(date) else date.strftime("%Y-%m-%d")
+
+
+class DesignationStore:
+    """Désignations manuelles stockées dans SQLite, colonnes identiques à la feuille."""
+
+    def __init__(self, path, columns=None):
+        self.path = path
+        self.columns = list(columns or config.DESIGNATIONS_COLUMNS)
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        columns_sql = ", ".join(f"{_quote(col)} TEXT" for col in self.columns)
+        self._connection.executescript(f"""
+            CREATE TABLE IF NOT EXISTS designations (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                date_iso TEXT,
+                {columns_sql}
+            );
+            CREATE INDEX IF NOT EXISTS idx_designations_match ON designations ({_quote('RENCONTRE NUMERO')});
+            CREATE INDEX IF NOT EXISTS idx_designations_licence ON designations ({_quote('NUMERO LICENCE')});
+            CREATE INDEX IF NOT EXISTS idx_designations_date ON designations (date_iso);
+        """)
+
+    # --- Notifications ---
+    def subscribe(self, callback):
+        """Enregistre `callback(event, record)` appelé après chaque écriture validée."""
+        self._listeners.append(callback)
+
+    def _notify(self, event, record):
+        for callback in self._listeners:
+            try:
+                callback(event, record)
+            except Exception:
+                logger.exception("Erreur dans un abonné de la base des désignations")
+
+    # --- Écritures ---
+    def add(self, record):
+        """Ajoute une désignation (dict colonne -> valeur) et retourne son identifiant."""
+        values = [None if pd.isna(record.get(col)) else str(record.get(col)) for col in self.columns]
+        placeholders = ", ".join("?" for _ in range(len(self.columns) + 1))
+        with self._lock:
+            cursor = self._connection.execute(
+                f"INSERT INTO designations (date_iso, {', '.join(_quote(col) for col in self.columns)}) VALUES ({placeholders})",
+                [_date_iso(record.get('DATE'))] + values,
+            )
+            record_id = cursor.lastrowid
+        self._notify("add", dict(zip(self.columns, values), id=record_id))
+        return record_id
+
+    def delete_matching(self, rencontre_numero, nom, prenom, fonction):
+        """Supprime la plus ancienne désignation correspondante. Retourne True si une ligne a été supprimée."""
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                found = self._connection.execute(
+                    f"SELECT id, {', '.join(_quote(col) for col in self.columns)} FROM designations "
+                    f"WHERE {_quote('RENCONTRE NUMERO')} = ? AND {_quote('NOM')} = ? AND {_quote('PRENOM')} = ? "
+                    f"AND {_quote('FONCTION ARBITRE')} = ? ORDER BY id LIMIT 1",
+                    (str(rencontre_numero), str(nom), str(prenom), str(fonction)),
+                ).fetchone()
+                if found:
+                    self._connection.execute("DELETE FROM designations WHERE id = ?", (found[0],))
+                self._connection.execute("COMMIT")
+            except Exception:
+                self._connection.execute("ROLLBACK")
+                raise
+        if found:
+            self._notify("delete", dict(zip(self.columns, found[1:]), id=found[0]))
+        return found is not None
+
+    def replace_all(self, df):
+        """Remplace toutes les désignations par celles du DataFrame (import depuis la feuille)."""
+        rows = [
+            [_date_iso(row.get('DATE'))] + [None if pd.isna(row.get(col)) else str(row.get(col)) for col in self.columns]
+            for row in df.to_dict('records')
+        ]
+        placeholders = ", ".join("?" for _ in range(len(self.columns) + 1))
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                self._connection.execute("DELETE FROM designations")
+                self._connection.executemany(
+                    f"INSERT INTO designations (date_iso, {', '.join(_quote(col) for col in self.columns)}) VALUES ({placeholders})",
+                    rows,
+                )
+                self._connection.execute("COMMIT")
+            except Exception:
+                self._connection.execute("ROLLBACK")
+                raise
+        self._notify("replace", None)
+
+    # --- Lectures ---
+    def _query(self, where="", params=()):
+        with self._lock:
+            return pd.read_sql_query(
+                f"SELECT id, {', '.join(_quote(col) for col in self.columns)} FROM designations {where} ORDER BY id",
+                self._connection,
+                params=params,
+            )
+
+    def to_dataframe(self):
+        """Toutes les désignations, dans l'ordre d'enregistrement, avec les colonnes de la feuille."""
+        return self._query().drop(columns=['id'])
+
+    def by_match(self, rencontre_numero):
+        return self._query(f"WHERE {_quote('RENCONTRE NUMERO')} = ?", (str(rencontre_numero),))
+
+    def by_licence(self, licence):
+        return self._query(f"WHERE {_quote('NUMERO LICENCE')} = ?", (str(licence),))
+
+    def by_date(self, date):
+        return self._query("WHERE date_iso = ?", (pd.Timestamp(date).strftime("%Y-%m-%d"),))
+
+    def count(self):
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM designations").fetchone()[0]
+
+    def close(self):
+        self._connection.close()
+
+
+class SheetMirror:
+    """
+    Publie la base des désignations vers la feuille Google Sheets en arrière-plan.
+    Les demandes rapprochées sont regroupées (délai `delay`) et chaque publication
+    réécrit la feuille entière en un seul appel `update`, sans effacement préalable :
+    une écriture en échec laisse la publication précédente en place.
+    """
+
+    def __init__(self, store, client_factory, sheet_url, delay=2.0, retry_delay=30.0):
+        self.store = store
+        self.client_factory = client_factory
+        self.sheet_url = sheet_url
+        self.delay = delay
+        self.retry_delay = retry_delay
+        self.last_export_at = None
+        self.last_error = None
+        # Lignes écrites (en-tête compris) par la dernière publication, relues dans la feuille au départ
+        self._published_rows = None
+        self._pending = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="designations-mirror", daemon=True)
+        self._thread.start()
+        store.subscribe(lambda event, record: self.request_export())
+
+    @property
+    def pending(self):
+        return self._pending.is_set()
+
+    def request_export(self):
+        self._pending.set()
+
+    def export_now(self):
+        """Réécrit la feuille avec le contenu de la base (appelé par le thread de publication)."""
+        client = self.client_factory()
+        if client is None:
+            raise RuntimeError("Aucun client Google Sheets disponible pour la publication")
+        df = self.store.to_dataframe()
+        worksheet = client.open_by_url(self.sheet_url).get_worksheet(0)
+        values = [self.store.columns] + df.astype(object).where(pd.notna(df), "").values.tolist()
+        previous = self._published_rows if self._published_rows is not None else len(worksheet.get_all_values())
+        # Lignes de la publication précédente au-delà des nouvelles : vidées par la même écriture
+        blank_rows = [[""] * len(self.store.columns)] * max(previous - len(values), 0)
+        self._published_rows = None
+        worksheet.update(values + blank_rows)
+        self._published_rows = len(values)
+        self.last_export_at = datetime.now()
+        self.last_error = None
+
+    def _run(self):
+        while True:
+            self._pending.wait()
+            time.sleep(self.delay)
+            self._pending.clear()
+            try:
+                self.export_now()
+            except Exception as e:
+                self.last_error = str(e)
+                logger.warning("Publication des désignations vers %s échouée : %s", self.sheet_url, e)
+                time.sleep(self.retry_delay)
+                self._pending.set()
@@ -0,0 +1,119 @@
+"""
+Distances de déplacement entre départements, sans réseau.
+La matrice est construite hors ligne à partir de data/departements.csv
+(coordonnées du chef-lieu de chaque département) et enregistrée dans
+data/distances.npz : codes des départements et distances à vol d'oiseau
+en km (uint16). Chaque recherche est un accès direct au tableau.
+Un code postal est ramené à son département.
+Reconstruction : python distances.py
+Ce module n'importe pas Streamlit.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+CENTROIDS_FILE = os.path.join(DATA_DIR, "departements.csv")
+MATRIX_FILE = os.path.join(DATA_DIR, "distances.npz")
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def normalize_departement(value):
+    """Code département normalisé ("01", "2A", "974") depuis 1, "1", 1.0, "2a"... ; None si invalide."""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    text = str(value).strip().upper()
+    if text.endswith(".0"):
+        text = text[:-2]
+    if text in ("2A", "2B"):
+        return text
+    if not text.isdigit():
+        return None
+    return text.zfill(2) if len(text) <= 2 else text
+
+
+def departement_from_cp(cp):
+    """Département d'un code postal ("75011" -> "75", "20090" -> "2A", "97411" -> "974") ; None si invalide."""
+    if cp is None or (not isinstance(cp, str) and pd.isna(cp)):
+        return None
+    text = str(cp).strip()
+    if text.endswith(".0"):
+        text = text[:-2]
+    if not text.isdigit() or len(text) > 5:
+        return None
+    text = text.zfill(5)
+    if text.startswith("97"):
+        return text[:3]
+    if text.startswith("20"):
+        return "2A" if int(text) < 20200 else "2B"
+    return text[:2]
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def build_matrix(centroids_file=CENTROIDS_FILE):
+    """Codes et matrice des distances (km, uint16) entre tous les départements du fichier."""
+    centroids = pd.read_csv(centroids_file, dtype={"code": str})
+    lat = centroids["latitude"].to_numpy()
+    lon = centroids["longitude"].to_numpy()
+    km = haversine_km(lat[:, None], lon[:, None], lat[None, :], lon[None, :])
+    return centroids["code"].to_numpy(dtype=str), np.rint(km).astype(np.uint16)
+
+
+class DistanceMatrix:
+    """Distances entre départements, indexées par code normalisé."""
+
+    def __init__(self, codes, km):
+        self.codes = [str(code) for code in codes]
+        self.km = km
+        self.index = {code: i for i, code in enumerate(self.codes)}
+
+    @classmethod
+    def load(cls, path=MATRIX_FILE):
+        with np.load(path) as data:
+            return cls(data["codes"], data["km"])
+
+    def distance(self, origin, destination):
+        """Distance en km entre deux départements (NaN si l'un est inconnu)."""
+        i = self.index.get(normalize_departement(origin))
+        j = self.index.get(normalize_departement(destination))
+        if i is None or j is None:
+            return np.nan
+        return float(self.km[i, j])
+
+    def distances_from(self, origin, destinations):
+        """Distances en km d'un département vers une série de départements (NaN si inconnu)."""
+        i = self.index.get(normalize_departement(origin))
+        destinations = pd.Series(destinations)
+        if i is None:
+            return np.full(len(destinations), np.nan)
+        j = destinations.map(normalize_departement).map(self.index)
+        result = np.full(len(destinations), np.nan)
+        known = j.notna().to_numpy()
+        result[known] = self.km[i, j[known].astype(int).to_numpy()]
+        return result
+
+    def pairwise(self, origins, destinations):
+        """Distances en km ligne à ligne entre deux séries de départements (NaN si inconnu)."""
+        i = pd.Series(origins).map(normalize_departement).map(self.index).reset_index(drop=True)
+        j = pd.Series(destinations).map(normalize_departement).map(self.index).reset_index(drop=True)
+        result = np.full(len(i), np.nan)
+        known = (i.notna() & j.notna()).to_numpy()
+        result[known] = self.km[i[known].astype(int).to_numpy(), j[known].astype(int).to_numpy()]
+        return result
+
+
+def main():
+    codes, km = build_matrix()
+    np.savez_compressed(MATRIX_FILE, codes=codes, km=km)
+    print(f"{len(codes)} départements -> {MATRIX_FILE}")
+
+
+if __name__ == "__main__":
+    main()
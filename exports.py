@@ -0,0 +1,244 @@
+"""
+Exports en masse des désignations (XLSX ou CSV), générés en arrière-plan.
+Un export est une tâche (ExportJob) confiée à un pool de threads : la page
+lance la génération puis affiche sa progression sans attendre. Les fichiers
+produits sont conservés par clé (type d'export, format, week-end, version des
+données) : un même export redemandé sur les mêmes données est servi sans être
+régénéré.
+Les classeurs XLSX sont écrits en flux (openpyxl en mode write_only, une
+feuille par compétition ou par arbitre) ; en CSV, un fichier par feuille dans
+une archive ZIP.
+Ce module n'importe pas Streamlit.
+"""
+import io
+import logging
+import re
+import threading
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+
+import config
+from conflicts import normalize_licence
+from instrumentation import timed
+
+logger = logging.getLogger(__name__)
+
+# Colonnes des feuilles de désignation exportées
+EXPORT_COLUMNS = [
+    "DATE", "HEURE", "COMPETITION NOM", "RENCONTRE NUMERO", "LOCAUX", "VISITEURS",
+    "FONCTION ARBITRE", "NOM", "PRENOM", "NUMERO LICENCE", "SOURCE",
+]
+
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+CSV_MIME = "text/csv"
+ZIP_MIME = "application/zip"
+EXTENSIONS = {XLSX_MIME: ".xlsx", CSV_MIME: ".csv", ZIP_MIME: ".zip"}
+
+# Caractères interdits dans un nom de feuille Excel (31 caractères au plus)
+_SHEET_NAME_FORBIDDEN = re.compile(r"[\[\]:*?/\\]")
+
+
+# --- Préparation des données ---
+
+def weekend_designations(designations_df, rencontres_ffr_df, week):
+    """
+    Désignations manuelles et FFR du week-end commençant le lundi `week`
+    (colonnes EXPORT_COLUMNS), triées par date, compétition et rencontre.
+    """
+    parts = []
+    if not designations_df.empty and "DATE" in designations_df.columns:
+        manual = designations_df.reindex(columns=config.DESIGNATIONS_COLUMNS)
+        parts.append(pd.DataFrame({
+            "date": pd.to_datetime(manual["DATE"], dayfirst=True, errors="coerce"),
+            "COMPETITION NOM": manual["COMPETITION NOM"],
+            "RENCONTRE NUMERO": manual["RENCONTRE NUMERO"],
+            "LOCAUX": manual["LOCAUX"],
+            "VISITEURS": manual["VISITEURS"],
+            "FONCTION ARBITRE": manual["FONCTION ARBITRE"],
+            "NOM": manual["NOM"],
+            "PRENOM": manual["PRENOM"],
+            "NUMERO LICENCE": manual["NUMERO LICENCE"],
+            "SOURCE": "Manuelle",
+        }))
+    date_col = config.COLUMN_MAPPING['rencontres_date']
+    if not rencontres_ffr_df.empty and date_col in rencontres_ffr_df.columns:
+        numero = "NUMERO RENCONTRE" if "NUMERO RENCONTRE" in rencontres_ffr_df.columns else "RENCONTRE NUMERO"
+        nom = "Nom" if "Nom" in rencontres_ffr_df.columns else "NOM"
+        ffr = rencontres_ffr_df.reindex(columns=[date_col, numero, nom, "COMPETITION NOM", "LOCAUX", "VISITEURS", "FONCTION ARBITRE", "PRENOM", "NUMERO LICENCE"])
+        parts.append(pd.DataFrame({
+            "date": pd.to_datetime(ffr[date_col], errors="coerce"),
+            "COMPETITION NOM": ffr["COMPETITION NOM"],
+            "RENCONTRE NUMERO": ffr[numero],
+            "LOCAUX": ffr["LOCAUX"],
+            "VISITEURS": ffr["VISITEURS"],
+            "FONCTION ARBITRE": ffr["FONCTION ARBITRE"],
+            "NOM": ffr[nom],
+            "PRENOM": ffr["PRENOM"],
+            "NUMERO LICENCE": ffr["NUMERO LICENCE"],
+            "SOURCE": "FFR",
+        }))
+    if not parts:
+        return pd.DataFrame(columns=EXPORT_COLUMNS)
+    designations = pd.concat(parts, ignore_index=True)
+    start = pd.Timestamp(week).normalize()
+    designations = designations[(designations["date"] >= start) & (designations["date"] < start + pd.Timedelta(days=7))]
+    designations = designations[designations["NOM"].notna()]
+    designations = designations.sort_values(["date", "COMPETITION NOM", "RENCONTRE NUMERO", "FONCTION ARBITRE"], kind="stable")
+    designations["NUMERO LICENCE"] = normalize_licence(designations["NUMERO LICENCE"]).to_numpy()
+    designations["DATE"] = designations["date"].dt.strftime("%d/%m/%Y")
+    designations["HEURE"] = designations["date"].dt.strftime("%H:%M").replace("00:00", "")
+    return designations[EXPORT_COLUMNS].reset_index(drop=True)
+
+
+def sheets_by_competition(designations):
+    """Une feuille par compétition."""
+    return [(str(competition), group) for competition, group in designations.groupby("COMPETITION NOM", sort=True)]
+
+
+def sheets_by_referee(designations):
+    """Une convocation (feuille) par arbitre : ses rencontres du week-end."""
+    sheets = []
+    for (nom, prenom, _), group in designations.groupby(["NOM", "PRENOM", "NUMERO LICENCE"], sort=True, dropna=False):
+        sheets.append((f"{nom} {prenom}", group.drop(columns=["NOM", "PRENOM"])))
+    return sheets
+
+
+def _sheet_name(name, used):
+    base = _SHEET_NAME_FORBIDDEN.sub("-", str(name)).strip() or "Feuille"
+    candidate, suffix = base[:31], 2
+    while candidate.lower() in used:
+        tail = f" ({suffix})"
+        candidate, suffix = base[:31 - len(tail)] + tail, suffix + 1
+    used.add(candidate.lower())
+    return candidate
+
+
+# --- Écriture ---
+
+def write_xlsx(sheets, progress=None):
+    """Classeur XLSX écrit en flux, une feuille par couple (nom, DataFrame). Retourne le contenu."""
+    # Importé au premier export seulement : openpyxl est long à charger
+    from openpyxl import Workbook
+    workbook = Workbook(write_only=True)
+    used = set()
+    for i, (name, df) in enumerate(sheets, start=1):
+        worksheet = workbook.create_sheet(_sheet_name(name, used))
+        worksheet.append(list(df.columns))
+        for row in df.astype(object).where(df.notna(), None).itertuples(index=False, name=None):
+            worksheet.append(row)
+        if progress:
+            progress(i / len(sheets), name)
+    if not used:
+        workbook.create_sheet("Vide")
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def write_csv_zip(sheets, progress=None):
+    """Archive ZIP contenant un CSV (séparateur ;, UTF-8 avec BOM) par feuille."""
+    buffer = io.BytesIO()
+    used = set()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for i, (name, df) in enumerate(sheets, start=1):
+            archive.writestr(f"{_sheet_name(name, used)}.csv", df.to_csv(index=False, sep=";").encode("utf-8-sig"))
+            if progress:
+                progress(i / len(sheets), name)
+    return buffer.getvalue()
+
+
+def write_sheets(sheets, fmt, progress=None):
+    """Contenu et type MIME d'un export : XLSX, CSV (une seule feuille) ou ZIP de CSV."""
+    if fmt == "xlsx":
+        return write_xlsx(sheets, progress), XLSX_MIME
+    if len(sheets) == 1:
+        name, df = sheets[0]
+        if progress:
+            progress(1.0, name)
+        return df.to_csv(index=False, sep=";").encode("utf-8-sig"), CSV_MIME
+    return write_csv_zip(sheets, progress), ZIP_MIME
+
+
+# --- Tâches en arrière-plan ---
+
+class ExportJob:
+    """
+    Génération d'un fichier d'export : progression (0 à 1), puis contenu ou erreur.
+    `name` est le nom du fichier sans extension (ajoutée selon le type produit).
+    """
+
+    def __init__(self, key, name):
+        self.key = key
+        self.name = name
+        self.filename = name
+        self.mime = None
+        self.content = None
+        self.error = None
+        self.progress = 0.0
+        self.message = "En attente"
+        self.started_at = datetime.now()
+        self.finished_at = None
+        self._done = threading.Event()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def report(self, fraction, message):
+        self.progress = max(0.0, min(1.0, fraction))
+        self.message = message
+
+    def run(self, build):
+        try:
+            with timed(f"export {self.name}", "traitement"):
+                self.content, self.mime = build(self.report)
+            self.filename = self.name + EXTENSIONS.get(self.mime, "")
+            self.report(1.0, "Terminé")
+        except Exception as e:
+            self.error = str(e)
+            logger.warning("Export %s échoué : %s", self.name, e)
+        finally:
+            self.finished_at = datetime.now()
+            self._done.set()
+
+
+class ExportManager:
+    """
+    Pool de génération des exports. `submit` retourne la tâche existante pour une clé
+    déjà demandée (en cours ou terminée sans erreur) ; les `max_artifacts` derniers
+    fichiers sont conservés.
+    """
+
+    def __init__(self, max_workers=2, max_artifacts=16):
+        self.max_artifacts = max_artifacts
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="export")
+
+    def get(self, key):
+        with self._lock:
+            return self._jobs.get(key)
+
+    def submit(self, key, name, build):
+        """Lance `build(progress)` -> (contenu, type MIME) en arrière-plan, sauf si la clé est déjà servie."""
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and job.error is None:
+                self._jobs.move_to_end(key)
+                return job
+            job = ExportJob(key, name)
+            self._jobs[key] = job
+            while len(self._jobs) > self.max_artifacts:
+                oldest_key, oldest = next(iter(self._jobs.items()))
+                if not oldest.done:
+                    break
+                del self._jobs[oldest_key]
+        self._executor.submit(job.run, build)
+        return job
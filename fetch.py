@@ -0,0 +1,146 @@
+"""
+Téléchargement des exports XLSX Google Sheets.
+Une boucle asyncio dédiée (thread de fond) porte un client httpx partagé :
+connexions réutilisées (keep-alive), délais configurables, nouvelles tentatives
+avec attente exponentielle, requêtes conditionnelles (ETag / Last-Modified) et
+empreinte du contenu pour reconnaître un export inchangé sans le relire.
+Les téléchargements simultanés d'une même URL sont regroupés en un seul
+(gateway.SingleFlight), quel que soit le nombre de sessions qui le demandent.
+Le contenu est retourné en mémoire (bytes), sans fichier temporaire.
+Ce module n'importe pas Streamlit.
+"""
+import asyncio
+import hashlib
+import logging
+import random
+import threading
+from collections import namedtuple
+from pathlib import Path
+
+import httpx
+
+import config
+from gateway import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Résultat d'un téléchargement ; `content` vaut None si l'export n'a pas changé
+FetchResult = namedtuple("FetchResult", ["url", "content", "digest", "changed"])
+
+# Statuts HTTP donnant lieu à une nouvelle tentative
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def is_remote(url):
+    return str(url).startswith(("http://", "https://"))
+
+
+class ExportFetcher:
+    """Client de téléchargement : pool de connexions httpx et validateurs du dernier contenu vu par URL."""
+
+    def __init__(self, timeout=None, connect_timeout=None, retries=None, backoff=None):
+        self.timeout = httpx.Timeout(
+            timeout if timeout is not None else config.FETCH_TIMEOUT,
+            connect=connect_timeout if connect_timeout is not None else config.FETCH_CONNECT_TIMEOUT,
+        )
+        self.retries = retries if retries is not None else config.FETCH_RETRIES
+        self.backoff = backoff if backoff is not None else config.FETCH_BACKOFF
+        # Validateurs du dernier contenu vu par URL : {url: (etag, last_modified, digest)}
+        self._validators = {}
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="fetch-loop", daemon=True)
+        self._thread.start()
+        self._client = self._submit(self._create_client())
+
+    async def _create_client(self):
+        return httpx.AsyncClient(
+            timeout=self.timeout,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=10, max_keepalive_connections=10),
+        )
+
+    def _submit(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    # --- Téléchargement ---
+    async def _get(self, url, headers):
+        """GET avec nouvelles tentatives sur erreur réseau, 429 et 5xx."""
+        for attempt in range(self.retries + 1):
+            try:
+                response = await self._client.get(url, headers=headers)
+                if response.status_code not in RETRY_STATUSES or attempt == self.retries:
+                    if response.status_code != 304:
+                        response.raise_for_status()
+                    return response
+                reason = f"HTTP {response.status_code}"
+            except httpx.TransportError as e:
+                if attempt == self.retries:
+                    raise
+                reason = f"{type(e).__name__}: {e}"
+            delay = self.backoff * (2 ** attempt) * (1 + random.random() / 2)
+            logger.warning("Téléchargement de %s : %s, nouvel essai dans %.1f s", url, reason, delay)
+            await asyncio.sleep(delay)
+
+    async def _fetch(self, url, conditional):
+        with self._lock:
+            etag, last_modified, previous_digest = self._validators.get(url, (None, None, None))
+        headers = {}
+        if conditional and etag:
+            headers["If-None-Match"] = etag
+        if conditional and last_modified:
+            headers["If-Modified-Since"] = last_modified
+        response = await self._get(url, headers)
+        if response.status_code == 304:
+            return FetchResult(url, None, previous_digest, False)
+        content = response.content
+        digest = hashlib.sha256(content).hexdigest()
+        with self._lock:
+            self._validators[url] = (response.headers.get("ETag"), response.headers.get("Last-Modified"), digest)
+        if conditional and digest == previous_digest:
+            return FetchResult(url, None, digest, False)
+        return FetchResult(url, content, digest, True)
+
+    def fetch(self, url, conditional=False):
+        """
+        Télécharge `url` (ou lit un fichier local) et retourne un FetchResult.
+        Avec `conditional=True`, un export identique au précédent téléchargement
+        de la même URL par ce client est signalé par `changed=False` et `content=None`.
+        Un téléchargement identique déjà en cours est attendu et son résultat partagé.
+        """
+        if not is_remote(url):
+            return self._read_file(url, conditional)
+        return self._flight.run((url, conditional), lambda: self._submit(self._fetch(url, conditional)))
+
+    def _read_file(self, path, conditional):
+        content = Path(path).read_bytes()
+        digest = hashlib.sha256(content).hexdigest()
+        with self._lock:
+            previous_digest = self._validators.get(path, (None, None, None))[2]
+            self._validators[path] = (None, None, digest)
+        if conditional and digest == previous_digest:
+            return FetchResult(path, None, digest, False)
+        return FetchResult(path, content, digest, True)
+
+    def forget(self, url):
+        """Oublie les validateurs de `url` : le prochain téléchargement conditionnel retourne le contenu."""
+        with self._lock:
+            self._validators.pop(url, None)
+
+    def close(self):
+        self._submit(self._client.aclose())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+_fetcher = None
+_fetcher_lock = threading.Lock()
+
+
+def get_fetcher():
+    """Client de téléchargement partagé du processus (créé au premier appel)."""
+    global _fetcher
+    with _fetcher_lock:
+        if _fetcher is None:
+            _fetcher = ExportFetcher()
+        return _fetcher
@@ -0,0 +1,271 @@
+"""
+Passerelle Google Sheets partagée par toutes les sessions du processus.
+Les clients créés par sheets.create_client (gspread ou storage.LocalSheetsClient)
+sont enveloppés pour que chaque appel API passe par la passerelle :
+- lectures identiques simultanées regroupées (une seule requête en vol, dont le
+  résultat est partagé par tous les appelants ; une lecture commencée après une
+  écriture sur le même classeur ne rejoint pas une lecture plus ancienne) ;
+- débit limité par un seau à jetons pour les lectures et un pour les écritures
+  (config.SHEETS_READS_PER_MINUTE / SHEETS_WRITES_PER_MINUTE) ;
+- nouvelles tentatives avec attente exponentielle sur erreur de quota (429),
+  et sur erreur 5xx pour les lectures seulement (une écriture en 5xx a pu être appliquée) ;
+- classeurs et feuilles ouverts conservés config.SHEETS_HANDLE_TTL secondes.
+Les résultats partagés ne doivent pas être modifiés par les appelants.
+Le même regroupement (SingleFlight) est utilisé pour les exports XLSX (fetch.py).
+Ce module n'importe pas Streamlit.
+"""
+import json
+import logging
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+import config
+from storage import spreadsheet_id_from_url
+
+logger = logging.getLogger(__name__)
+
+# Statuts HTTP donnant lieu à une nouvelle tentative (lectures) ; les écritures ne sont retentées que sur 429
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def status_code(error):
+    """Statut HTTP d'une erreur API (gspread.exceptions.APIError ou storage.QuotaExceededError), sinon None."""
+    return getattr(getattr(error, "response", None), "status_code", None)
+
+
+def retry_after(error):
+    """Délai demandé par l'en-tête Retry-After de la réponse (secondes), sinon None."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+class SingleFlight:
+    """Regroupe les appels simultanés de même clé : le premier exécute, les suivants attendent son résultat."""
+
+    def __init__(self):
+        self.shared = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def run(self, key, fn):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+            else:
+                self.shared += 1
+        if not leader:
+            return future.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            with self._lock:
+                del self._calls[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self._calls[key]
+        future.set_result(result)
+        return result
+
+
+class TokenBucket:
+    """
+    Au plus `per_minute` jetons sur toute fenêtre glissante de 60 s : réserve de `burst` jetons,
+    reconstituée au rythme de (`per_minute` - `burst`) par minute. `per_minute` nul : pas de limite.
+    """
+
+    def __init__(self, per_minute, burst):
+        self.burst = max(1, min(burst, per_minute - 1)) if per_minute else 0
+        self.rate = max(per_minute - self.burst, 1) / 60 if per_minute else 0
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Prend un jeton, en attendant qu'il soit disponible. Retourne l'attente (secondes)."""
+        if not self.burst:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Jeton réservé même s'il manque : les appelants suivants attendent leur tour
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+        return wait
+
+
+class SheetsGateway:
+    """Regroupement, limitation de débit et nouvelles tentatives des appels API Google Sheets."""
+
+    def __init__(self, reads_per_minute=None, writes_per_minute=None, burst=None, retries=None, backoff=None, handle_ttl=None):
+        burst = burst if burst is not None else config.SHEETS_BURST
+        self.reads = TokenBucket(reads_per_minute if reads_per_minute is not None else config.SHEETS_READS_PER_MINUTE, burst)
+        self.writes = TokenBucket(writes_per_minute if writes_per_minute is not None else config.SHEETS_WRITES_PER_MINUTE, burst)
+        self.retries = retries if retries is not None else config.SHEETS_RETRIES
+        self.backoff = backoff if backoff is not None else config.FETCH_BACKOFF
+        self.handle_ttl = handle_ttl if handle_ttl is not None else config.SHEETS_HANDLE_TTL
+        self.counts = Counter()
+        self.waited = 0.0
+        self._flight = SingleFlight()
+        # Écritures terminées par classeur : une lecture ne rejoint que les lectures commencées après
+        self._generations = Counter()
+        self._lock = threading.Lock()
+
+    def wrap(self, client):
+        """Client enveloppé : même interface (voir storage.py), appels passant par la passerelle."""
+        return client if client is None or isinstance(client, GatewayClient) else GatewayClient(client, self)
+
+    def stats(self):
+        """Requêtes envoyées, lectures partagées, nouvelles tentatives et attente cumulée (secondes)."""
+        with self._lock:
+            return {**self.counts, "partagees": self._flight.shared, "attente_s": round(self.waited, 2)}
+
+    # --- Appels ---
+    def read(self, spreadsheet_id, key, method, fn):
+        """Lecture `fn()` regroupée avec les lectures identiques (`key`) en vol sur le classeur."""
+        with self._lock:
+            generation = self._generations[spreadsheet_id]
+        return self._flight.run((spreadsheet_id, generation, method, key), lambda: self._call(method, fn, write=False))
+
+    def write(self, spreadsheet_id, method, fn):
+        """Écriture `fn()`, jamais regroupée ; les lectures suivantes du classeur ne rejoignent pas les précédentes."""
+        try:
+            return self._call(method, fn, write=True)
+        finally:
+            with self._lock:
+                self._generations[spreadsheet_id] += 1
+
+    def _call(self, method, fn, write):
+        retryable = {429} if write else RETRY_STATUSES
+        for attempt in range(self.retries + 1):
+            waited = (self.writes if write else self.reads).acquire()
+            with self._lock:
+                self.counts["requetes"] += 1
+                self.waited += waited
+            try:
+                return fn()
+            except Exception as e:
+                status = status_code(e)
+                if status not in retryable or attempt == self.retries:
+                    raise
+                delay = retry_after(e) or self.backoff * (2 ** attempt) * (1 + random.random() / 2)
+                with self._lock:
+                    self.counts["nouvelles_tentatives"] += 1
+                logger.warning("Google Sheets %s : HTTP %s, nouvel essai dans %.1f s", method, status, delay)
+                time.sleep(delay)
+
+
+def _read_key(args, kwargs):
+    return json.dumps([args, sorted(kwargs.items())], default=str)
+
+
+class _Handles:
+    """Objets ouverts (classeurs, feuilles) conservés `ttl` secondes, ouverts par une lecture regroupée."""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._handles = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, open_handle):
+        now = time.monotonic()
+        with self._lock:
+            handle, expires = self._handles.get(key, (None, 0))
+        if handle is not None and now < expires:
+            return handle
+        handle = open_handle()
+        with self._lock:
+            self._handles[key] = (handle, now + self.ttl)
+        return handle
+
+
+class GatewayClient:
+    """Client Google Sheets enveloppé ; les autres attributs (call_counts, close...) sont ceux du client."""
+
+    def __init__(self, client, gateway):
+        self._client = client
+        self._gateway = gateway
+        self._handles = _Handles(gateway.handle_ttl)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    def open_by_url(self, url):
+        spreadsheet_id = spreadsheet_id_from_url(url)
+
+        def open_spreadsheet():
+            spreadsheet = self._gateway.read(spreadsheet_id, "", "open_by_url", lambda: self._client.open_by_url(url))
+            return GatewaySpreadsheet(spreadsheet, spreadsheet_id, self._gateway, self._handles)
+
+        return self._handles.get(spreadsheet_id, open_spreadsheet)
+
+
+class GatewaySpreadsheet:
+    def __init__(self, spreadsheet, spreadsheet_id, gateway, handles):
+        self._spreadsheet = spreadsheet
+        self._id = spreadsheet_id
+        self._gateway = gateway
+        self._handles = handles
+
+    def __getattr__(self, name):
+        return getattr(self._spreadsheet, name)
+
+    def get_worksheet(self, index):
+        def open_worksheet():
+            worksheet = self._gateway.read(self._id, index, "get_worksheet", lambda: self._spreadsheet.get_worksheet(index))
+            return GatewayWorksheet(worksheet, self._id, index, self._gateway)
+
+        return self._handles.get((self._id, index), open_worksheet)
+
+    def values_batch_get(self, ranges, params=None):
+        return self._gateway.read(
+            self._id, _read_key([list(ranges)], params or {}), "values_batch_get",
+            lambda: self._spreadsheet.values_batch_get(ranges, params=params),
+        )
+
+
+class GatewayWorksheet:
+    """Feuille enveloppée : lectures regroupées, écritures limitées et retentées sur 429."""
+
+    READS = ("get_all_records", "get_all_values", "row_values")
+    WRITES = ("append_row", "update", "clear", "delete_rows")
+
+    def __init__(self, worksheet, spreadsheet_id, index, gateway):
+        self._worksheet = worksheet
+        self._id = spreadsheet_id
+        self._index = index
+        self._gateway = gateway
+
+    def __getattr__(self, name):
+        method = getattr(self._worksheet, name)
+        if name in self.READS:
+            return lambda *args, **kwargs: self._gateway.read(
+                self._id, (self._index, _read_key(args, kwargs)), name, lambda: method(*args, **kwargs)
+            )
+        if name in self.WRITES:
+            return lambda *args, **kwargs: self._gateway.write(self._id, name, lambda: method(*args, **kwargs))
+        return method
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway():
+    """Passerelle partagée du processus (créée au premier appel)."""
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            _gateway = SheetsGateway()
+        return _gateway
@@ -0,0 +1,196 @@
+"""
+Instrumentation des chemins critiques de l'application.
+Mesure la durée des chargements (XLSX), des appels Google Sheets, des
+traitements (fusions, pivots, filtres) et du rendu, exécution par exécution.
+Les mesures sont conservées par thread (un thread par exécution de script
+Streamlit) et émises sous forme de lignes JSON sur le logger "designation.timings".
+Profil de démarrage : durée de la première exécution de chaque page dans le processus
+et, avec DESIGNATION_PROFILE_STARTUP=1, durée des imports qu'elle a déclenchés
+(imports de premier niveau uniquement, chacun comprenant ses imports imbriqués).
+Ce module n'importe pas Streamlit, ni aucune bibliothèque hors bibliothèque standard :
+il est importé en premier pour mesurer les imports suivants.
+"""
+import builtins
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+logger = logging.getLogger("designation.timings")
+
+# Catégories de mesures affichées dans le panneau de débogage
+CATEGORIES = ("chargement", "sheets", "traitement", "rendu", "autre")
+
+# Lu ici et non dans config.py : config importe pandas, dont l'import doit pouvoir être mesuré
+PROFILE_IMPORTS = os.environ.get("DESIGNATION_PROFILE_STARTUP", "0") == "1"
+
+_local = threading.local()
+
+# Première exécution de chaque page dans le processus : {page: rapport}
+_first_runs = {}
+_first_runs_lock = threading.Lock()
+_original_import = None
+
+
+def begin_run(page):
+    """Démarre une nouvelle exécution : les mesures précédentes du thread sont oubliées."""
+    _local.page = page
+    _local.started_at = datetime.now()
+    _local.spans = []
+    _local.stack = []
+    _local.startup = None
+    with _first_runs_lock:
+        _local.first_run = page not in _first_runs
+        if _local.first_run:
+            _first_runs[page] = None
+    _local.run_start = time.perf_counter()
+
+
+def end_run():
+    """
+    Termine l'exécution en cours. Pour la première exécution d'une page, enregistre son profil
+    de démarrage : imports déclenchés depuis la fin de l'exécution précédente du thread
+    (ceux du script de la page compris) et durée du rendu depuis begin_run.
+    """
+    imports = getattr(_local, "imports", [])
+    _local.imports = []
+    if not getattr(_local, "first_run", False):
+        return
+    _local.first_run = False
+    report = {
+        "page": _local.page,
+        "render_ms": round((time.perf_counter() - _local.run_start) * 1000, 2),
+        "imports_ms": round(sum(entry["duration_ms"] for entry in imports), 2) if _original_import else None,
+        "imports": sorted(imports, key=lambda entry: entry["duration_ms"], reverse=True),
+    }
+    with _first_runs_lock:
+        _first_runs[_local.page] = report
+    _local.startup = report
+    logger.debug(json.dumps({"startup": report}, ensure_ascii=False))
+
+
+def startup_report():
+    """Profils de démarrage des pages déjà exécutées dans le processus (liste de dicts)."""
+    with _first_runs_lock:
+        return [report for report in _first_runs.values() if report is not None]
+
+
+def profile_imports():
+    """
+    Mesure désormais les imports de premier niveau qui chargent de nouveaux modules,
+    attribués à l'exécution en cours du thread (voir end_run).
+    """
+    global _original_import
+    if _original_import is not None:
+        return
+    _original_import = original = builtins.__import__
+
+    def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+        if getattr(_local, "importing", False) or (level == 0 and not fromlist and name in sys.modules):
+            return original(name, globals, locals, fromlist, level)
+        _local.importing = True
+        loaded = len(sys.modules)
+        start = time.perf_counter()
+        try:
+            return original(name, globals, locals, fromlist, level)
+        finally:
+            duration = time.perf_counter() - start
+            _local.importing = False
+            if len(sys.modules) > loaded:
+                if not hasattr(_local, "imports"):
+                    _local.imports = []
+                _local.imports.append({
+                    "module": name,
+                    "by": os.path.basename((globals or {}).get("__file__") or "?"),
+                    "modules": len(sys.modules) - loaded,
+                    "duration_ms": round(duration * 1000, 2),
+                })
+
+    builtins.__import__ = timed_import
+
+
+if PROFILE_IMPORTS:
+    profile_imports()
+
+
+def current_spans():
+    """Retourne les mesures de l'exécution en cours (liste de dicts)."""
+    return list(getattr(_local, "spans", []))
+
+
+@contextmanager
+def timed(label, category="autre"):
+    """
+    Mesure la durée du bloc et l'ajoute aux mesures de l'exécution en cours.
+    Ex: with timed("pivot disponibilités", "traitement"): ...
+    """
+    stack = getattr(_local, "stack", [])
+    parents = list(stack)
+    _local.stack = parents + [category]
+    start = time.perf_counter()
+    error = None
+    try:
+        yield
+    except Exception as e:
+        error = type(e).__name__
+        raise
+    finally:
+        _local.stack = parents
+        span = {
+            "page": getattr(_local, "page", None),
+            "label": label,
+            "category": category,
+            "duration_ms": round((time.perf_counter() - start) * 1000, 2),
+            "depth": len(parents),
+            # Déjà comptée dans une mesure englobante de même catégorie
+            "nested": category in parents,
+            "thread": threading.current_thread().name,
+        }
+        if error:
+            span["error"] = error
+        if hasattr(_local, "spans"):
+            _local.spans.append(span)
+        logger.debug(json.dumps(span, ensure_ascii=False))
+
+
+def instrumented(label=None, category="autre"):
+    """Décorateur : mesure chaque appel de la fonction (voir `timed`)."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(label or func.__name__, category):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def summarize(spans):
+    """Durée totale par catégorie, sans double compte des mesures imbriquées de même catégorie."""
+    totals = {}
+    for span in spans:
+        if not span["nested"]:
+            totals[span["category"]] = totals.get(span["category"], 0.0) + span["duration_ms"]
+    return totals
+
+
+def run_report():
+    """Rapport structuré de l'exécution en cours (avec son profil de démarrage si c'est la première de la page)."""
+    report = {
+        "page": getattr(_local, "page", None),
+        "started_at": getattr(_local, "started_at", datetime.now()).isoformat(timespec="seconds"),
+        "spans": current_spans(),
+    }
+    if getattr(_local, "startup", None):
+        report["startup"] = _local.startup
+    return report
+
+
+def export_metrics(path):
+    """Ajoute le rapport de l'exécution en cours au fichier JSONL `path`."""
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(run_report(), ensure_ascii=False) + "\n")
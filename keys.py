@@ -0,0 +1,167 @@
+"""
+Encodage des clés de jointure (licences, numéros de rencontre, codes club)
+en identifiants entiers denses.
+Chaque valeur est d'abord normalisée (12345, 12345.0 et " 12345" donnent la
+même clé), puis reçoit un identifiant stable pour toute la durée du processus :
+deux sources encodées séparément, ou deux versions d'une même source, restent
+comparables. Les valeurs manquantes reçoivent MISSING (-1), qui ne correspond
+à aucune clé.
+Les sources déclarées dans config.KEY_COLUMNS sont encodées une fois par
+instantané (sources.prepare_source) ; les pages joignent et filtrent ensuite
+sur les colonnes *_id.
+Les dictionnaires peuvent être sauvegardés (`state`) et restaurés au démarrage
+suivant (`restore`), pour que des structures dérivées enregistrées sur disque
+(artifacts.py) gardent les mêmes identifiants.
+Ce module n'importe pas Streamlit.
+"""
+import hashlib
+import threading
+
+import numpy as np
+import pandas as pd
+
+MISSING = -1
+
+# Types de clé : "equipe" encode le code club extrait d'une chaîne "NOM DU CLUB (CODE)"
+KINDS = ("licence", "rencontre", "club")
+TEAM_KIND = "equipe"
+
+
+def normalize_keys(values):
+    """Clés en texte sans décimales ni espaces (None si manquante ou vide)."""
+    values = pd.Series(values).reset_index(drop=True)
+    numeric = pd.to_numeric(values, errors='coerce')
+    as_int = numeric.round().astype('Int64').astype(str)
+    text = values.astype(str).str.strip()
+    keys = as_int.where(numeric.notna(), text)
+    return keys.where(values.notna() & ~keys.isin(["", "nan", "None", "<NA>"]), None)
+
+
+def club_codes_from_teams(values):
+    """Code club entre parenthèses d'une série de chaînes d'équipe ("STADE ROCHELAIS (SRO)" -> "SRO")."""
+    return pd.Series(values).astype(str).str.extract(r'\((.*?)\)', expand=False).str.strip()
+
+
+class KeyEncoder:
+    """Dictionnaire clé normalisée -> identifiant entier, complété au fil des encodages."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = {}
+        self._keys = []
+
+    def __len__(self):
+        return len(self._keys)
+
+    def encode(self, values):
+        """Identifiants (np.int32) des valeurs, MISSING pour les valeurs manquantes."""
+        codes, uniques = pd.factorize(normalize_keys(values))
+        with self._lock:
+            for key in uniques:
+                if key not in self._ids:
+                    self._ids[key] = len(self._keys)
+                    self._keys.append(key)
+            mapping = np.fromiter((self._ids[key] for key in uniques), dtype=np.int32, count=len(uniques))
+        if not len(uniques):
+            return np.full(len(codes), MISSING, dtype=np.int32)
+        return np.where(codes >= 0, mapping[np.maximum(codes, 0)], MISSING).astype(np.int32)
+
+    def lookup(self, value):
+        """Identifiant d'une valeur sans l'ajouter au dictionnaire (MISSING si inconnue)."""
+        key = normalize_keys([value])[0]
+        return self._ids.get(key, MISSING) if key is not None else MISSING
+
+    def decode(self, ids):
+        """Clés normalisées correspondant aux identifiants (None pour MISSING)."""
+        keys = self._keys
+        return [keys[i] if 0 <= i < len(keys) else None for i in ids]
+
+    def keys(self):
+        """Clés connues, dans l'ordre de leurs identifiants."""
+        with self._lock:
+            return list(self._keys)
+
+    def restore(self, keys):
+        """
+        Reprend les clés `keys` (voir `keys`) si les clés déjà connues en sont le début :
+        les identifiants déjà attribués ne changent pas. Retourne False sinon.
+        """
+        with self._lock:
+            if keys[:len(self._keys)] != self._keys:
+                return False
+            for key in keys[len(self._keys):]:
+                self._ids[key] = len(self._keys)
+                self._keys.append(key)
+            return True
+
+
+class KeyRegistry:
+    """Un dictionnaire par type de clé (KINDS), partagé par toutes les sources du processus."""
+
+    def __init__(self):
+        self.encoders = {kind: KeyEncoder() for kind in KINDS}
+        self._fingerprints = {}
+
+    # --- Sauvegarde ---
+    def sizes(self):
+        """Nombre de clés par type, dans l'ordre de KINDS."""
+        return tuple(len(self.encoders[kind]) for kind in KINDS)
+
+    def state(self):
+        """Clés de chaque type : {type: [clés]}, à passer à `restore`."""
+        return {kind: encoder.keys() for kind, encoder in self.encoders.items()}
+
+    def restore(self, state):
+        """Restaure les clés sauvegardées par `state` ; retourne False si un type ne peut l'être."""
+        return all([self.encoders[kind].restore(keys) for kind, keys in state.items() if kind in self.encoders])
+
+    def fingerprint(self, sizes):
+        """
+        Empreinte des `sizes` premières clés de chaque type (None si elles ne sont pas toutes connues).
+        Deux processus ayant la même empreinte attribuent les mêmes identifiants à ces clés.
+        """
+        if any(size > len(self.encoders[kind]) for kind, size in zip(KINDS, sizes)):
+            return None
+        sizes = tuple(sizes)
+        if sizes not in self._fingerprints:
+            digest = hashlib.sha256()
+            for kind, size in zip(KINDS, sizes):
+                digest.update(f"{kind}:{size}\n".encode())
+                digest.update("\n".join(self.encoders[kind].keys()[:size]).encode())
+            self._fingerprints[sizes] = digest.hexdigest()
+        return self._fingerprints[sizes]
+
+    def _resolve(self, kind, values):
+        if kind == TEAM_KIND:
+            return self.encoders["club"], club_codes_from_teams(values)
+        return self.encoders[kind], values
+
+    def encode(self, kind, values):
+        encoder, values = self._resolve(kind, values)
+        return encoder.encode(values)
+
+    def lookup(self, kind, value):
+        encoder, values = self._resolve(kind, [value])
+        return encoder.lookup(values[0])
+
+    def encode_columns(self, df, spec):
+        """
+        Ajoute à `df` les colonnes d'identifiants décrites par `spec`
+        ({colonne id: (type de clé, colonne source)}) ; les colonnes sources absentes sont ignorées.
+        """
+        for id_column, (kind, column) in (spec or {}).items():
+            if column in df.columns:
+                df[id_column] = self.encode(kind, df[column])
+        return df
+
+
+_registry = KeyRegistry()
+
+
+def get_registry():
+    """Dictionnaires des clés du processus."""
+    return _registry
+
+
+def encode_columns(df, spec):
+    return _registry.encode_columns(df, spec)
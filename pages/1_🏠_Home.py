@@ -1,9 +1,15 @@
+from instrumentation import begin_run, timed
 import streamlit as st
 import pandas as pd
 from datetime import datetime
-import altair as alt
 
 import config
+from capacity import shortages
+from partitions import week_start, weekend_label
+from utils import get_capacity_plan, get_partitions, initialize_session_data, display_timing_panel
+
+begin_run("Home")
+initialize_session_data()
 
 st.title("🏠 Tableau de Bord Principal")
 st.markdown("Vue de l'activité et des désignations à venir.")
@@ -44,22 +50,28 @@ total_arbitres = len(arbitres_df)
 available_referees_count = 0
 
 # Calcul des arbitres disponibles
-if not rencontres_filtrees_df.empty and not dispo_df.empty and 'rencontres_date_dt' in rencontres_filtrees_df.columns and 'DATE_dt' in dispo_df.columns:
-    min_rencontre_date = rencontres_filtrees_df['rencontres_date_dt'].min()
-    max_rencontre_date = rencontres_filtrees_df['rencontres_date_dt'].max()
+with timed("arbitres disponibles", "traitement"):
+    if not rencontres_filtrees_df.empty and not dispo_df.empty and 'rencontres_date_dt' in rencontres_filtrees_df.columns and 'DATE_dt' in dispo_df.columns:
+        min_rencontre_date = rencontres_filtrees_df['rencontres_date_dt'].min()
+        max_rencontre_date = rencontres_filtrees_df['rencontres_date_dt'].max()
     
-    filtered_dispo = dispo_df[
-        (dispo_df['DATE_dt'] >= min_rencontre_date) & 
-        (dispo_df['DATE_dt'] <= max_rencontre_date)
-    ]
-    if not filtered_dispo.empty:
-        available_referees_count = filtered_dispo[filtered_dispo[config.COLUMN_MAPPING['dispo_disponibilite']].str.upper() == 'OUI'][config.COLUMN_MAPPING['dispo_licence']].nunique()
+        # Seules les semaines couvertes par les rencontres sont parcourues
+        filtered_dispo = get_partitions("dispo").between(min_rencontre_date, max_rencontre_date)
+        if not filtered_dispo.empty:
+            available_referees_count = filtered_dispo[filtered_dispo[config.COLUMN_MAPPING['dispo_disponibilite']].str.upper() == 'OUI'][config.COLUMN_MAPPING['dispo_licence']].nunique()
 
 col1, col2, col3 = st.columns(3)
 col1.metric(label="📅 Total des Rencontres", value=total_rencontres)
 col2.metric(label="👤 Total des Arbitres", value=total_arbitres)
 col3.metric(label="✅ Arbitres Disponibles (Plage des rencontres)", value=available_referees_count)
 
+# Pénuries prévues par week-end et bande de niveaux (détail dans la page Capacité)
+with timed("pénuries à venir", "traitement"):
+    penuries = shortages(get_capacity_plan(), since=week_start(datetime.now()))
+if not penuries.empty:
+    weekends = ", ".join(weekend_label(semaine) for semaine in penuries["semaine"].unique()[:3])
+    st.warning(f"📐 {len(penuries)} pénurie(s) d'arbitres prévue(s) à partir du week-end du {weekends} : voir la page Capacité.")
+
 st.divider()
 
 # --- Prochaines Rencontres à Désigner ---
@@ -96,3 +108,5 @@ if not rencontres_filtrees_df.empty and 'rencontres_date_dt' in rencontres_filtr
     st.dataframe(rencontres_par_jour[['Date', 'Nombre de Rencontres']], use_container_width=True, hide_index=True)
 else:
     st.info("Aucune donnée de rencontre disponible pour afficher la répartition par jour.")
+
+display_timing_panel()
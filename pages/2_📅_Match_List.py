@@ -1,64 +1,72 @@
+from instrumentation import begin_run, timed
 import streamlit as st
 import pandas as pd
-from st_aggrid import AgGrid, GridOptionsBuilder
 
 import config
+from utils import initialize_session_data, display_timing_panel, query_match_list
+
+begin_run("Match List")
+initialize_session_data()
 
 # --- Récupération des données ---
 rencontres_df = st.session_state.get('rencontres_df', pd.DataFrame())
-competitions_df = st.session_state.get('competitions_df', pd.DataFrame())
 
 st.title("📅 Liste des Rencontres")
 st.markdown("RS_OVALE2-024 - Vue consolidée de toutes les rencontres")
 
 if not rencontres_df.empty and 'rencontres_date_dt' in rencontres_df.columns:
-    rencontres_filtrees = rencontres_df.copy()
-
     # Utilisation de la liste centralisée depuis config.py
     competitions_filtre_defaut = config.COMPETITIONS_FILTRE_DEFAUT
     
     # Bouton toggle pour activer/désactiver le filtre par défaut
     filtre_actif = st.checkbox("Activer le filtre par compétitions", value=True)
-    
-    if filtre_actif:
-        rencontres_filtrees = rencontres_filtrees[rencontres_filtrees[config.COLUMN_MAPPING['rencontres_competition']].isin(competitions_filtre_defaut)]
 
-    if not rencontres_filtrees.empty:
-        cols_to_display = [
-            config.COLUMN_MAPPING['rencontres_date'],
-            config.COLUMN_MAPPING['rencontres_competition'],
-            config.COLUMN_MAPPING['rencontres_locaux'],
-            config.COLUMN_MAPPING['rencontres_visiteurs']
-        ]
-        display_df = rencontres_filtrees[cols_to_display].copy()
+    # --- Requête (filtre, tri et regroupement côté serveur) ---
+    colonnes = list(config.MATCH_LIST_COLUMNS.values())
+    col1, col2, col3, col4 = st.columns([3, 2, 2, 1])
+    recherche = col1.text_input("Rechercher (équipe ou compétition)")
+    groupe = col2.selectbox("Grouper par", options=[None] + colonnes, format_func=lambda col: "Aucun regroupement" if col is None else col)
+    tri = col3.selectbox("Trier par", options=colonnes, disabled=groupe is not None)
+    croissant = col4.radio("Ordre", ("↑", "↓"), horizontal=True) == "↑"
 
-        # Formater la date pour l'affichage final
-        display_df[config.COLUMN_MAPPING['rencontres_date']] = pd.to_datetime(display_df[config.COLUMN_MAPPING['rencontres_date']], errors='coerce').dt.strftime('%d/%m/%Y')
+    with timed("requête liste des rencontres", "traitement"):
+        liste_df = query_match_list(
+            rencontres_df,
+            st.session_state.get('data_snapshot'),
+            tuple(competitions_filtre_defaut) if filtre_actif else None,
+            recherche.strip(),
+            tri,
+            croissant,
+            groupe,
+        )
 
-        display_df = display_df.rename(columns={
-            config.COLUMN_MAPPING['rencontres_date']: 'Date',
-            config.COLUMN_MAPPING['rencontres_competition']: 'Compétition',
-            config.COLUMN_MAPPING['rencontres_locaux']: 'Locaux',
-            config.COLUMN_MAPPING['rencontres_visiteurs']: 'Visiteurs'
-        })
+    if not liste_df.empty:
+        # --- Pagination : seule la page affichée est envoyée à la grille ---
+        col1, col2, col3 = st.columns([1, 1, 3])
+        taille_page = col1.selectbox("Lignes par page", options=config.MATCH_LIST_PAGE_SIZES, index=1)
+        nb_pages = max(1, -(-len(liste_df) // taille_page))
+        page = col2.number_input("Page", min_value=1, max_value=nb_pages, value=1, step=1)
+        debut = (page - 1) * taille_page
+        page_df = liste_df.iloc[debut:debut + taille_page]
+        col3.caption(f"{'Groupes' if groupe else 'Rencontres'} {debut + 1} à {debut + len(page_df)} sur {len(liste_df)}")
 
-        gb = GridOptionsBuilder.from_dataframe(display_df)
-        gb.configure_pagination(paginationAutoPageSize=True)
-        gb.configure_side_bar()
-        gb.configure_default_column(groupable=True, value=True, enableRowGroup=True, aggFunc='sum', editable=False)
+        # Tri, filtre et regroupement sont faits côté serveur : la grille se contente d'afficher la page
+        from st_aggrid import AgGrid, GridOptionsBuilder
+        gb = GridOptionsBuilder.from_dataframe(page_df)
+        gb.configure_default_column(sortable=False, filter=False, editable=False)
         gridOptions = gb.build()
 
-        AgGrid(
-            display_df,
-            gridOptions=gridOptions,
-            enable_enterprise_modules=False,
-            height=600,
-            width='100%',
-            reload_data=True,
-            allow_unsafe_jscode=True,
-            theme='streamlit'
-        )
+        with timed("rendu AgGrid", "rendu"):
+            AgGrid(
+                page_df,
+                gridOptions=gridOptions,
+                enable_enterprise_modules=False,
+                height=600,
+                theme='streamlit'
+            )
     else:
         st.info("Aucune rencontre trouvée avec les filtres appliqués.")
 else:
     st.warning("Impossible de charger les données des rencontres.")
+
+display_timing_panel()
@@ -1,48 +1,35 @@
+from instrumentation import begin_run
 import streamlit as st
 import pandas as pd
 
 import config
+from partitions import weekend_label
+from utils import (
+    initialize_session_data,
+    build_recap,
+    display_export_job,
+    display_timing_panel,
+    get_partitions,
+    start_table_export,
+    start_weekend_export,
+    travel_by_weekend,
+)
+
+begin_run("Recap")
+initialize_session_data()
 
 # --- Récupération des données ---
-rencontres_df = st.session_state.get('rencontres_df', pd.DataFrame()).copy()
-designations_df = st.session_state.get('designations_df', pd.DataFrame()).copy()
+rencontres_df = st.session_state.get('rencontres_df', pd.DataFrame())
+designations_df = st.session_state.get('designations_df', pd.DataFrame())
+rencontres_ffr_df = st.session_state.get('rencontres_ffr_df', pd.DataFrame())
+data_snapshot = st.session_state.get('data_snapshot')
 
 st.title("📊 Récapitulatif des Désignations")
 st.markdown("RS_OVALE2-024 - Vue filtrée  de toutes les rencontres a designées.")
 
 if not rencontres_df.empty:
-    # --- Pré-traitement et Fusion ---
-    # Standardisation des noms de colonnes (déjà fait dans app.py, mais sans danger ici)
-    for df in [rencontres_df, designations_df]:
-        if "RENCONTRE NUMERO" in df.columns:
-            df["RENCONTRE NUMERO"] = df["RENCONTRE NUMERO"].astype(str)
-
-    if not designations_df.empty:
-        cols_to_merge = ['RENCONTRE NUMERO', 'NOM', 'PRENOM', 'DPT DE RESIDENCE', 'FONCTION ARBITRE']
-        existing_cols = [col for col in cols_to_merge if col in designations_df.columns]
-        designations_subset_df = designations_df[existing_cols].rename(columns={
-            'NOM': 'Arbitre Nom',
-            'PRENOM': 'Arbitre Prénom',
-            'DPT DE RESIDENCE': 'Arbitre Dpt Résidence',
-            'FONCTION ARBITRE': 'Arbitre Fonction'
-        })
-    else:
-        designations_subset_df = pd.DataFrame(columns=['RENCONTRE NUMERO', 'Arbitre Nom', 'Arbitre Prénom', 'Arbitre Dpt Résidence', 'Arbitre Fonction'])
-
-    recap_df = pd.merge(rencontres_df, designations_subset_df, on="RENCONTRE NUMERO", how="left")
-
-    # Remplacer les NaN (non-matchs) par des textes clairs
-    cols_to_fill = ['Arbitre Nom', 'Arbitre Prénom', 'Arbitre Dpt Résidence', 'Arbitre Fonction']
-    for col in cols_to_fill:
-        if col in recap_df.columns:
-            # CORRECTION: Convertir en type 'object' avant de remplir avec un string
-            recap_df[col] = recap_df[col].astype(object).fillna("-")
-
-    if 'Arbitre Dpt Résidence' in recap_df.columns:
-        recap_df['Arbitre Dpt Résidence'] = recap_df['Arbitre Dpt Résidence'].apply(lambda x: str(int(x)).zfill(2) if pd.notna(x) and str(x) != '-' else '-')
-
-    if config.COLUMN_MAPPING['rencontres_date'] in recap_df.columns:
-        recap_df[config.COLUMN_MAPPING['rencontres_date']] = pd.to_datetime(recap_df[config.COLUMN_MAPPING['rencontres_date']], errors='coerce').dt.strftime('%d/%m/%Y %H:%M')
+    # --- Construction du récapitulatif (une ligne par rencontre, mis en cache par jeu de données) ---
+    recap_df = build_recap(rencontres_df, designations_df, data_snapshot)
 
     # --- Filtre par défaut ---
     st.header("Filtre")
@@ -61,9 +48,63 @@ if not rencontres_df.empty:
 
     # --- Affichage du Tableau ---
     st.header(f"{len(filtered_df)} Rencontres Trouvées")
-    cols_to_show = [config.COLUMN_MAPPING['rencontres_date'], config.COLUMN_MAPPING['rencontres_competition'], config.COLUMN_MAPPING['rencontres_locaux'], config.COLUMN_MAPPING['rencontres_visiteurs'], 'Arbitre Nom', 'Arbitre Prénom', 'Arbitre Dpt Résidence', 'Arbitre Fonction']
-    final_cols = [col for col in cols_to_show if col in filtered_df.columns]
-    st.dataframe(filtered_df[final_cols], hide_index=True, use_container_width=True)
+    if not filtered_df.empty:
+        postes_pourvus = (filtered_df['Taux de remplissage'] * len(config.ALL_ROLES)).round().sum()
+        st.metric("Postes pourvus", f"{int(postes_pourvus)}/{len(filtered_df) * len(config.ALL_ROLES)}")
+
+    # Colonnes déjà ordonnées par build_recap : infos du match, rôles, taux de remplissage
+    final_cols = [col for col in filtered_df.columns if col != config.COLUMN_MAPPING['rencontres_numero']]
+    st.dataframe(
+        filtered_df[final_cols],
+        column_config={
+            'Taux de remplissage': st.column_config.ProgressColumn('Taux de remplissage', format="percent", min_value=0, max_value=1),
+        },
+        hide_index=True,
+        use_container_width=True
+    )
+
+    # --- Exports (générés en arrière-plan) ---
+    st.divider()
+    st.header("📥 Exports")
+    rencontres_partitions = get_partitions("rencontres")
+    weeks = rencontres_partitions.weeks()
+    prochain = rencontres_partitions.upcoming_weeks(1)
+    col1, col2, col3 = st.columns([2, 2, 1])
+    export_week = col1.selectbox(
+        "Week-end",
+        options=weeks,
+        index=weeks.index(prochain[0]) if prochain else 0,
+        format_func=weekend_label,
+    ) if weeks else None
+    export_kind = col2.radio("Contenu", options=list(config.BULK_EXPORT_KINDS), format_func=config.BULK_EXPORT_KINDS.get)
+    export_format = col3.radio("Format", options=["xlsx", "csv"], format_func=str.upper)
+    col1, col2 = st.columns(2)
+    if col1.button("Générer les feuilles du week-end", disabled=export_week is None, use_container_width=True):
+        st.session_state.export_recap = start_weekend_export(export_kind, export_format, export_week, designations_df, rencontres_ffr_df).key
+    if col2.button("Exporter le récapitulatif affiché", use_container_width=True):
+        st.session_state.export_recap = start_table_export("recapitulatif", filtered_df, export_format).key
+    display_export_job(st.session_state.get('export_recap'))
+
+    # --- Déplacements par week-end ---
+    st.divider()
+    st.header("🚗 Déplacements par Week-end")
+    st.caption("Distances à vol d'oiseau (aller simple) entre le département de résidence de l'arbitre et celui du terrain, désignations manuelles et FFR.")
+    deplacements_df = travel_by_weekend(designations_df, rencontres_ffr_df)
+    if deplacements_df.empty:
+        st.info("Aucune désignation avec départements de résidence et de terrain.")
+    else:
+        st.dataframe(
+            deplacements_df,
+            column_config={
+                'Total (km)': st.column_config.NumberColumn(format="%d"),
+                'Moyenne (km)': st.column_config.NumberColumn(format="%d"),
+                'Maximum (km)': st.column_config.NumberColumn(format="%d"),
+            },
+            hide_index=True,
+            use_container_width=True
+        )
 
 else:
     st.warning("Impossible de charger les données des rencontres.")
+
+display_timing_panel()
@@ -1,20 +1,41 @@
+from instrumentation import begin_run, timed
 import streamlit as st
 import pandas as pd
 
 # Importations centralisées
 import config
 from utils import (
-    load_data,
+    load_dataset,
+    get_partitions,
+    request_data_refresh,
+    display_data_freshness,
     get_gspread_client,
     enregistrer_designation,
-    load_designations_from_sheets,
-    get_arbitre_status_for_date,
-    get_department_from_club_name_or_code,
-    extract_club_code_from_team_string,
+    load_designations,
+    supprimer_designation,
+    can_write_designations,
+    display_designations_sync_status,
+    get_conflict_index,
+    get_workload_view,
+    data_digest,
+    data_version,
+    frame_fingerprint,
+    warm_start,
+    get_candidates,
+    prefetch_candidates,
+    display_timing_panel,
 )
+from conflicts import normalize_licence
+from keys import MISSING
+from workload import TARGET_COLUMN
+
+STRICT_FILTER = "Filtres stricts (recommandé)"
 
 # --- Fonctions d'affichage de l'UI ---
+# Chaque bloc est un fragment : une interaction n'exécute que le fragment concerné,
+# avec les arguments de la dernière exécution complète de la page.
 
+@st.fragment
 def display_current_designations(rencontre_details, designations_combinees_df, designations_df, gc):
     st.subheader("Désignations Actuelles")
     selected_match_numero = rencontre_details['RENCONTRE NUMERO']
@@ -24,7 +45,11 @@ def display_current_designations(rencontre_details, designations_combinees_df, d
         st.info("Aucune désignation existante pour ce match.")
         return
 
-    designations_actuelles_df = designations_combinees_df[designations_combinees_df['RENCONTRE NUMERO'].astype(str) == str(selected_match_numero)]
+    designations_actuelles_df = designations_combinees_df[designations_combinees_df['rencontre_id'] == rencontre_details['rencontre_id']]
+    if 'rencontre_id' in designations_df.columns:
+        designations_manuelles_df = designations_df[designations_df['rencontre_id'] == rencontre_details['rencontre_id']]
+    else:
+        designations_manuelles_df = designations_df
     
     for idx, row in designations_actuelles_df.iterrows():
         col1, col2 = st.columns([4, 1])
@@ -32,74 +57,40 @@ def display_current_designations(rencontre_details, designations_combinees_df, d
             dpt = str(row.get('DPT DE RESIDENCE', '')).zfill(2)[:2]
             st.write(f"- {row.get('NOM', '')} {row.get('PRENOM', '')} ({dpt}) - *{row.get('FONCTION ARBITRE', '')}*")
         with col2:
-            is_manual = any(
-                (str(d_row.get('RENCONTRE NUMERO', '')) == str(selected_match_numero) and
-                 str(d_row.get('NOM', '')) == str(row['NOM']) and
-                 str(d_row.get('PRENOM', '')) == str(row['PRENOM']) and
-                 str(d_row.get('FONCTION ARBITRE', '')) == str(row['FONCTION ARBITRE']))
-                for _, d_row in designations_df.iterrows()
-            )
+            is_manual = not designations_manuelles_df.empty and (
+                (designations_manuelles_df['NOM'] == row['NOM'])
+                & (designations_manuelles_df['PRENOM'] == row['PRENOM'])
+                & (designations_manuelles_df['FONCTION ARBITRE'] == row['FONCTION ARBITRE'])
+            ).any()
             
             button_key = f"delete_{idx}_{selected_match_numero}"
             confirm_key = f"confirm_{button_key}"
 
             if is_manual:
                 if st.session_state.get(confirm_key, False):
-                    if st.button("Vraiment Supprimer ?", key=button_key, type="primary"):
-                        try:
-                            if gc:
-                                spreadsheet = gc.open_by_url(config.DESIGNATIONS_URL)
-                                worksheet = spreadsheet.get_worksheet(0)
-                                records = worksheet.get_all_records()
-                                row_to_delete = -1
-                                for i, record in enumerate(records):
-                                    if (str(record.get('RENCONTRE NUMERO')) == str(selected_match_numero) and
-                                        record.get('NOM') == row['NOM'] and
-                                        record.get('PRENOM') == row['PRENOM'] and
-                                        record.get('FONCTION ARBITRE') == row['FONCTION ARBITRE']):
-                                        row_to_delete = i + 2
-                                        break
-                                
-                                if row_to_delete != -1:
-                                    worksheet.delete_rows(row_to_delete)
-                                    st.toast("Désignation supprimée !", icon="✅")
-                                    st.cache_data.clear()
-                                    st.session_state[confirm_key] = False
-                                    st.rerun()
-                                else:
-                                    st.error("Impossible de trouver la désignation à supprimer.")
-                        except Exception as e:
-                            st.error(f"Erreur lors de la suppression : {e}")
+                    if st.button("Vraiment Supprimer ?", key=f"{button_key}_ok", type="primary"):
+                        if can_write_designations(gc) and supprimer_designation(gc, config.DESIGNATIONS_URL, selected_match_numero, row['NOM'], row['PRENOM'], row['FONCTION ARBITRE']):
+                            st.toast("Désignation supprimée !", icon="✅")
+                            st.cache_data.clear()
+                            st.session_state[confirm_key] = False
+                            st.rerun()
                 else:
-                    if st.button("Supprimer", key=button_key):
-                        st.session_state[confirm_key] = True
-                        st.rerun()
+                    # La confirmation est affichée par la réexécution du fragment qui suit le clic
+                    st.button("Supprimer", key=button_key, on_click=lambda key=confirm_key: st.session_state.update({key: True}))
 
+@st.fragment
 def display_referee_finder(rencontre_details, arbitres_df, club_df, categories_df, competitions_df, dispo_df, designations_df, gc):
     st.subheader("Options de Filtrage")
-    filter_mode = st.radio("Mode de filtrage :", ("Filtres stricts (recommandé)", "Aucun filtre (sauf appartenance club)"), horizontal=True, key=f"filter_{rencontre_details['RENCONTRE NUMERO']}")
+    filter_mode = st.radio("Mode de filtrage :", (STRICT_FILTER, "Aucun filtre (sauf appartenance club)"), horizontal=True, key=f"filter_{rencontre_details['RENCONTRE NUMERO']}")
     st.divider()
     st.subheader("Chercher un Arbitre")
     
     # --- AJOUT DU CHAMP DE RECHERCHE ---
     search_query = st.text_input("Filtrer par nom ou prénom", key=f"search_{rencontre_details['RENCONTRE NUMERO']}")
 
-    # Logique de filtrage
-    locaux_code = extract_club_code_from_team_string(rencontre_details["LOCAUX"])
-    visiteurs_code = extract_club_code_from_team_string(rencontre_details["VISITEURS"])
-    arbitres_filtres = arbitres_df[~arbitres_df[config.COLUMN_MAPPING['arbitres_club_code']].astype(str).isin([str(locaux_code), str(visiteurs_code)])]
-    arbitres_filtres = pd.merge(arbitres_filtres, categories_df, left_on=config.COLUMN_MAPPING['arbitres_categorie'], right_on=config.COLUMN_MAPPING['categories_nom'], how='left')
-    dpt_locaux = get_department_from_club_name_or_code(rencontre_details["LOCAUX"], club_df, config.COLUMN_MAPPING)
-    if filter_mode == "Filtres stricts (recommandé)":
-        comp_info = competitions_df[competitions_df[config.COLUMN_MAPPING['competitions_nom']] == rencontre_details[config.COLUMN_MAPPING['rencontres_competition']]]
-        if not comp_info.empty:
-            comp_info = comp_info.iloc[0]
-            niveau_min, niveau_max = (comp_info['NIVEAU MIN'], comp_info['NIVEAU MAX'])
-            if niveau_min > niveau_max: niveau_min, niveau_max = niveau_max, niveau_min
-            arbitres_filtres = arbitres_filtres[arbitres_filtres[config.COLUMN_MAPPING['categories_niveau']].between(niveau_min, niveau_max)]
-        if dpt_locaux and dpt_locaux != "Non trouvé":
-            arbitres_filtres = arbitres_filtres[arbitres_filtres[config.COLUMN_MAPPING['arbitres_dpt_residence']].astype(str) != str(dpt_locaux)]
-    
+    # Candidats avant recherche : précalculés si la rencontre a été anticipée (voir prefetch_candidates)
+    arbitres_filtres, dpt_locaux = get_candidates(rencontre_details, arbitres_df, categories_df, competitions_df, club_df, dispo_df, filter_mode == STRICT_FILTER)
+
     # --- APPLICATION DU FILTRE DE RECHERCHE ---
     if search_query:
         arbitres_filtres = arbitres_filtres[
@@ -107,87 +98,72 @@ def display_referee_finder(rencontre_details, arbitres_df, club_df, categories_d
             arbitres_filtres[config.COLUMN_MAPPING['arbitres_prenom']].str.contains(search_query, case=False, na=False)
         ]
 
-    arbitres_filtres = arbitres_filtres.sort_values(by=config.COLUMN_MAPPING['categories_niveau'], ascending=True)
+    arbitres_filtres = arbitres_filtres.assign(Rencontres=get_workload_view().totals(arbitres_filtres['licence_id']))
+    tri = st.radio("Classer par :", ("Distance", "Niveau", "Charge"), horizontal=True, key=f"tri_{rencontre_details['RENCONTRE NUMERO']}")
+    tri_colonnes = {
+        "Distance": ['Distance (km)', config.COLUMN_MAPPING['categories_niveau']],
+        "Niveau": [config.COLUMN_MAPPING['categories_niveau'], 'Distance (km)'],
+        "Charge": ['Rencontres', 'Distance (km)'],
+    }[tri]
+    arbitres_filtres = arbitres_filtres.sort_values(by=tri_colonnes, ascending=True, na_position='last')
     if arbitres_filtres.empty:
         st.warning("Aucun arbitre trouvé avec les filtres actuels.")
         return
     st.write(f"{len(arbitres_filtres)} arbitres trouvés")
     roles_actuels = rencontre_details.get('ROLES', [])
     roles_disponibles = [role for role in config.ALL_ROLES if role not in roles_actuels]
+    # Contrôle groupé des doubles désignations du jour (FFR, manuelles, disponibilités)
+    conflits = get_conflict_index().check_candidates(
+        arbitres_filtres[config.COLUMN_MAPPING['arbitres_affiliation']],
+        rencontre_details['rencontres_date_dt'],
+        rencontre_details['RENCONTRE NUMERO'],
+    )
     for _, arbitre in arbitres_filtres.iterrows():
-        with st.container(border=True):
-            col1, col2 = st.columns([2, 1])
-            with col1:
-                est_deja_designe = False
-                if not designations_df.empty and 'NUMERO LICENCE' in designations_df.columns:
-                    deja_designe_df = designations_df[designations_df['NUMERO LICENCE'].astype(str) == str(arbitre[config.COLUMN_MAPPING['arbitres_affiliation']])]
-                    est_deja_designe = not deja_designe_df.empty
-                st.write(f"**{arbitre[config.COLUMN_MAPPING['arbitres_nom']]} {arbitre[config.COLUMN_MAPPING['arbitres_prenom']]}**")
-                st.caption(f"Cat: {arbitre[config.COLUMN_MAPPING['arbitres_categorie']]} (Niv {arbitre[config.COLUMN_MAPPING['categories_niveau']]}) | Dpt: {arbitre[config.COLUMN_MAPPING['arbitres_dpt_residence']]}")
-                if est_deja_designe and 'DATE' in deja_designe_df.columns:
-                    st.info(f"✏️ Déjà une désignation manuelle le {pd.to_datetime(deja_designe_df.iloc[0]['DATE'], dayfirst=True, errors='coerce').strftime('%d/%m')}")
-            with col2:
-                status_text, is_designable = get_arbitre_status_for_date(arbitre[config.COLUMN_MAPPING['arbitres_affiliation']], rencontre_details['rencontres_date_dt'], dispo_df)
-                if is_designable:
-                    st.success(status_text, icon="✅")
-                    if roles_disponibles:
-                        key_suffix = f"{rencontre_details['RENCONTRE NUMERO']}_{arbitre[config.COLUMN_MAPPING['arbitres_affiliation']]}"
-                        selected_role = st.selectbox("Rôle", options=roles_disponibles, key=f"role_{key_suffix}", label_visibility="collapsed")
-                        if st.button("Valider", key=f"designate_{key_suffix}", use_container_width=True):
-                            if gc:
-                                success = enregistrer_designation(gc, config.DESIGNATIONS_URL, rencontre_details, arbitre, dpt_locaux, selected_role)
-                                if success:
-                                    st.toast("Désignation enregistrée !", icon="✅")
-                                    st.cache_data.clear()
-                                    st.rerun()
-                    else:
-                        st.info("Complet")
-                else:
-                    st.warning(status_text, icon="⚠️")
+        conflit = conflits.get(normalize_licence([arbitre[config.COLUMN_MAPPING['arbitres_affiliation']]])[0])
+        display_candidate_card(arbitre, rencontre_details, roles_disponibles, conflit, designations_df, dpt_locaux, gc)
 
-# --- Initialisation & Chargement ---
-st.title("✍️ Outil de Désignation Interactif")
-if 'selected_match' not in st.session_state: st.session_state.selected_match = None
-if 'previous_competition' not in st.session_state: st.session_state.previous_competition = None
-gc = get_gspread_client()
-categories_df = config.load_static_categories()
-competitions_df = config.load_static_competitions()
-rencontres_df = load_data(config.RENCONTRES_URL)
-designations_df = load_designations_from_sheets(gc, config.DESIGNATIONS_URL) if gc else pd.DataFrame()
-if designations_df.empty:
-    designations_df = load_data(config.DESIGNATIONS_URL)
-rencontres_ffr_df = load_data(config.RENCONTRES_FFR_URL)
-dispo_df = load_data(config.DISPO_URL)
-arbitres_df = load_data(config.ARBITRES_URL)
-club_df = load_data(config.CLUB_URL)
-
-# --- Pré-traitement des données ---
-for df in [rencontres_df, rencontres_ffr_df, designations_df]:
-    if "NUMERO RENCONTRE" in df.columns:
-        df.rename(columns={"NUMERO RENCONTRE": "RENCONTRE NUMERO"}, inplace=True)
-    if "RENCONTRE NUMERO" in df.columns:
-        df["RENCONTRE NUMERO"] = df["RENCONTRE NUMERO"].astype(str)
-ffr_cols = {'RENCONTRE NUMERO', 'FONCTION ARBITRE', 'NOM', 'PRENOM', 'DPT DE RESIDENCE'}
-manual_cols = {'RENCONTRE NUMERO', 'FONCTION ARBITRE', 'NOM', 'PRENOM', 'DPT DE RESIDENCE', 'NUMERO LICENCE', 'DATE'}
-if 'Nom' in rencontres_ffr_df.columns:
-    rencontres_ffr_df.rename(columns={"Nom": "NOM"}, inplace=True)
-if ffr_cols.issubset(rencontres_ffr_df.columns) and manual_cols.issubset(designations_df.columns):
-    designations_combinees_df = pd.concat([rencontres_ffr_df[list(ffr_cols)], designations_df[list(manual_cols)]], ignore_index=True)
-else:
-    designations_combinees_df = pd.DataFrame(columns=list(ffr_cols))
-if 'rencontres_date_dt' not in rencontres_df.columns: rencontres_df['rencontres_date_dt'] = pd.to_datetime(rencontres_df["DATE EFFECTIVE"], errors='coerce')
-if 'DATE_dt' not in dispo_df.columns: dispo_df['DATE_dt'] = pd.to_datetime(dispo_df['DATE'], errors='coerce')
-if 'RENCONTRE NUMERO' in designations_combinees_df.columns and 'FONCTION ARBITRE' in designations_combinees_df.columns:
-    roles_par_match = designations_combinees_df.groupby('RENCONTRE NUMERO')['FONCTION ARBITRE'].apply(list).reset_index()
-    roles_par_match.rename(columns={'FONCTION ARBITRE': 'ROLES'}, inplace=True)
-    rencontres_df = pd.merge(rencontres_df, roles_par_match, on='RENCONTRE NUMERO', how='left')
-    rencontres_df['ROLES'] = rencontres_df['ROLES'].apply(lambda x: x if isinstance(x, list) else [])
-else:
-    rencontres_df['ROLES'] = [[] for _ in range(len(rencontres_df))]
+@st.fragment
+def display_candidate_card(arbitre, rencontre_details, roles_disponibles, conflit, designations_df, dpt_locaux, gc):
+    """Fiche d'un candidat : le choix du rôle ne réexécute que cette fiche."""
+    with st.container(border=True):
+        col1, col2 = st.columns([2, 1])
+        with col1:
+            est_deja_designe = False
+            if not designations_df.empty and 'licence_id' in designations_df.columns and arbitre['licence_id'] != MISSING:
+                deja_designe_df = designations_df[designations_df['licence_id'] == arbitre['licence_id']]
+                est_deja_designe = not deja_designe_df.empty
+            st.write(f"**{arbitre[config.COLUMN_MAPPING['arbitres_nom']]} {arbitre[config.COLUMN_MAPPING['arbitres_prenom']]}**")
+            distance = f" | 🚗 ~{arbitre['Distance (km)']:.0f} km" if pd.notna(arbitre['Distance (km)']) else ""
+            objectif = pd.to_numeric(arbitre.get(TARGET_COLUMN), errors='coerce')
+            charge = f" | 📊 {arbitre['Rencontres']}" + (f"/{objectif:.0f}" if pd.notna(objectif) else "") + " matchs"
+            st.caption(f"Cat: {arbitre[config.COLUMN_MAPPING['arbitres_categorie']]} (Niv {arbitre[config.COLUMN_MAPPING['categories_niveau']]}) | Dpt: {arbitre[config.COLUMN_MAPPING['arbitres_dpt_residence']]}{distance}{charge}")
+            if est_deja_designe and 'DATE' in deja_designe_df.columns:
+                st.info(f"✏️ Déjà une désignation manuelle le {pd.to_datetime(deja_designe_df.iloc[0]['DATE'], dayfirst=True, errors='coerce').strftime('%d/%m')}")
+        with col2:
+            status_text, is_designable = arbitre['Statut'], arbitre['Désignable']
+            if conflit and is_designable:
+                status_text, is_designable = f"❌ {conflit}", False
+            if is_designable:
+                st.success(status_text, icon="✅")
+                if roles_disponibles:
+                    key_suffix = f"{rencontre_details['RENCONTRE NUMERO']}_{arbitre[config.COLUMN_MAPPING['arbitres_affiliation']]}"
+                    selected_role = st.selectbox("Rôle", options=roles_disponibles, key=f"role_{key_suffix}", label_visibility="collapsed")
+                    if st.button("Valider", key=f"designate_{key_suffix}", use_container_width=True):
+                        if can_write_designations(gc):
+                            success = enregistrer_designation(gc, config.DESIGNATIONS_URL, rencontre_details, arbitre, dpt_locaux, selected_role)
+                            if success:
+                                st.toast("Désignation enregistrée !", icon="✅")
+                                st.cache_data.clear()
+                                # Les rôles pourvus changent : toute la page est réexécutée
+                                st.rerun(scope="app")
+                else:
+                    st.info("Complet")
+            else:
+                st.warning(status_text, icon="⚠️")
 
-# --- Interface Principale ---
-left_col, right_col = st.columns([2, 3])
-with left_col:
+@st.fragment
+def display_match_list(rencontres_df, competitions_df):
+    """Liste des rencontres : filtrer les compétitions ne réexécute que la liste."""
     st.header("🗓️ Liste des Rencontres")
     competition_options = sorted(competitions_df[config.COLUMN_MAPPING['competitions_nom']].unique().tolist())
     # Filtre par défaut des compétitions
@@ -235,38 +211,130 @@ with left_col:
 
     # La logique de réinitialisation doit maintenant comparer des listes
     if st.session_state.get('previous_competition') != selected_competitions:
+        match_selectionne = st.session_state.selected_match is not None
         st.session_state.selected_match = None
         st.session_state.previous_competition = selected_competitions
+        if match_selectionne:
+            st.rerun(scope="app")
 
     if selected_competitions:
         rencontres_filtrees_df = rencontres_df[rencontres_df[config.COLUMN_MAPPING['rencontres_competition']].isin(selected_competitions)]
     else:
         rencontres_filtrees_df = rencontres_df
     rencontres_filtrees_df = rencontres_filtrees_df.sort_values(by=['COMPETITION NOM', 'rencontres_date_dt'])
-    unique_matches_df = rencontres_filtrees_df.drop_duplicates(subset=['RENCONTRE NUMERO'])
-    if unique_matches_df.empty:
-        st.warning("Aucune rencontre trouvée.")
+    unique_matches_df = rencontres_filtrees_df.drop_duplicates(subset=['rencontre_id'])
+    # Ordre affiché, pour anticiper les rencontres suivantes (voir prefetch_candidates)
+    st.session_state.match_order = unique_matches_df['rencontre_id'].tolist()
+    with timed("rendu liste des rencontres", "rendu"):
+        if unique_matches_df.empty:
+            st.warning("Aucune rencontre trouvée.")
+        else:
+            for _, rencontre in unique_matches_df.iterrows():
+                with st.container(border=True):
+                    st.caption(rencontre[config.COLUMN_MAPPING['rencontres_competition']])
+                    st.subheader(f"{rencontre[config.COLUMN_MAPPING['rencontres_locaux']]} vs {rencontre[config.COLUMN_MAPPING['rencontres_visiteurs']]}")
+                    st.caption(f"{rencontre['rencontres_date_dt'].strftime('%d/%m/%Y')}")
+                    roles = rencontre.get('ROLES', [])
+                    if roles:
+                        icon_str = " ".join([config.ROLE_ICONS.get(role, config.ROLE_ICONS['default']) for role in roles])
+                        st.markdown(f"**Rôles pourvus :** {icon_str}")
+                    if st.button("Sélectionner", key=f"select_{rencontre['RENCONTRE NUMERO']}"):
+                        # Le panneau de droite change : toute la page est réexécutée
+                        st.session_state.selected_match = rencontre['rencontre_id']
+                        st.rerun(scope="app")
+
+FFR_COLS = ['rencontre_id', 'RENCONTRE NUMERO', 'FONCTION ARBITRE', 'NOM', 'PRENOM', 'DPT DE RESIDENCE']
+MANUAL_COLS = FFR_COLS + ['NUMERO LICENCE', 'DATE']
+
+@st.cache_resource(max_entries=4)
+def build_match_roles(_rencontres_df, _rencontres_ffr_df, _designations_df, cache_key, _artifact_key):
+    """
+    Désignations FFR et manuelles combinées, et rencontres avec la liste des rôles pourvus (ROLES).
+    Calculé une fois par version des sources et contenu des désignations manuelles (`cache_key`),
+    ou relu sur disque pour les mêmes contenus (`_artifact_key`, démarrage à chaud) ;
+    les DataFrames retournés sont partagés et ne doivent pas être modifiés.
+    """
+    return warm_start("roles_par_match", _artifact_key, lambda: _match_roles(_rencontres_df, _rencontres_ffr_df, _designations_df))
+
+def _match_roles(_rencontres_df, _rencontres_ffr_df, _designations_df):
+    if set(FFR_COLS).issubset(_rencontres_ffr_df.columns) and set(MANUAL_COLS).issubset(_designations_df.columns):
+        designations_combinees_df = pd.concat([_rencontres_ffr_df[FFR_COLS], _designations_df[MANUAL_COLS]], ignore_index=True)
     else:
-        for _, rencontre in unique_matches_df.iterrows():
-            with st.container(border=True):
-                st.caption(rencontre[config.COLUMN_MAPPING['rencontres_competition']])
-                st.subheader(f"{rencontre[config.COLUMN_MAPPING['rencontres_locaux']]} vs {rencontre[config.COLUMN_MAPPING['rencontres_visiteurs']]}")
-                st.caption(f"{rencontre['rencontres_date_dt'].strftime('%d/%m/%Y')}")
-                roles = rencontre.get('ROLES', [])
-                if roles:
-                    icon_str = " ".join([config.ROLE_ICONS.get(role, config.ROLE_ICONS['default']) for role in roles])
-                    st.markdown(f"**Rôles pourvus :** {icon_str}")
-                st.button("Sélectionner", key=f"select_{rencontre['RENCONTRE NUMERO']}", on_click=lambda num=rencontre['RENCONTRE NUMERO']: st.session_state.update(selected_match=num))
+        designations_combinees_df = pd.DataFrame(columns=FFR_COLS)
+    rencontres_df = _rencontres_df
+    if 'rencontre_id' in rencontres_df.columns and not designations_combinees_df.empty:
+        roles_par_match = designations_combinees_df[designations_combinees_df['rencontre_id'] != MISSING].groupby('rencontre_id')['FONCTION ARBITRE'].apply(list).reset_index()
+        roles_par_match.rename(columns={'FONCTION ARBITRE': 'ROLES'}, inplace=True)
+        rencontres_df = pd.merge(rencontres_df, roles_par_match, on='rencontre_id', how='left')
+        rencontres_df['ROLES'] = rencontres_df['ROLES'].apply(lambda x: x if isinstance(x, list) else [])
+    else:
+        rencontres_df = rencontres_df.assign(ROLES=[[] for _ in range(len(rencontres_df))])
+    return rencontres_df, designations_combinees_df
+
+# --- Initialisation & Chargement ---
+begin_run("Designation")
+st.title("✍️ Outil de Désignation Interactif")
+if 'selected_match' not in st.session_state: st.session_state.selected_match = None
+if 'previous_competition' not in st.session_state: st.session_state.previous_competition = None
+with timed("chargement des données", "chargement"):
+    gc = get_gspread_client()
+    categories_df = config.load_static_categories()
+    competitions_df = config.load_static_competitions()
+    rencontres_df = load_dataset("rencontres", weekends=config.STARTUP_WEEKENDS)
+    designations_df = load_designations(gc)
+    rencontres_ffr_df = load_dataset("rencontres_ffr")
+    arbitres_df = load_dataset("arbitres")
+    club_df = load_dataset("clubs")
+
+# --- Pré-traitement des données ---
+with timed("pré-traitement et rôles par match", "traitement"):
+    # Jointures sur les identifiants entiers rencontre_id (config.KEY_COLUMNS)
+    for df in [rencontres_df, rencontres_ffr_df, designations_df]:
+        if "NUMERO RENCONTRE" in df.columns:
+            df.rename(columns={"NUMERO RENCONTRE": "RENCONTRE NUMERO"}, inplace=True)
+    if 'Nom' in rencontres_ffr_df.columns:
+        rencontres_ffr_df.rename(columns={"Nom": "NOM"}, inplace=True)
+    if 'rencontres_date_dt' not in rencontres_df.columns: rencontres_df['rencontres_date_dt'] = pd.to_datetime(rencontres_df["DATE EFFECTIVE"], errors='coerce')
+    contenus = (frame_fingerprint(rencontres_df.reindex(columns=['rencontre_id'])), frame_fingerprint(designations_df.reindex(columns=MANUAL_COLS)))
+    digests = data_digest("rencontres", "rencontres_ffr")
+    rencontres_df, designations_combinees_df = build_match_roles(
+        rencontres_df, rencontres_ffr_df, designations_df,
+        (data_version("rencontres", "rencontres_ffr"),) + contenus,
+        digests and (digests,) + contenus,
+    )
+
+# --- Interface Principale ---
+left_col, right_col = st.columns([2, 3])
+with left_col:
+    display_match_list(rencontres_df, competitions_df)
 with right_col:
-    if not st.session_state.selected_match:
+    if st.session_state.selected_match is None:
         st.info("⬅️ Sélectionnez un match dans la liste de gauche pour commencer.")
     else:
-        selected_match_numero = st.session_state.selected_match
-        rencontre_details = rencontres_df[rencontres_df['RENCONTRE NUMERO'] == selected_match_numero].iloc[0]
+        rencontre_details = rencontres_df[rencontres_df['rencontre_id'] == st.session_state.selected_match].iloc[0]
         st.header(f"🎯 {rencontre_details[config.COLUMN_MAPPING['rencontres_locaux']]} vs {rencontre_details[config.COLUMN_MAPPING['rencontres_visiteurs']]}")
         if st.button("🔄 Rafraîchir", help="Met à jour les données de désignation"):
             st.cache_data.clear()
+            request_data_refresh()
             st.rerun()
-        display_current_designations(rencontre_details, designations_combinees_df, designations_df, gc)
+        with timed("rendu désignations actuelles", "rendu"):
+            display_current_designations(rencontre_details, designations_combinees_df, designations_df, gc)
         st.divider()
-        display_referee_finder(rencontre_details, arbitres_df, club_df, categories_df, competitions_df, dispo_df, designations_df, gc)
+        with timed("rendu recherche d'arbitres", "rendu"):
+            # Seules les disponibilités de la semaine de la rencontre sont parcourues
+            dispo_semaine = get_partitions("dispo").for_date(rencontre_details['rencontres_date_dt'])
+            display_referee_finder(rencontre_details, arbitres_df, club_df, categories_df, competitions_df, dispo_semaine, designations_df, gc)
+        # Les désignateurs parcourent la liste dans l'ordre : candidats des rencontres suivantes calculés en arrière-plan
+        match_order = st.session_state.get('match_order', [])
+        if config.CANDIDATE_PREFETCH_COUNT > 0 and st.session_state.selected_match in match_order:
+            position = match_order.index(st.session_state.selected_match)
+            suivantes = match_order[position + 1:position + 1 + config.CANDIDATE_PREFETCH_COUNT]
+            strict = st.session_state.get(f"filter_{rencontre_details['RENCONTRE NUMERO']}", STRICT_FILTER) == STRICT_FILTER
+            prefetch_candidates(
+                rencontres_df[rencontres_df['rencontre_id'].isin(suivantes)].drop_duplicates(subset=['rencontre_id']),
+                arbitres_df, categories_df, competitions_df, club_df, strict,
+            )
+
+display_designations_sync_status()
+display_data_freshness()
+display_timing_panel()
@@ -1,12 +1,15 @@
+from instrumentation import begin_run, timed
 import streamlit as st
 import pandas as pd
 
 # Importations centralisées
-from utils import load_data
-import config
+from utils import display_timing_panel, load_dataset
+
+begin_run("Designations Ovale")
 
 # --- Chargement des données ---
-rencontres_ffr_df = load_data(config.RENCONTRES_FFR_URL)
+with timed("chargement des données", "chargement"):
+    rencontres_ffr_df = load_dataset("rencontres_ffr")
 
 # --- Application ---
 st.title("✍️ Designations Ovale")
@@ -43,4 +46,6 @@ if not rencontres_ffr_df.empty:
     st.dataframe(rencontres_ffr_df[colonnes_existantes], hide_index=True, use_container_width=True)
 
 else:
-    st.warning("Aucune donnée de rencontre FFR n'a pu être chargée.")
\ No newline at end of file
+    st.warning("Aucune donnée de rencontre FFR n'a pu être chargée.")
+
+display_timing_panel()
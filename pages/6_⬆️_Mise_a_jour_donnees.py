@@ -1,3 +1,4 @@
+from instrumentation import begin_run, timed
 import streamlit as st
 import pandas as pd
 import re
@@ -7,10 +8,16 @@ import config
 from utils import (
     get_gspread_client,
     update_google_sheet,
-    clear_sheet_except_header,
+    remplacer_designations,
+    effacer_designations,
     load_data,
+    request_data_refresh,
     get_gspread_client,
+    display_timing_panel,
 )
+from validation import ERROR, validate_upload
+
+begin_run("Mise à jour des données")
 
 def get_edit_url_from_export_url(export_url):
     """Convertit une URL d'export Google Sheet en URL d'édition."""
@@ -33,6 +40,16 @@ SHEET_URLS = {
     "Rencontres-Ovale-023": get_edit_url_from_export_url(config.RENCONTRES_FFR_URL),
     "Designations": get_edit_url_from_export_url(config.DESIGNATIONS_URL),
 }
+# Source rechargée en arrière-plan après la mise à jour (les désignations sont lues à la demande)
+SHEET_SOURCES = {
+    "Rencontres-024": "rencontres",
+    "Disponibilites-022": "dispo",
+    "Arbitres-052": "arbitres",
+    "Clubs-007": "clubs",
+    "Rencontres-Ovale-023": "rencontres_ffr",
+}
+# Source validée avant publication (voir validation.py)
+SHEET_VALIDATION = {**SHEET_SOURCES, "Designations": "designations"}
 
 # Connexion au client gspread
 gc = get_gspread_client()
@@ -57,13 +74,37 @@ if gc:
                 st.success("Fichier Excel téléchargé et lu avec succès !")
                 st.dataframe(df_uploaded.head()) # Afficher un aperçu des données
 
-                if st.button(f"Confirmer la mise à jour de '{data_type}'"):
+                # --- Validation avant publication ---
+                with timed("validation du classeur", "traitement"):
+                    rapport = validate_upload(SHEET_VALIDATION[data_type], df_uploaded)
+                if rapport.violations.empty:
+                    st.success(f"Classeur valide : {len(df_uploaded)} lignes contrôlées.")
+                else:
+                    violations = rapport.violations
+                    nb_erreurs = (violations["Niveau"] == ERROR).sum()
+                    if rapport.blocking:
+                        st.error(f"{nb_erreurs} anomalie(s) bloquante(s) : corrigez le fichier avant de le publier.")
+                    else:
+                        st.warning("Anomalies non bloquantes : vérifiez-les avant de publier.")
+                    st.dataframe(violations, hide_index=True, use_container_width=True)
+                    if not rapport.rows.empty:
+                        with st.expander(f"Lignes en défaut ({len(rapport.rows)})"):
+                            st.dataframe(rapport.rows.head(500), hide_index=True, use_container_width=True)
+
+                if st.button(f"Confirmer la mise à jour de '{data_type}'", disabled=rapport.blocking):
                     with st.spinner(f"Mise à jour de la feuille '{data_type}' en cours..."):
-                        if update_google_sheet(gc, selected_sheet_url, df_uploaded):
+                        if data_type == "Designations":
+                            # Base locale remplacée si elle est activée, puis publiée vers la feuille (voir remplacer_designations)
+                            mise_a_jour = remplacer_designations(gc, selected_sheet_url, df_uploaded)
+                        else:
+                            mise_a_jour = update_google_sheet(gc, selected_sheet_url, df_uploaded)
+                        if mise_a_jour:
                             st.success("Mise à jour terminée ! Les données ont été actualisées dans Google Sheets.")
                             
                             # Vider le cache de la fonction de chargement des données
                             load_data.clear()
+                            if data_type in SHEET_SOURCES:
+                                request_data_refresh(SHEET_SOURCES[data_type])
                             
                             # Invalider le session_state pour forcer le rechargement
                             st.session_state.data_loaded = False
@@ -83,7 +124,7 @@ if gc:
     if st.button("Effacer les données de Désignations"):
         designations_sheet_url = SHEET_URLS["Designations"]
         with st.spinner("Effacement des données en cours..."):
-            if clear_sheet_except_header(gc, designations_sheet_url):
+            if effacer_designations(gc, designations_sheet_url):
                 st.success("Données de Désignations effacées avec succès !")
                 load_data.clear()
                 st.session_state.data_loaded = False
@@ -96,3 +137,5 @@ else:
     st.warning("Impossible de se connecter à Google Sheets. Veuillez vérifier la configuration.")
 
 st.divider()
+
+display_timing_panel()
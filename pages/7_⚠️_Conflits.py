@@ -0,0 +1,59 @@
+from instrumentation import begin_run, timed
+import streamlit as st
+import pandas as pd
+from datetime import datetime
+
+from utils import display_data_freshness, display_timing_panel, get_conflict_index
+
+begin_run("Conflits")
+
+st.title("⚠️ Conflits de Désignation")
+st.markdown("Arbitres désignés plusieurs fois le même jour entre les désignations FFR (RS_OVALE-023), les désignations manuelles et la colonne DESIGNATION des disponibilités.")
+
+with timed("index des conflits", "traitement"):
+    conflits_df = get_conflict_index().conflicts()
+
+if conflits_df.empty:
+    st.success("Aucun conflit détecté.")
+else:
+    # --- Filtres ---
+    st.header("Filtres")
+    col1, col2 = st.columns(2)
+    a_venir = col1.checkbox("Uniquement les dates à venir", value=True)
+    motifs = col2.multiselect("Motif", options=sorted(conflits_df["MOTIF"].unique()), default=[])
+
+    filtered_df = conflits_df
+    if a_venir:
+        filtered_df = filtered_df[filtered_df["DATE"] >= pd.to_datetime(datetime.now().date())]
+    if motifs:
+        filtered_df = filtered_df[filtered_df["MOTIF"].isin(motifs)]
+
+    # --- Affichage ---
+    col1, col2 = st.columns(2)
+    col1.metric(label="⚠️ Conflits", value=len(filtered_df))
+    col2.metric(label="👤 Arbitres concernés", value=filtered_df["LICENCE"].nunique())
+
+    display_df = filtered_df.rename(columns={
+        "LICENCE": "Licence",
+        "NOM": "Nom",
+        "PRENOM": "Prénom",
+        "RENCONTRES": "Rencontres",
+        "SOURCES": "Sources",
+        "MOTIF": "Motif",
+    })
+    with timed("rendu conflits", "rendu"):
+        st.dataframe(
+            display_df,
+            column_config={"DATE": st.column_config.DateColumn("Date", format="DD/MM/YYYY")},
+            use_container_width=True,
+            hide_index=True,
+        )
+    st.download_button(
+        "📥 Télécharger (CSV)",
+        display_df.to_csv(index=False, sep=";").encode("utf-8-sig"),
+        file_name="conflits_designations.csv",
+        mime="text/csv",
+    )
+
+display_data_freshness()
+display_timing_panel()
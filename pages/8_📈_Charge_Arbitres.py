@@ -0,0 +1,83 @@
+from instrumentation import begin_run, timed
+import streamlit as st
+
+import config
+from utils import display_data_freshness, display_timing_panel, get_workload_view, load_dataset
+
+begin_run("Charge Arbitres")
+
+with timed("chargement des données", "chargement"):
+    arbitres_df = load_dataset("arbitres")
+
+st.title("📈 Charge des Arbitres")
+st.markdown("Rencontres arbitrées par arbitre (désignations FFR et manuelles), par rôle, comparées au nombre de matchs à arbitrer.")
+
+if arbitres_df.empty or 'licence_id' not in arbitres_df.columns:
+    st.warning("Impossible de charger les données des arbitres.")
+else:
+    with timed("tableau de charge", "traitement"):
+        workload = get_workload_view()
+        charge_df = workload.table(arbitres_df)
+
+    # --- Filtres ---
+    st.header("Filtres")
+    col1, col2 = st.columns(2)
+    categories = sorted(charge_df[config.COLUMN_MAPPING['arbitres_categorie']].dropna().astype(str).unique())
+    selected_categories = col1.multiselect("Catégorie", options=categories, default=[])
+    situation = col2.radio("Situation", ("Tous", "Sous l'objectif", "Objectif atteint", "Sans désignation"), horizontal=True)
+
+    filtered_df = charge_df
+    if selected_categories:
+        filtered_df = filtered_df[filtered_df[config.COLUMN_MAPPING['arbitres_categorie']].astype(str).isin(selected_categories)]
+    if situation == "Sous l'objectif":
+        filtered_df = filtered_df[filtered_df["Réalisation"] < 1]
+    elif situation == "Objectif atteint":
+        filtered_df = filtered_df[filtered_df["Réalisation"] >= 1]
+    elif situation == "Sans désignation":
+        filtered_df = filtered_df[filtered_df["Rencontres"] == 0]
+
+    # --- Indicateurs ---
+    col1, col2, col3 = st.columns(3)
+    col1.metric(label="👤 Arbitres", value=len(filtered_df))
+    col2.metric(label="📅 Rencontres arbitrées", value=int(filtered_df["Rencontres"].sum()))
+    col3.metric(label="📊 Moyenne par arbitre", value=f"{filtered_df['Rencontres'].mean():.1f}" if len(filtered_df) else "-")
+
+    with timed("rendu tableau de charge", "rendu"):
+        st.dataframe(
+            filtered_df.drop(columns=["licence_id"]).sort_values(["Rencontres", config.COLUMN_MAPPING['arbitres_nom']], ascending=[False, True]),
+            column_config={
+                "Objectif": st.column_config.NumberColumn(format="%d"),
+                "Réalisation": st.column_config.ProgressColumn("Réalisation", format="percent", min_value=0, max_value=1),
+            },
+            hide_index=True,
+            use_container_width=True,
+        )
+
+    # --- Détail d'un arbitre ---
+    st.divider()
+    st.header("Détail par arbitre")
+    options = filtered_df.sort_values([config.COLUMN_MAPPING['arbitres_nom'], config.COLUMN_MAPPING['arbitres_prenom']])
+    labels = dict(zip(
+        options["licence_id"],
+        options[config.COLUMN_MAPPING['arbitres_nom']].astype(str) + " " + options[config.COLUMN_MAPPING['arbitres_prenom']].astype(str),
+    ))
+    licence_id = st.selectbox("Arbitre", options=list(labels), format_func=labels.get, index=None, placeholder="Choisissez un arbitre")
+    if licence_id is not None:
+        col1, col2 = st.columns(2)
+        with col1:
+            st.subheader("Par compétition")
+            par_competition = workload.by_competition(licence_id)
+            if par_competition.empty:
+                st.info("Aucune désignation.")
+            else:
+                st.dataframe(par_competition.rename("Rencontres").rename_axis("Compétition").reset_index(), hide_index=True, use_container_width=True)
+        with col2:
+            st.subheader("Par mois")
+            par_mois = workload.by_month(licence_id)
+            if par_mois.empty:
+                st.info("Aucune désignation.")
+            else:
+                st.bar_chart(par_mois.rename("Rencontres"))
+
+display_data_freshness()
+display_timing_panel()
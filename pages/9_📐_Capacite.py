@@ -0,0 +1,69 @@
+from instrumentation import begin_run, timed
+import streamlit as st
+import pandas as pd
+
+from capacity import shortages
+from partitions import week_start, weekend_label
+from utils import display_data_freshness, display_timing_panel, get_capacity_plan
+
+begin_run("Capacité")
+
+st.title("📐 Capacité par Week-end")
+st.markdown(
+    "Postes d'arbitres à pourvoir (rencontres × rôles) face aux arbitres disponibles et éligibles, "
+    "par week-end et par bande de niveaux des compétitions. Un arbitre compte dans chaque bande qui accepte son niveau."
+)
+
+with timed("plan de charge", "traitement"):
+    plan = get_capacity_plan()
+
+if plan.empty:
+    st.warning("Aucune rencontre à désigner.")
+else:
+    # --- Filtres ---
+    st.header("Filtres")
+    semaine_courante = week_start(pd.Timestamp.now())
+    col1, col2 = st.columns(2)
+    afficher_passes = col1.checkbox("Inclure les week-ends passés", value=False)
+    bandes = col2.multiselect("Bandes de niveaux", options=plan["Bande"].unique().tolist(), default=[])
+    plan_affiche = plan if afficher_passes else plan[plan["semaine"] >= semaine_courante]
+    if bandes:
+        plan_affiche = plan_affiche[plan_affiche["Bande"].isin(bandes)]
+
+    # --- Pénuries à venir ---
+    st.header("⚠️ Pénuries à venir")
+    penuries = shortages(plan_affiche, since=semaine_courante)
+    if penuries.empty:
+        st.success("Aucune pénurie prévue sur les week-ends à venir.")
+    else:
+        for _, ligne in penuries.iterrows():
+            st.error(
+                f"**{weekend_label(ligne['semaine'])}** — {ligne['Bande']} : {-ligne['Marge']} arbitre(s) manquant(s) "
+                f"({ligne['À pourvoir']} postes à pourvoir, {ligne['Libres']} arbitres libres sur {ligne['Disponibles']} disponibles)"
+            )
+
+    # --- Marge par week-end et bande ---
+    st.header("Marge par Week-end")
+    if plan_affiche.empty:
+        st.info("Aucun week-end à afficher.")
+    else:
+        with timed("rendu plan de charge", "rendu"):
+            marges = plan_affiche.pivot_table(index="semaine", columns="Bande", values="Marge", aggfunc="sum")
+            marges.index = marges.index.map(weekend_label)
+            marges.index.name = "Week-end"
+            st.dataframe(
+                marges.style.format("{:.0f}", na_rep="").map(lambda marge: "background-color: #f8d7da" if pd.notna(marge) and marge < 0 else ""),
+                use_container_width=True,
+            )
+
+            st.subheader("Détail")
+            detail = plan_affiche.assign(**{"Week-end": plan_affiche["semaine"].map(weekend_label)})
+            detail = detail[["Week-end"] + [col for col in plan_affiche.columns if col not in ("semaine", "NIVEAU MIN", "NIVEAU MAX")]]
+            st.dataframe(
+                detail.style.map(lambda marge: "background-color: #f8d7da" if marge < 0 else "", subset=["Marge"]),
+                hide_index=True,
+                use_container_width=True,
+            )
+
+display_data_freshness()
+display_timing_panel()
@@ -0,0 +1,76 @@
+"""
+Partitionnement hebdomadaire des rencontres et des disponibilités.
+Chaque ligne est rangée dans la semaine ISO (lundi -> dimanche) de sa date ;
+une requête par date ou par plage ne parcourt que les semaines concernées
+au lieu de la saison entière.
+Ce module n'importe pas Streamlit.
+"""
+from datetime import datetime
+
+import pandas as pd
+
+
+def week_start(date):
+    """Lundi (à minuit) de la semaine ISO contenant `date` : clé de partition."""
+    date = pd.Timestamp(date).normalize()
+    return date - pd.Timedelta(days=date.weekday())
+
+
+def weekend_label(week):
+    """Libellé d'une semaine pour l'affichage : « 15-16/03/2025 » (samedi-dimanche)."""
+    saturday = week + pd.Timedelta(days=5)
+    sunday = week + pd.Timedelta(days=6)
+    return f"{saturday.strftime('%d')}-{sunday.strftime('%d/%m/%Y')}"
+
+
+class WeeklyPartitions:
+    """
+    DataFrame découpé par semaine ISO sur la colonne de dates `date_column`.
+    Les lignes sans date ne figurent dans aucune partition.
+    Les partitions sont partagées : elles ne doivent pas être modifiées en place.
+    """
+
+    def __init__(self, df, date_column):
+        self.date_column = date_column
+        self._empty = df.iloc[0:0]
+        if df.empty or date_column not in df.columns:
+            self._partitions = {}
+            return
+        dates = pd.to_datetime(df[date_column], errors='coerce')
+        weeks = (dates - pd.to_timedelta(dates.dt.weekday, unit="D")).dt.normalize()
+        self._partitions = {week: part for week, part in df.groupby(weeks, sort=True)}
+
+    def weeks(self):
+        """Clés des partitions (lundis), dans l'ordre chronologique."""
+        return list(self._partitions)
+
+    def week(self, week):
+        return self._partitions.get(pd.Timestamp(week), self._empty)
+
+    def for_date(self, date):
+        """Lignes de la semaine contenant `date` (ex : le week-end d'une rencontre)."""
+        if pd.isna(date):
+            return self._empty
+        return self.week(week_start(date))
+
+    def select(self, weeks):
+        """Lignes des semaines `weeks` (clés de partition)."""
+        parts = [self._partitions[week] for week in weeks if week in self._partitions]
+        return pd.concat(parts) if parts else self._empty
+
+    def between(self, start, end):
+        """Lignes dont la date est comprise entre `start` et `end` (inclus), semaines hors plage ignorées."""
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        selected = self.select([week for week in self._partitions if week_start(start) <= week <= end])
+        if selected.empty:
+            return selected
+        dates = pd.to_datetime(selected[self.date_column], errors='coerce')
+        return selected[(dates >= start) & (dates <= end)]
+
+    def upcoming_weeks(self, count, today=None):
+        """Semaine courante et les `count - 1` suivantes ayant des données."""
+        current = week_start(today or datetime.now())
+        return [week for week in self._partitions if week >= current][:count]
+
+    def upcoming(self, count, today=None):
+        return self.select(self.upcoming_weeks(count, today))
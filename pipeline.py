@@ -0,0 +1,544 @@
+"""
+Traitements de données des pages, sans Streamlit : statut des arbitres pour un
+week-end, recherche des clubs, récapitulatif par rencontre, liste des rencontres,
+grille des disponibilités, fusion des désignations FFR, déplacements et listes de
+candidats. utils.py les expose aux pages (mise en cache, affichage des erreurs) ;
+cli.py les exécute hors de toute session (tâches planifiées, profilage).
+Ce module n'importe pas Streamlit.
+"""
+import hashlib
+import re
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+import config
+from distances import departement_from_cp
+from instrumentation import instrumented
+from keys import MISSING
+from partitions import weekend_label
+
+
+# --- Désignations ---
+
+def designation_record(rencontre_details, arbitre_details, dpt_terrain, role):
+    """Désignation manuelle à enregistrer : dict aux colonnes de config.DESIGNATIONS_COLUMNS."""
+    nouvelle_ligne = [
+        rencontre_details.get("rencontres_date_dt", pd.NaT).strftime("%d/%m/%Y"),
+        role,
+        arbitre_details.get("Nom", "N/A"),
+        arbitre_details.get("Prénom", "N/A"),
+        arbitre_details.get("Département de Résidence", "N/A"),
+        arbitre_details.get("Numéro Affiliation", "N/A"), # Ajout du numéro de licence
+        rencontre_details.get("Structure Organisatrice Nom", "N/A"),
+        rencontre_details.get("COMPETITION NOM", "N/A"),
+        rencontre_details.get("RENCONTRE NUMERO", "N/A"),
+        rencontre_details.get("LOCAUX", "N/A"),
+        rencontre_details.get("VISITEURS", "N/A"),
+        dpt_terrain
+    ]
+    return dict(zip(config.DESIGNATIONS_COLUMNS, nouvelle_ligne))
+
+
+# --- Statut des arbitres ---
+
+def get_arbitre_status_for_date(licence_id, match_date, dispo_df):
+    """Statut de l'arbitre `licence_id` (identifiant encodé, voir keys.py) pour le week-end de la rencontre."""
+    if licence_id == MISSING: return "🤷‍♂️ Non renseignée", False
+    start_of_week = match_date - timedelta(days=match_date.weekday())
+    saturday = start_of_week + timedelta(days=5)
+    sunday = start_of_week + timedelta(days=6)
+    weekend_dispo = dispo_df[(dispo_df['licence_id'] == licence_id) & (dispo_df['DATE_dt'].dt.date >= saturday.date()) & (dispo_df['DATE_dt'].dt.date <= sunday.date())]
+    if weekend_dispo.empty: return "🤷‍♂️ Non renseignée", False
+    match_day_status = weekend_dispo[weekend_dispo['DATE_dt'].dt.date == match_date.date()]
+    if not match_day_status.empty:
+        designation_val = match_day_status.iloc[0].get('DESIGNATION')
+        designation_str = str(designation_val).strip()
+        if pd.notna(designation_val) and designation_str != '' and designation_str != '0': return f"❌ Déjà désigné(e) sur : {designation_val}", False
+    available_keywords = ['oui', 'we', 'samedi', 'dimanche']
+    is_available = any(any(keyword in str(row.get('DISPONIBILITE', '')).lower() for keyword in available_keywords) for index, row in weekend_dispo.iterrows())
+    if is_available: return "✅ Disponible", True
+    else: return f"❓ Non disponible ({weekend_dispo.iloc[0].get('DISPONIBILITE', '')})", False
+
+
+# --- Clubs ---
+
+def extract_club_name_from_team_string(team_string):
+    """
+    Extrait le nom du club d'une chaîne d'équipe (sans le code entre parenthèses)
+    Ex: "STADE ROCHELAIS (SRO)" -> "STADE ROCHELAIS"
+    """
+    match = re.search(r'^(.*?)\s*(\(\w+\))?$', str(team_string))
+    if match:
+        return match.group(1).strip()
+    return str(team_string).strip()
+
+def extract_club_code_from_team_string(team_string):
+    """
+    Extrait le code club entre parenthèses d'une chaîne d'équipe
+    Ex: "STADE ROCHELAIS (SRO)" -> "SRO"
+    Ex: "A C BOBIGNY 93 RUGBY (4581E)" -> "4581E"
+    """
+    match = re.search(r'\((.*?)\)', str(team_string))
+    if match:
+        return match.group(1).strip()
+    return None
+
+def get_department_from_club_name(club_name_full, club_df, column_mapping):
+    """
+    Récupère le département à partir du nom du club (méthode originale)
+    """
+    extracted_name = extract_club_name_from_team_string(club_name_full)
+    club_df[column_mapping['club_nom']] = club_df[column_mapping['club_nom']].astype(str)
+    matching_clubs = club_df[club_df[column_mapping['club_nom']].str.contains(extracted_name, case=False, na=False)]
+    if not matching_clubs.empty:
+        # Prioritize exact match if available
+        exact_match = matching_clubs[matching_clubs[column_mapping['club_nom']] == extracted_name]
+        if not exact_match.empty:
+            best_match = exact_match.iloc[0]
+        else:
+            # If no exact match, use the longest name as a heuristic
+            best_match = matching_clubs.loc[matching_clubs[column_mapping['club_nom']].str.len().idxmax()]
+        
+        cp = str(best_match[column_mapping['club_cp']])
+        if len(cp) >= 2:
+            return cp[:2]
+    return "Non trouvé"
+
+def get_department_from_club_code(club_code, club_df, column_mapping):
+    """
+    Récupère le département à partir du code club (nouvelle méthode plus précise)
+    """
+    if not club_code:
+        return None
+    
+    # La colonne du code club dans club_df est 'Code'
+    club_code_col = 'Code' # As specified by user
+    if club_code_col not in club_df.columns:
+        return None
+    
+    # Recherche par code club exact
+    matching_club = club_df[club_df[column_mapping['club_code']] == club_code]
+    
+    if not matching_club.empty:
+        cp = str(matching_club.iloc[0][column_mapping['club_cp']])
+        if len(cp) >= 2:
+            return cp[:2]
+    return None
+
+def get_department_from_club_name_or_code(club_name_full, club_df, column_mapping):
+    """
+    Fonction combinée qui essaie d'abord par code, puis par nom
+    """
+    # Tentative 1 : Par code club
+    club_code = extract_club_code_from_team_string(club_name_full)
+    if club_code:
+        dept_by_code = get_department_from_club_code(club_code, club_df, column_mapping)
+        if dept_by_code:
+            return dept_by_code
+    
+    # Tentative 2 : Par nom (fallback)
+    return get_department_from_club_name(club_name_full, club_df, column_mapping)
+
+def get_cp_from_club_name(club_name_full, club_df, column_mapping):
+    """
+    Récupère le code postal complet à partir du nom du club
+    """
+    extracted_name = extract_club_name_from_team_string(club_name_full)
+    club_df[column_mapping['club_nom']] = club_df[column_mapping['club_nom']].astype(str)
+    matching_clubs = club_df[club_df[column_mapping['club_nom']].str.contains(extracted_name, case=False, na=False)]
+    if not matching_clubs.empty:
+        best_match = matching_clubs.loc[matching_clubs[column_mapping['club_nom']].str.len().idxmax()]
+        return str(best_match[column_mapping['club_cp']])
+    return "Non trouvé"
+
+def get_cp_from_club_code(club_code, club_df, column_mapping):
+    """
+    Récupère le code postal complet à partir du code club
+    """
+    if not club_code:
+        return "Non trouvé"
+    
+    club_code_col = 'Code' # As specified by user
+    if club_code_col not in club_df.columns:
+        return "Non trouvé"
+    
+    # Recherche par code club exact
+    matching_club = club_df[club_df[column_mapping['club_code']] == club_code]
+    
+    if not matching_club.empty:
+        return str(matching_club.iloc[0][column_mapping['club_cp']])
+    return "Non trouvé"
+
+def get_cp_from_club_name_or_code(club_name_full, club_df, column_mapping):
+    """
+    Fonction combinée pour récupérer le CP qui essaie d'abord par code, puis par nom
+    """
+    # Tentative 1 : Par code club
+    club_code = extract_club_code_from_team_string(club_name_full)
+    if club_code:
+        cp_by_code = get_cp_from_club_code(club_code, club_df, column_mapping)
+        if cp_by_code != "Non trouvé":
+            return cp_by_code
+    
+    # Tentative 2 : Par nom (fallback)
+    return get_cp_from_club_name(club_name_full, club_df, column_mapping)
+
+# --- Tableaux des pages ---
+
+@instrumented("style grille disponibilités", "rendu")
+def highlight_designated_cells(df_to_style, grille_dispo, column_mapping):
+    """
+    Met en évidence les cellules selon la disponibilité et les désignations
+    - Fond vert pour les disponibilités "OUI"
+    - Fond rouge pour les disponibilités "NON" 
+    - Icône 🏈 pour les arbitres désignés (qui ont un match)
+    """
+    # Crée une matrice de style vide de la même taille que le df à styler.
+    style_matrix = pd.DataFrame('', index=df_to_style.index, columns=df_to_style.columns)
+    
+    # Récupère la partie "DESIGNATION" de la grille complète.
+    designation_data = grille_dispo[column_mapping['dispo_designation']]
+    
+    # Récupère la partie "DISPONIBILITE" de la grille complète.
+    disponibilite_data = grille_dispo[column_mapping['dispo_disponibilite']]
+    
+    # Crée un masque booléen où la désignation est 1 (en remplissant les non-valeurs par 0).
+    mask_designated = (designation_data.fillna(0) == 1)
+    
+    # Crée des masques pour les disponibilités "OUI" et "NON" - colonne par colonne
+    mask_dispo_oui = pd.DataFrame(False, index=disponibilite_data.index, columns=disponibilite_data.columns)
+    mask_dispo_non = pd.DataFrame(False, index=disponibilite_data.index, columns=disponibilite_data.columns)
+    
+    for col in disponibilite_data.columns:
+        mask_dispo_oui[col] = disponibilite_data[col].fillna('').astype(str).str.upper() == 'OUI'
+        mask_dispo_non[col] = disponibilite_data[col].fillna('').astype(str).str.upper() == 'NON'
+    
+    # Applique les styles aux colonnes communes (colonnes de date seulement)
+    date_columns = [col for col in df_to_style.columns if col not in [
+        column_mapping['arbitres_nom'],
+        column_mapping['arbitres_prenom'], 
+        column_mapping['arbitres_categorie'],
+        'Club',
+        'Nbr matchs\nà arbitrer'
+    ]]
+    
+    common_cols = style_matrix.columns.intersection(date_columns)
+    
+    # Applique le fond vert pour les disponibilités "OUI"
+    style_matrix.loc[:, common_cols] = style_matrix.loc[:, common_cols].mask(
+        mask_dispo_oui[common_cols], 'background-color: #C8E6C9'  # Vert clair
+    )
+    
+    # Applique le fond rouge pour les disponibilités "NON"
+    style_matrix.loc[:, common_cols] = style_matrix.loc[:, common_cols].mask(
+        mask_dispo_non[common_cols], 'background-color: #FFCDD2'  # Rouge clair
+    )
+    
+    # Pour les arbitres désignés, on ajoute l'icône 🏈 au lieu du fond orange
+    # On modifie directement le DataFrame affiché pour ajouter l'icône
+    for col in common_cols:
+        df_to_style.loc[mask_designated[col], col] = '🏈'
+    
+    return style_matrix
+
+@instrumented("récapitulatif par rencontre", "traitement")
+def build_recap(rencontres_df, designations_df):
+    """
+    Construit le récapitulatif des désignations : une ligne par rencontre,
+    une colonne par rôle (Arbitre de champ, AA1, AA2...) et le taux de remplissage.
+    """
+    numero_col = config.COLUMN_MAPPING['rencontres_numero']
+    date_col = config.COLUMN_MAPPING['rencontres_date']
+    rencontres = rencontres_df.drop_duplicates(subset=['rencontre_id']).set_index('rencontre_id')
+
+    base_cols = [config.COLUMN_MAPPING[key] for key in ['rencontres_date', 'rencontres_competition', 'rencontres_locaux', 'rencontres_visiteurs']]
+    recap_df = rencontres[[col for col in base_cols if col in rencontres.columns]].copy()
+    if date_col in recap_df.columns:
+        dates = rencontres['rencontres_date_dt'] if 'rencontres_date_dt' in rencontres.columns else pd.to_datetime(recap_df[date_col], errors='coerce')
+        recap_df[date_col] = dates.dt.strftime('%d/%m/%Y %H:%M')
+
+    designation_cols = ['rencontre_id', 'NOM', 'PRENOM', 'DPT DE RESIDENCE', 'FONCTION ARBITRE']
+    role_cols = list(config.ALL_ROLES)
+    if not designations_df.empty and set(designation_cols).issubset(designations_df.columns):
+        designations = designations_df[designation_cols]
+        # Formatage vectorisé du département : 1 -> "01", "2A" reste "2A"
+        dpt_num = pd.to_numeric(designations['DPT DE RESIDENCE'], errors='coerce').astype('Int64')
+        # Département manquant laissé vide (NaN) pour le repli "-" plutôt que converti en "nan"
+        dpt_texte = designations['DPT DE RESIDENCE'].astype(str).str.strip().where(designations['DPT DE RESIDENCE'].notna())
+        dpt = dpt_num.astype(str).str.zfill(2).where(dpt_num.notna(), dpt_texte)
+        label = (
+            designations['NOM'].astype(str).str.strip() + " " + designations['PRENOM'].astype(str).str.strip()
+            + " (" + dpt.fillna('-') + ")"
+        )
+        roles_df = (
+            label.groupby([designations['rencontre_id'], designations['FONCTION ARBITRE'].astype(str)])
+            .agg(", ".join)
+            .unstack('FONCTION ARBITRE')
+        )
+        role_cols += sorted(col for col in roles_df.columns if col not in role_cols)
+        recap_df = recap_df.join(roles_df, how='left')
+
+    recap_df = recap_df.reindex(columns=[col for col in base_cols if col in recap_df.columns] + role_cols)
+    postes_pourvus = recap_df[list(config.ALL_ROLES)].notna().sum(axis=1)
+    recap_df[role_cols] = recap_df[role_cols].fillna("-")
+    recap_df['Taux de remplissage'] = postes_pourvus / len(config.ALL_ROLES)
+    recap_df.insert(0, numero_col, rencontres[numero_col])
+    return recap_df.reset_index(drop=True)
+
+@instrumented("requête liste des rencontres", "traitement")
+def query_match_list(rencontres_df, competitions, recherche, tri, croissant, groupe):
+    """
+    Liste des rencontres filtrée, triée ou groupée côté serveur, aux colonnes de config.MATCH_LIST_COLUMNS.
+    `competitions` (tuple ou None) et `recherche` (texte dans les équipes ou la compétition) filtrent ;
+    `tri` est une colonne affichée. Avec `groupe` (colonne affichée), une ligne par groupe :
+    nombre de rencontres, première et dernière date, triées selon la clé de groupe.
+    """
+    rencontres = rencontres_df
+    if competitions is not None:
+        rencontres = rencontres[rencontres[config.COLUMN_MAPPING['rencontres_competition']].isin(competitions)]
+    if recherche:
+        colonnes = [config.COLUMN_MAPPING[key] for key in ['rencontres_competition', 'rencontres_locaux', 'rencontres_visiteurs']]
+        masque = pd.Series(False, index=rencontres.index)
+        for colonne in colonnes:
+            masque |= rencontres[colonne].astype(str).str.contains(recherche, case=False, regex=False, na=False)
+        rencontres = rencontres[masque]
+
+    dates = rencontres['rencontres_date_dt']
+    liste = rencontres[list(config.MATCH_LIST_COLUMNS)].rename(columns=config.MATCH_LIST_COLUMNS)
+    liste['Date'] = dates.dt.strftime('%d/%m/%Y')
+    # Les dates sont triées et groupées sur leur valeur, pas sur le texte affiché
+    cle = {label: liste[label] for label in liste.columns}
+    cle['Date'] = dates.dt.normalize()
+
+    if groupe:
+        groupes = pd.DataFrame({'cle': cle[groupe], 'libelle': liste[groupe], 'date': dates})
+        resume = groupes.groupby('cle', sort=True).agg(
+            libelle=('libelle', 'first'),
+            rencontres=('date', 'size'),
+            premiere=('date', 'min'),
+            derniere=('date', 'max'),
+        )
+        if not croissant:
+            resume = resume.iloc[::-1]
+        return pd.DataFrame({
+            groupe: resume['libelle'].to_numpy(),
+            'Rencontres': resume['rencontres'].to_numpy(),
+            'Première rencontre': resume['premiere'].dt.strftime('%d/%m/%Y').to_numpy(),
+            'Dernière rencontre': resume['derniere'].dt.strftime('%d/%m/%Y').to_numpy(),
+        })
+
+    ordre = pd.DataFrame({'cle': cle[tri], 'date': dates}).sort_values(['cle', 'date'], ascending=[croissant, True], kind='stable').index
+    return liste.loc[ordre].reset_index(drop=True)
+
+@instrumented("pivot disponibilités", "traitement")
+def build_dispo_grid(arbitres_filtres, dispo_df):
+    """
+    Construit la grille des disponibilités (une ligne par arbitre, une colonne par date).
+    Retourne (grille à afficher, grille complète DISPONIBILITE/DESIGNATION pour le style),
+    ou (None, None) si aucune disponibilité ne correspond aux arbitres.
+    """
+    fixed_columns = [
+        config.COLUMN_MAPPING['arbitres_nom'],
+        config.COLUMN_MAPPING['arbitres_prenom'],
+        config.COLUMN_MAPPING['arbitres_categorie'],
+        'Club',
+        'Nbr matchs\nà arbitrer'
+    ]
+    dispo_df = dispo_df[dispo_df['licence_id'] != MISSING]
+    dispo_a_merger = dispo_df[[
+        'licence_id',
+        config.COLUMN_MAPPING['dispo_disponibilite'],
+        config.COLUMN_MAPPING['dispo_designation'],
+    ]].assign(DATE_EFFECTIVE=pd.to_datetime(dispo_df[config.COLUMN_MAPPING['dispo_date']], errors='coerce'))
+    arbitres_avec_dispo = pd.merge(
+        arbitres_filtres.rename(columns={'Nombre  de matchs à arbitrer': 'Nbr matchs\nà arbitrer'}),
+        dispo_a_merger,
+        on='licence_id',
+        how='inner'
+    )
+    if arbitres_avec_dispo.empty:
+        return None, None
+    arbitres_avec_dispo['DATE_AFFICHAGE'] = arbitres_avec_dispo['DATE_EFFECTIVE'].dt.strftime('%d/%m/%Y')
+
+    grille_dispo = arbitres_avec_dispo.pivot_table(
+        index=fixed_columns,
+        columns='DATE_AFFICHAGE',
+        values=[config.COLUMN_MAPPING['dispo_disponibilite'], config.COLUMN_MAPPING['dispo_designation']],
+        aggfunc='first'
+    )
+    # Remplacer "OUI" et "NON" par des chaînes vides, garder "Non renseigné" pour les valeurs manquantes
+    display_grille = grille_dispo[config.COLUMN_MAPPING['dispo_disponibilite']].fillna('Non renseigné')
+    display_grille = display_grille.replace({'OUI': '', 'NON': ''}).reset_index()
+
+    # Colonnes fixes d'abord, puis les dates triées chronologiquement
+    date_columns = [col for col in display_grille.columns if col not in fixed_columns]
+    ordered_date_columns = sorted(date_columns, key=lambda x: datetime.strptime(x, '%d/%m/%Y'))
+    return display_grille[fixed_columns + ordered_date_columns], grille_dispo.reset_index()
+
+@instrumented("fusion FFR", "traitement")
+def merge_ffr_data(rencontres_df, arbitres_df, club_df):
+    """Fusionne les désignations FFR avec les arbitres, catégories, compétitions et clubs."""
+    rencontres_df = rencontres_df.copy()
+    arbitres_df = arbitres_df.copy()
+    club_df = club_df.copy()
+    categories_df = config.load_static_categories()
+    competitions_df = config.load_static_competitions()
+    competitions_df.rename(columns={'NOM': 'COMPETITION_NAME_FOR_MERGE'}, inplace=True)
+
+    for df in [rencontres_df, arbitres_df, club_df]:
+        df.columns = df.columns.str.strip()
+
+    if 'CP' in club_df.columns:
+        club_df['DPT_from_CP'] = club_df['CP'].astype(str).str.zfill(5).str[:2]
+    else:
+        club_df['DPT_from_CP'] = pd.NA
+
+    if 'NOM' in rencontres_df.columns and 'Nom' not in rencontres_df.columns:
+        rencontres_df.rename(columns={'NOM': 'Nom'}, inplace=True)
+
+    # --- Robust Merge Logic ---
+    arbitres_cols_to_merge = ['licence_id', 'Numéro Affiliation', 'Catégorie', 'DPT DE RESIDENCE']
+    existing_arbitres_cols = [col for col in arbitres_cols_to_merge if col in arbitres_df.columns]
+    if 'licence_id' in rencontres_df.columns and 'licence_id' in arbitres_df.columns:
+        arbitres_connus = arbitres_df.loc[arbitres_df['licence_id'] != MISSING, existing_arbitres_cols]
+        merged_df = pd.merge(rencontres_df, arbitres_connus, on='licence_id', how='left')
+    else:
+        merged_df = rencontres_df
+    # --- End Robust Merge ---
+
+    merged_df = pd.merge(merged_df, categories_df, left_on='Catégorie', right_on='CATEGORIE', how='left')
+    merged_df = pd.merge(merged_df, competitions_df, left_on='COMPETITION NOM', right_on='COMPETITION_NAME_FOR_MERGE', how='left')
+
+    if 'locaux_id' in merged_df.columns and 'club_id' in club_df.columns:
+        clubs_connus = club_df.loc[club_df['club_id'] != MISSING, ['club_id', 'Code', 'DPT_from_CP', 'CP']]
+        merged_df = pd.merge(merged_df, clubs_connus, left_on='locaux_id', right_on='club_id', how='left')
+        merged_df.rename(columns={'DPT_from_CP': 'DPT_LOCAUX', 'CP': 'CP_LOCAUX'}, inplace=True)
+    
+    if 'DPT_LOCAUX' not in merged_df.columns: merged_df['DPT_LOCAUX'] = pd.NA
+    if 'CP_LOCAUX' not in merged_df.columns: merged_df['CP_LOCAUX'] = pd.NA
+    
+    final_numeric_cols = ['Niveau', 'NIVEAU MIN', 'NIVEAU MAX', 'DPT DE RESIDENCE', 'DPT_LOCAUX', 'CP_LOCAUX']
+    for col in final_numeric_cols:
+        if col in merged_df.columns:
+            merged_df[col] = pd.to_numeric(merged_df[col], errors='coerce')
+
+    return merged_df
+
+@instrumented("déplacements par week-end", "traitement")
+def travel_by_weekend(designations_df, rencontres_ffr_df, matrix):
+    """
+    Kilométrage (aller simple, à vol d'oiseau entre départements) des désignations
+    manuelles et FFR, totalisé par week-end, d'après la matrice `matrix` (voir distances.py).
+    Une ligne par week-end.
+    """
+    parts = []
+    if not designations_df.empty and {'DATE', 'DPT DE RESIDENCE', 'DPT TERRAIN'}.issubset(designations_df.columns):
+        parts.append(pd.DataFrame({
+            'date': pd.to_datetime(designations_df['DATE'], dayfirst=True, errors='coerce').to_numpy(),
+            'km': matrix.pairwise(designations_df['DPT DE RESIDENCE'], designations_df['DPT TERRAIN']),
+            'source': 'Manuelle',
+        }))
+    ffr_date = config.COLUMN_MAPPING['rencontres_date']
+    if not rencontres_ffr_df.empty and {ffr_date, 'DPT DE RESIDENCE', 'TERRAIN CODE POSTAL'}.issubset(rencontres_ffr_df.columns):
+        parts.append(pd.DataFrame({
+            'date': pd.to_datetime(rencontres_ffr_df[ffr_date], errors='coerce').to_numpy(),
+            'km': matrix.pairwise(rencontres_ffr_df['DPT DE RESIDENCE'], rencontres_ffr_df['TERRAIN CODE POSTAL'].map(departement_from_cp)),
+            'source': 'FFR',
+        }))
+    if not parts:
+        return pd.DataFrame()
+    trajets = pd.concat(parts, ignore_index=True).dropna(subset=['date'])
+    trajets['semaine'] = (trajets['date'] - pd.to_timedelta(trajets['date'].dt.weekday, unit='D')).dt.normalize()
+    par_weekend = trajets.groupby('semaine').agg(
+        designations=('km', 'size'),
+        km_total=('km', 'sum'),
+        km_moyen=('km', 'mean'),
+        km_max=('km', 'max'),
+        distance_inconnue=('km', lambda km: int(km.isna().sum())),
+    ).reset_index()
+    par_weekend.insert(0, 'Week-end', par_weekend['semaine'].map(weekend_label))
+    return par_weekend.drop(columns=['semaine']).rename(columns={
+        'designations': 'Désignations',
+        'km_total': 'Total (km)',
+        'km_moyen': 'Moyenne (km)',
+        'km_max': 'Maximum (km)',
+        'distance_inconnue': 'Distance inconnue',
+    })
+
+def club_location(equipe, club_df):
+    """
+    (département du club, département du terrain) d'une équipe « NOM (CODE) » : le terrain est
+    situé par le code postal du club, à défaut par son département. `club_df` est modifié
+    (colonne du nom convertie en texte) : passer une copie.
+    """
+    dpt_club = get_department_from_club_name_or_code(equipe, club_df, config.COLUMN_MAPPING)
+    return dpt_club, departement_from_cp(get_cp_from_club_name_or_code(equipe, club_df, config.COLUMN_MAPPING)) or dpt_club
+
+@instrumented("localisation des clubs", "traitement")
+def club_locations(equipes, club_df):
+    """
+    Table de correspondance {équipe: (département du club, département du terrain)}, mêmes règles
+    que club_location : codes postaux indexés une fois par code club, recherche par nom en repli.
+    """
+    club_df = club_df.copy(deep=False)
+    cps = {}
+    if {config.COLUMN_MAPPING['club_code'], config.COLUMN_MAPPING['club_cp']}.issubset(club_df.columns):
+        clubs = club_df.drop_duplicates(subset=[config.COLUMN_MAPPING['club_code']])
+        cps = dict(zip(clubs[config.COLUMN_MAPPING['club_code']], clubs[config.COLUMN_MAPPING['club_cp']].astype(str)))
+    locations = {}
+    for equipe in pd.unique(pd.Series(equipes, dtype=object).dropna()):
+        cp = cps.get(extract_club_code_from_team_string(equipe))
+        if cp is not None and len(cp) >= 2:
+            locations[equipe] = (cp[:2], departement_from_cp(cp) or cp[:2])
+        else:
+            locations[equipe] = club_location(equipe, club_df)
+    return locations
+
+def build_candidates(rencontre_details, arbitres_df, categories_df, competitions_df, club_df, dispo_df, strict, distances, locations=None):
+    """
+    Candidats d'une rencontre, avant recherche par nom et tri : arbitres hors clubs de la rencontre,
+    avec leur niveau, leur distance au terrain et leur statut pour le week-end (colonnes 'Statut'
+    et 'Désignable', voir get_arbitre_status_for_date). Avec `strict`, seuls les niveaux de la
+    compétition et les arbitres résidant hors du département du club recevant sont retenus.
+    `locations` : table des clubs déjà localisés (voir club_locations), consultée avant `club_df`.
+    Retourne (candidats, département du club recevant). N'utilise pas Streamlit : peut être
+    calculée en arrière-plan (voir utils.prefetch_candidates).
+    """
+    clubs_rencontre = [club_id for club_id in (rencontre_details['locaux_id'], rencontre_details['visiteurs_id']) if club_id != MISSING]
+    candidats = arbitres_df[~arbitres_df['club_id'].isin(clubs_rencontre)]
+    candidats = pd.merge(candidats, categories_df, left_on=config.COLUMN_MAPPING['arbitres_categorie'], right_on=config.COLUMN_MAPPING['categories_nom'], how='left')
+    if locations and rencontre_details["LOCAUX"] in locations:
+        dpt_locaux, dpt_terrain = locations[rencontre_details["LOCAUX"]]
+    else:
+        # Les recherches de club convertissent la colonne du nom : copie pour ne pas modifier l'instantané partagé
+        dpt_locaux, dpt_terrain = club_location(rencontre_details["LOCAUX"], club_df.copy(deep=False))
+    if strict:
+        comp_info = competitions_df[competitions_df[config.COLUMN_MAPPING['competitions_nom']] == rencontre_details[config.COLUMN_MAPPING['rencontres_competition']]]
+        if not comp_info.empty:
+            comp_info = comp_info.iloc[0]
+            niveau_min, niveau_max = (comp_info['NIVEAU MIN'], comp_info['NIVEAU MAX'])
+            if niveau_min > niveau_max: niveau_min, niveau_max = niveau_max, niveau_min
+            candidats = candidats[candidats[config.COLUMN_MAPPING['categories_niveau']].between(niveau_min, niveau_max)]
+        if dpt_locaux and dpt_locaux != "Non trouvé":
+            candidats = candidats[candidats[config.COLUMN_MAPPING['arbitres_dpt_residence']].astype(str) != str(dpt_locaux)]
+    candidats = candidats.assign(**{'Distance (km)': distances.distances_from(dpt_terrain, candidats[config.COLUMN_MAPPING['arbitres_dpt_residence']])})
+    # Statuts du week-end : disponibilités regroupées une fois par arbitre
+    if 'licence_id' in dispo_df.columns:
+        dispo_par_licence = dict(tuple(dispo_df.groupby('licence_id', sort=False)))
+        sans_dispo = dispo_df.iloc[0:0]
+        statuts = [get_arbitre_status_for_date(licence_id, rencontre_details['rencontres_date_dt'], dispo_par_licence.get(licence_id, sans_dispo)) for licence_id in candidats['licence_id']]
+    else:
+        statuts = [("🤷‍♂️ Non renseignée", False)] * len(candidats)
+    candidats = candidats.assign(Statut=[statut for statut, _ in statuts], **{'Désignable': [designable for _, designable in statuts]})
+    return candidats, dpt_locaux
+
+def frame_fingerprint(df):
+    """
+    Empreinte du contenu d'un DataFrame, pour indexer les caches et les exports (0 si vide).
+    Les empreintes des lignes sont hachées dans l'ordre : un tableau réordonné a une autre empreinte.
+    """
+    if df.empty:
+        return 0
+    rows = pd.util.hash_pandas_object(df.astype(str), index=False).to_numpy()
+    return int(hashlib.sha256(rows.tobytes()).hexdigest()[:16], 16)
@@ -0,0 +1,97 @@
+"""
+Cache LRU borné de résultats calculés à l'avance par un thread de fond.
+Une page demande une valeur par clé (`get`) : si elle a déjà été calculée ou est
+en cours de calcul en arrière-plan, elle est servie (ou attendue) au lieu d'être
+recalculée. `prefetch` programme le calcul des valeurs dont la page aura
+probablement besoin ensuite (par exemple les rencontres suivantes de la liste).
+Les clés doivent inclure les versions des données utilisées : une valeur n'est
+jamais invalidée, elle sort du cache quand d'autres clés plus récentes la poussent.
+Ce module n'importe pas Streamlit.
+"""
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class PrefetchCache:
+    """
+    Au plus `max_entries` valeurs (calculées ou en cours de calcul), les moins récemment
+    demandées étant évincées en premier. Un calcul en arrière-plan qui échoue est oublié :
+    la demande suivante le refait dans le thread appelant, qui reçoit l'exception.
+    """
+
+    def __init__(self, max_entries=32, max_workers=1):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def _store(self, key, future):
+        self._entries[key] = future
+        while len(self._entries) > self.max_entries:
+            oldest_key, oldest = next(iter(self._entries.items()))
+            if not oldest.done():
+                break
+            del self._entries[oldest_key]
+
+    def _forget(self, key, future):
+        with self._lock:
+            if self._entries.get(key) is future:
+                del self._entries[key]
+
+    def get(self, key, build):
+        """Valeur de `key` : servie depuis le cache, attendue si en cours de calcul, sinon `build()`."""
+        with self._lock:
+            future = self._entries.get(key)
+            owner = future is None
+            if owner:
+                self.misses += 1
+                future = Future()
+                future.set_running_or_notify_cancel()
+                self._store(key, future)
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        if owner:
+            try:
+                future.set_result(build())
+            except BaseException as e:
+                self._forget(key, future)
+                future.set_exception(e)
+                raise
+        elif future.exception() is not None:
+            # Précalcul échoué (déjà oublié) : calcul dans le thread appelant
+            return self.get(key, build)
+        return future.result()
+
+    def prefetch(self, key, build):
+        """Programme le calcul de `key` en arrière-plan, s'il n'est ni en cache ni en cours."""
+        with self._lock:
+            if key in self._entries:
+                return
+            future = Future()
+            self._store(key, future)
+        self._executor.submit(self._run, key, future, build)
+
+    def _run(self, key, future, build):
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(build())
+        except Exception as e:
+            logger.warning("Précalcul %s échoué : %s", key, e)
+            self._forget(key, future)
+            future.set_exception(e)
@@ -0,0 +1,122 @@
+"""
+Rafraîchissement des données en arrière-plan (stale-while-revalidate).
+Un thread planificateur recharge chaque source selon sa propre périodicité ;
+le nouvel instantané remplace l'ancien en une seule affectation, et l'ancien
+reste servi tant que le rechargement est en cours ou s'il échoue.
+Ce module n'importe pas Streamlit.
+"""
+import logging
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+
+from instrumentation import timed
+
+logger = logging.getLogger(__name__)
+
+# Instantané d'une source : données, date de chargement, numéro de version (croissant, propre au processus)
+# et empreinte du contenu (df.attrs["digest"], identique d'un processus à l'autre ; None si inconnue)
+Snapshot = namedtuple("Snapshot", ["name", "df", "loaded_at", "version", "digest"])
+
+# Délai avant une nouvelle tentative après un échec de chargement (secondes)
+RETRY_DELAY = 60
+
+
+class SnapshotRefresher:
+    """
+    Maintient le dernier instantané de chaque source.
+    `loaders` : {nom: fonction(if_changed) retournant un DataFrame ; avec if_changed=True
+                 (un instantané existe déjà), elle peut retourner None si la source n'a pas changé}
+    `intervals` : {nom: périodicité de rechargement en secondes}
+    """
+
+    def __init__(self, loaders, intervals, tick=1.0):
+        self.loaders = dict(loaders)
+        self.intervals = dict(intervals)
+        self.tick = tick
+        self._snapshots = {}
+        self._errors = {}
+        self._next_due = {name: 0.0 for name in self.loaders}
+        self._in_flight = set()
+        self._first_load = {name: threading.Event() for name in self.loaders}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._executor = ThreadPoolExecutor(max_workers=len(self.loaders) or 1, thread_name_prefix="refresh")
+        self._thread = threading.Thread(target=self._run, name="refresh-scheduler", daemon=True)
+
+    def start(self):
+        if not self._thread.is_alive():
+            self._thread.start()
+        return self
+
+    # --- Planification ---
+    def _run(self):
+        while True:
+            now = time.monotonic()
+            with self._lock:
+                due = [name for name, next_due in self._next_due.items() if next_due <= now and name not in self._in_flight]
+                self._in_flight.update(due)
+            for name in due:
+                self._executor.submit(self._reload, name)
+            self._wake.wait(self.tick)
+            self._wake.clear()
+
+    def _reload(self, name):
+        try:
+            with timed(f"rafraîchissement {name}", "chargement"):
+                df = self.loaders[name](if_changed=name in self._snapshots)
+            with self._lock:
+                previous = self._snapshots.get(name)
+                if df is None and previous is not None:
+                    # Source inchangée : même version (les caches restent valides), date de vérification à jour
+                    self._snapshots[name] = previous._replace(loaded_at=datetime.now())
+                else:
+                    self._snapshots[name] = Snapshot(
+                        name, pd.DataFrame() if df is None else df, datetime.now(), (previous.version + 1) if previous else 1,
+                        None if df is None else df.attrs.get("digest"),
+                    )
+                self._errors.pop(name, None)
+                self._next_due[name] = time.monotonic() + self.intervals.get(name, 300)
+        except Exception as e:
+            logger.warning("Rafraîchissement de %s échoué : %s", name, e)
+            with self._lock:
+                self._errors[name] = str(e)
+                self._next_due[name] = time.monotonic() + min(RETRY_DELAY, self.intervals.get(name, 300))
+        finally:
+            with self._lock:
+                self._in_flight.discard(name)
+            self._first_load[name].set()
+
+    def request_refresh(self, name=None):
+        """Demande un rechargement immédiat (sans attendre) d'une source ou de toutes."""
+        with self._lock:
+            for source in ([name] if name else list(self.loaders)):
+                self._next_due[source] = 0.0
+        self._wake.set()
+
+    # --- Lecture ---
+    def get(self, name, timeout=None):
+        """
+        Dernier instantané de `name`. Seul le tout premier chargement est attendu ;
+        ensuite l'instantané courant est retourné immédiatement, même pendant un rechargement.
+        Retourne un instantané vide (version 0) si aucun chargement n'a réussi.
+        """
+        snapshot = self._snapshots.get(name)
+        if snapshot is None:
+            self._first_load[name].wait(timeout)
+            snapshot = self._snapshots.get(name)
+        return snapshot or Snapshot(name, pd.DataFrame(), None, 0, None)
+
+    def error(self, name):
+        return self._errors.get(name)
+
+    def is_refreshing(self, name):
+        return name in self._in_flight
+
+    def versions(self):
+        """Versions courantes de toutes les sources, utilisables comme clé de cache."""
+        return tuple((name, snapshot.version) for name, snapshot in sorted(self._snapshots.items()))
@@ -0,0 +1,330 @@
+"""
+Lecture et écriture des feuilles Google Sheets (interface gspread, ou son
+émulation locale storage.LocalSheetsClient) : création du client, désignations
+manuelles, remplacement et effacement d'une feuille, lecture des sources par
+l'API (values_batch_get) au lieu de leur export XLSX.
+Les erreurs sont levées (ou transmises à `on_error`) : utils.py les affiche
+dans les pages, cli.py les imprime.
+Ce module n'importe pas Streamlit.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import threading
+
+import pandas as pd
+
+import config
+from instrumentation import timed
+from designations_store import DesignationStore
+from gateway import get_gateway
+from keys import encode_columns
+from sources import read_source
+from storage import LocalSheetsClient, QuotaExceededError, parse_a1_range
+
+logger = logging.getLogger(__name__)
+
+SCOPES = ['https://www.googleapis.com/auth/spreadsheets', 'https://www.googleapis.com/auth/drive']
+
+
+def create_client(service_account_info=None):
+    """
+    Client Google Sheets (ou son émulation locale si config.SHEETS_BACKEND == "local").
+    Identifiants : fichier config.SERVICE_ACCOUNT_FILE, à défaut `service_account_info` (dict) ;
+    retourne None sans identifiants. Les appels passent par la passerelle du processus (gateway.py).
+    """
+    if config.SHEETS_BACKEND == "local":
+        return get_gateway().wrap(LocalSheetsClient(
+            config.LOCAL_SHEETS_PATH,
+            latency=config.LOCAL_SHEETS_LATENCY,
+            quota_error_rate=config.LOCAL_SHEETS_QUOTA_ERROR_RATE,
+        ))
+    if not (os.path.exists(config.SERVICE_ACCOUNT_FILE) or service_account_info):
+        return None
+    # Importés au premier client réel (longs à charger) : à la première lecture des désignations,
+    # pas à l'import du module ; jamais sans identifiants ni avec le backend local
+    import gspread
+    from google.oauth2.service_account import Credentials
+    if os.path.exists(config.SERVICE_ACCOUNT_FILE):
+        creds = Credentials.from_service_account_file(config.SERVICE_ACCOUNT_FILE, scopes=SCOPES)
+    else:
+        creds = Credentials.from_service_account_info(service_account_info, scopes=SCOPES)
+    return get_gateway().wrap(gspread.authorize(creds))
+
+
+def api_errors():
+    """
+    Erreurs d'API Google Sheets à intercepter (except sheets.api_errors()) : gspread.exceptions.APIError
+    si gspread a été chargé (un client réel existe), et l'erreur de quota de l'émulation locale.
+    """
+    gspread = sys.modules.get("gspread")
+    return (gspread.exceptions.APIError, QuotaExceededError) if gspread else (QuotaExceededError,)
+
+
+def not_found_errors():
+    """Erreurs de classeur introuvable (gspread.exceptions.SpreadsheetNotFound si gspread a été chargé)."""
+    gspread = sys.modules.get("gspread")
+    return (gspread.exceptions.SpreadsheetNotFound,) if gspread else ()
+
+
+def first_worksheet(client, url):
+    return client.open_by_url(url).get_worksheet(0)
+
+
+# --- Désignations manuelles ---
+
+def read_records(client, url):
+    """Lignes de la première feuille du classeur `url` (en-tête en première ligne)."""
+    with timed("get_all_records désignations", "sheets"):
+        return pd.DataFrame(first_worksheet(client, url).get_all_records())
+
+
+def append_row(client, url, row):
+    with timed("ouverture feuille désignations", "sheets"):
+        worksheet = first_worksheet(client, url)
+    with timed("append_row désignation", "sheets"):
+        worksheet.append_row(row)
+
+
+def delete_designation(client, url, rencontre_numero, nom, prenom, fonction):
+    """Supprime la première ligne correspondant à la désignation. Retourne False si aucune ne correspond."""
+    with timed("suppression désignation", "sheets"):
+        worksheet = first_worksheet(client, url)
+        records = worksheet.get_all_records()
+        for i, record in enumerate(records):
+            if (str(record.get('RENCONTRE NUMERO')) == str(rencontre_numero) and
+                record.get('NOM') == nom and
+                record.get('PRENOM') == prenom and
+                record.get('FONCTION ARBITRE') == fonction):
+                worksheet.delete_rows(i + 2)
+                return True
+    return False
+
+
+def load_designations(client, store=None, on_error=None, read_export=None):
+    """
+    Désignations manuelles : base locale `store` si fournie, sinon la feuille config.DESIGNATIONS_URL
+    avec repli sur son export XLSX (`read_export(url)`, read_source par défaut) si la feuille est vide
+    ou inaccessible, sauf avec le backend local (sans réseau). Une erreur de lecture de la feuille
+    est transmise à `on_error` (journalisée par défaut).
+    Ajoute les identifiants rencontre_id et licence_id (config.KEY_COLUMNS).
+    """
+    if store is not None:
+        with timed("lecture désignations (base locale)", "chargement"):
+            designations_df = store.to_dataframe()
+    else:
+        designations_df = pd.DataFrame()
+        if client:
+            try:
+                designations_df = read_records(client, config.DESIGNATIONS_URL)
+            except Exception as e:
+                if on_error:
+                    on_error(e)
+                else:
+                    logger.warning("Lecture des désignations échouée : %s", e)
+        if designations_df.empty and config.SHEETS_BACKEND != "local":
+            designations_df = (read_export or read_source)(config.DESIGNATIONS_URL)
+    return encode_columns(designations_df, config.KEY_COLUMNS["designations"])
+
+
+def open_designation_store(get_client, on_error=None):
+    """
+    Base locale des désignations (config.DESIGNATIONS_DB_PATH), importée depuis la feuille
+    config.DESIGNATIONS_URL si elle est vide. `get_client` n'est appelé que pour cet import.
+    """
+    store = DesignationStore(config.DESIGNATIONS_DB_PATH)
+    if store.count() == 0:
+        with timed("import initial des désignations", "sheets"):
+            client = get_client()
+            initial_df = pd.DataFrame()
+            if client:
+                try:
+                    initial_df = read_records(client, config.DESIGNATIONS_URL)
+                except Exception as e:
+                    if on_error:
+                        on_error(e)
+                    else:
+                        logger.warning("Import des désignations échoué : %s", e)
+            if not initial_df.empty:
+                store.replace_all(initial_df)
+    return store
+
+
+# --- Feuilles entières ---
+
+def dates_as_text(df):
+    """Colonnes de dates de `df` converties en texte, comme elles sont écrites dans la feuille (en place)."""
+    for col in df.select_dtypes(include=['datetime64', 'datetime64[ns]']).columns:
+        df[col] = df[col].dt.strftime('%Y-%m-%d %H:%M:%S')
+    return df
+
+
+def replace_contents(client, url, df):
+    """Remplace le contenu de la première feuille par `df` (en-tête compris, dates en texte)."""
+    worksheet = first_worksheet(client, url)
+    worksheet.clear()
+    dates_as_text(df)
+    data_to_write = df.astype(object).where(pd.notna(df), None).values.tolist()
+    worksheet.update([df.columns.values.tolist()] + data_to_write)
+
+
+def clear_except_header(client, url):
+    """Efface toutes les lignes de la première feuille sauf l'en-tête."""
+    worksheet = first_worksheet(client, url)
+    header = worksheet.row_values(1)
+    worksheet.clear()
+    worksheet.update([header])
+
+
+# --- Lecture des sources par l'API ---
+
+SHEETS_URL = re.compile(r"docs\.google\.com/spreadsheets/d/")
+# Valeurs brutes (nombres, dates en numéros de série), une liste par colonne
+VALUE_PARAMS = {"majorDimension": "COLUMNS", "valueRenderOption": "UNFORMATTED_VALUE", "dateTimeRenderOption": "SERIAL_NUMBER"}
+# Jour 0 des numéros de série de dates Google Sheets
+SERIAL_EPOCH = "1899-12-30"
+
+
+def column_letters(index):
+    """Colonne en notation A1 d'un index à partir de 0 (0 -> "A", 27 -> "AB")."""
+    letters = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord("A") + remainder) + letters
+    return letters
+
+
+def header_name(value, index):
+    """Nom de la colonne `index` d'après sa cellule d'en-tête, « Unnamed: index » si elle est vide (comme pandas)."""
+    return str(value).strip() or f"Unnamed: {index}"
+
+
+def column_ranges(indexes):
+    """Plages A1 couvrant les colonnes `indexes` (triées), une par groupe de colonnes contiguës."""
+    groups = []
+    for index in indexes:
+        if groups and index == groups[-1][1] + 1:
+            groups[-1][1] = index
+        else:
+            groups.append([index, index])
+    return [f"{column_letters(first)}1:{column_letters(last)}" for first, last in groups]
+
+
+def typed_column(values, dtype=None, date=False):
+    """
+    Série typée à partir des valeurs brutes d'une colonne (sans l'en-tête) : cellules vides manquantes,
+    dates converties depuis leur numéro de série (ou leur texte jj/mm/aaaa), `dtype` imposé
+    (str : identifiants en texte), colonnes entièrement numériques converties en nombres.
+    """
+    series = pd.Series(values, dtype=object)
+    series = series.where(series != "", None)
+    if date:
+        serials = pd.to_numeric(series, errors="coerce")
+        dates = pd.to_datetime(serials, unit="D", origin=SERIAL_EPOCH).dt.round("s")
+        texts = pd.to_datetime(series.where(serials.isna()), dayfirst=True, errors="coerce")
+        return dates.fillna(texts)
+    if dtype is str:
+        return series.where(series.isna(), series.astype(str)).infer_objects()
+    if dtype is not None:
+        return series.astype(dtype)
+    if pd.api.types.infer_dtype(series, skipna=True) in ("integer", "floating", "mixed-integer-float"):
+        return pd.to_numeric(series)
+    return series.infer_objects()
+
+
+class SheetsValuesReader:
+    """
+    Lecture des sources Google Sheets par l'API avec le compte de service, sans passer par l'export :
+    une requête values_batch_get par lecture, une plage par groupe de colonnes contiguës demandées.
+    La position des colonnes est lue une fois (ligne d'en-tête), puis vérifiée à chaque lecture
+    par l'en-tête renvoyé dans chaque plage ; elle est relue si les colonnes ont été déplacées.
+    `client_factory` n'est appelée qu'à la première lecture.
+    """
+
+    def __init__(self, client_factory):
+        self._client_factory = client_factory
+        self._client = None
+        self._spreadsheets = {}
+        self._positions = {}
+        self._digests = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def handles(url):
+        """Vrai pour une URL de classeur Google Sheets (export ou édition)."""
+        return bool(SHEETS_URL.search(str(url)))
+
+    def _spreadsheet(self, url):
+        with self._lock:
+            if self._client is None:
+                self._client = self._client_factory()
+                if self._client is None:
+                    raise RuntimeError("aucun identifiant Google Sheets")
+            if url not in self._spreadsheets:
+                self._spreadsheets[url] = self._client.open_by_url(url)
+            return self._spreadsheets[url]
+
+    def _read_positions(self, spreadsheet, columns, leading):
+        """
+        Index de chaque colonne à lire d'après la ligne d'en-tête (première occurrence de chaque nom) ;
+        les `leading` premières colonnes sont lues quel que soit leur en-tête (« Unnamed: i » si vide, comme pandas).
+        """
+        response = spreadsheet.values_batch_get(["1:1"], params={"majorDimension": "ROWS", "valueRenderOption": "UNFORMATTED_VALUE"})
+        rows = response["valueRanges"][0].get("values", [])
+        header = rows[0] if rows else []
+        positions = {}
+        for index in range(max(len(header), leading)):
+            name = header_name(header[index] if index < len(header) else "", index)
+            if name not in positions and (index < leading or (not name.startswith("Unnamed: ") and (not columns or name in columns))):
+                positions[name] = index
+        return positions
+
+    def read(self, url, if_changed=False, columns=None, dtype=None, dates=None, leading=0):
+        """
+        DataFrame des colonnes `columns` (toutes par défaut) et des `leading` premières colonnes
+        de la première feuille, typées (voir typed_column). Avec `if_changed=True`, retourne None
+        si les valeurs sont identiques à la lecture précédente de la même URL.
+        L'empreinte des valeurs est conservée dans df.attrs["digest"].
+        """
+        spreadsheet = self._spreadsheet(url)
+        positions = self._positions.get(url)
+        for _ in range(2):
+            if positions is None:
+                with timed("en-tête Sheets API", "sheets"):
+                    positions = self._read_positions(spreadsheet, columns, leading)
+            indexes = sorted(positions.values())
+            ranges = column_ranges(indexes)
+            with timed("values_batch_get", "sheets"):
+                response = spreadsheet.values_batch_get(ranges, params=VALUE_PARAMS) if ranges else {"valueRanges": []}
+            values = {}
+            for range_name, value_range in zip(ranges, response["valueRanges"]):
+                first_col, last_col, _, _ = parse_a1_range(range_name)
+                received = value_range.get("values", [])
+                for offset in range(last_col - first_col):
+                    values[first_col + offset] = received[offset] if offset < len(received) else []
+            # Colonnes déplacées depuis la lecture de l'en-tête : positions relues
+            if all(header_name(values[index][0] if values[index] else "", index) == name for name, index in positions.items()):
+                break
+            positions = None
+        else:
+            raise RuntimeError(f"en-tête de {url} modifié pendant la lecture")
+        self._positions[url] = positions
+
+        digest = hashlib.sha256(json.dumps(response["valueRanges"], default=str).encode()).hexdigest()
+        with self._lock:
+            previous = self._digests.get(url)
+            self._digests[url] = digest
+        if if_changed and digest == previous:
+            return None
+        with timed("conversion valeurs Sheets API", "chargement"):
+            # Colonnes de longueurs différentes (cellules vides de fin omises) : alignées sur l'index
+            df = pd.DataFrame({
+                name: typed_column(values[index][1:], (dtype or {}).get(name), name in (dates or []))
+                for name, index in sorted(positions.items(), key=lambda item: item[1])
+            })
+        df.attrs["digest"] = digest
+        return df
@@ -0,0 +1,252 @@
+"""
+Instantanés des sources partagés par plusieurs réplicas de l'application, dans un
+dossier commun (volume partagé, config.SHARED_SNAPSHOTS_DIR) :
+- une source n'est téléchargée que par un réplica à la fois (verrou par source) ;
+  les autres relisent l'instantané publié tant qu'il a été vérifié depuis moins
+  que la périodicité de la source, au lieu de le télécharger à leur tour ;
+- le manifeste (manifest.json) donne pour chaque source son numéro de version
+  partagé, son empreinte, la date de la dernière vérification et son fichier ;
+- chaque réplica surveille le manifeste (watch) et ne recharge que les sources
+  dont la version partagée a changé ;
+- les désignations manuelles n'ont pas d'instantané : leur version partagée est
+  incrémentée à chaque écriture (bump) pour invalider les caches des autres réplicas
+  (external_version ignore les écritures du réplica lui-même).
+Les instantanés sont stockés avant encodage propre au processus : les identifiants
+des clés (keys.py) sont recalculés à la relecture.
+Fichiers pickle et manifeste écrits dans un fichier temporaire puis renommés ;
+verrous entre processus par fcntl.flock.
+Ce module n'importe pas Streamlit.
+"""
+import fcntl
+import json
+import logging
+import os
+import pickle
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+import config
+from instrumentation import timed
+from keys import encode_columns
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "manifest.json"
+
+# Instantané partagé absent, périmé ou illisible : la source doit être téléchargée
+_MISSING = object()
+
+
+class SharedSnapshotStore:
+    """
+    Dossier partagé `directory` : manifeste, verrous et au plus `keep` fichiers par source
+    (un réplica peut encore lire la version précédente pendant une publication).
+    """
+
+    def __init__(self, directory, keep=2):
+        self.directory = directory
+        self.keep = keep
+        self._manifest = {}
+        self._manifest_stat = None
+        # Empreintes par source : instantané servi par ce réplica, dernier téléchargement par ce réplica
+        self._held = {}
+        self._fetched = {}
+        # Versions partagées issues des écritures de ce réplica (bump), par entrée
+        self._own = {}
+        self._lock = threading.Lock()
+        self._watcher = None
+        os.makedirs(directory, exist_ok=True)
+
+    @contextmanager
+    def _locked(self, name):
+        """Verrou exclusif entre processus (et entre threads, un descripteur par appel) sur `name`."""
+        with open(os.path.join(self.directory, f"{name}.lock"), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _write(self, filename, write):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(tmp_path, os.path.join(self.directory, filename))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    # --- Manifeste ---
+    def manifest(self):
+        """Manifeste {source: {version, digest, file, checked_at}}, relu seulement s'il a été remplacé."""
+        path = os.path.join(self.directory, MANIFEST_FILE)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return {}
+        key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if key == self._manifest_stat:
+                return self._manifest
+        try:
+            with open(path, encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("Manifeste des instantanés partagés illisible : %s", e)
+            return self._manifest
+        with self._lock:
+            self._manifest, self._manifest_stat = manifest, key
+        return manifest
+
+    def _update(self, name, update):
+        """Applique `update(entrée)` à l'entrée `name` du manifeste, sous verrou ; retourne l'entrée."""
+        with self._locked("manifest"):
+            manifest = dict(self.manifest())
+            entry = update(dict(manifest.get(name, {})))
+            manifest[name] = entry
+            self._write(MANIFEST_FILE, lambda f: f.write(json.dumps(manifest, ensure_ascii=False, indent=1).encode("utf-8")))
+        return entry
+
+    def version(self, name):
+        """Version partagée de `name` (0 si jamais publiée)."""
+        return self.manifest().get(name, {}).get("version", 0)
+
+    def versions(self):
+        return {name: entry.get("version", 0) for name, entry in self.manifest().items()}
+
+    def bump(self, name):
+        """
+        Incrémente la version partagée de `name` (écriture hors instantané : désignations manuelles).
+        La nouvelle version est retenue comme écrite par ce réplica (voir external_version).
+        """
+        version = self._update(name, lambda entry: {**entry, "version": entry.get("version", 0) + 1})["version"]
+        with self._lock:
+            self._own.setdefault(name, set()).add(version)
+        return version
+
+    def external_version(self, name):
+        """
+        Dernière version partagée de `name` écrite par un autre réplica : inchangée après les
+        écritures de ce réplica, dont les caches sont déjà tenus à jour par ailleurs.
+        """
+        version = self.version(name)
+        with self._lock:
+            own = self._own.get(name, ())
+            while version in own:
+                version -= 1
+        return version
+
+    def expire(self, name):
+        """Le prochain chargement de `name` par un réplica télécharge la source (rafraîchissement demandé)."""
+        self._update(name, lambda entry: {**entry, "checked_at": 0})
+
+    # --- Chargement ---
+    def loader(self, name, load, max_age):
+        """
+        Fonction de chargement pour refresh.SnapshotRefresher à partir de `load(if_changed)` :
+        instantané partagé s'il a été vérifié depuis moins de `max_age` secondes, sinon
+        téléchargement par un seul réplica à la fois, puis publication.
+        """
+        def shared_load(if_changed=False):
+            df = self._read_shared(name, max_age, if_changed)
+            if df is not _MISSING:
+                return df
+            with timed(f"verrou instantané partagé {name}", "chargement"), self._locked(name):
+                # Un autre réplica a pu publier la source pendant l'attente du verrou
+                df = self._read_shared(name, max_age, if_changed)
+                if df is not _MISSING:
+                    return df
+                return self._download(name, load, if_changed)
+        return shared_load
+
+    def _read_shared(self, name, max_age, if_changed):
+        entry = self.manifest().get(name)
+        if not entry or not entry.get("file") or time.time() - entry.get("checked_at", 0) >= max_age:
+            return _MISSING
+        if if_changed and entry.get("digest") == self._held.get(name):
+            return None
+        try:
+            with timed(f"lecture instantané partagé {name}", "chargement"):
+                with open(os.path.join(self.directory, entry["file"]), "rb") as f:
+                    df = pickle.load(f)
+        except Exception as e:
+            logger.warning("Instantané partagé %s illisible, téléchargement : %s", name, e)
+            return _MISSING
+        encode_columns(df, config.KEY_COLUMNS.get(name))
+        self._held[name] = entry.get("digest")
+        return df
+
+    def _download(self, name, load, if_changed):
+        held = self._held.get(name)
+        # Requête conditionnelle seulement si l'instantané servi est celui du dernier téléchargement
+        df = load(if_changed=if_changed and held is not None and held == self._fetched.get(name))
+        entry = self.manifest().get(name, {})
+        if df is None:
+            if entry.get("digest") == held:
+                self._update(name, lambda entry: {**entry, "checked_at": time.time()})
+                return None
+            df = load(if_changed=False)
+        digest = df.attrs.get("digest")
+        self._fetched[name] = digest
+        if digest is not None and entry.get("digest") == digest and entry.get("file"):
+            self._update(name, lambda entry: {**entry, "checked_at": time.time()})
+        else:
+            self._publish(name, df, digest, entry.get("version", 0) + 1)
+        if if_changed and digest == held:
+            return None
+        self._held[name] = digest
+        return df
+
+    def _publish(self, name, df, digest, version):
+        """Écrit l'instantané `version` de `name` (appelé sous le verrou de la source) puis le déclare au manifeste."""
+        filename = f"{name}-{version}.pkl"
+        with timed(f"publication instantané partagé {name}", "autre"):
+            self._write(filename, lambda f: pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL))
+        self._update(name, lambda entry: {
+            **entry, "version": max(version, entry.get("version", 0) + 1), "digest": digest, "file": filename, "checked_at": time.time(),
+        })
+        self._prune(name, filename)
+
+    def _prune(self, name, current):
+        paths = sorted(
+            (os.path.join(self.directory, filename) for filename in os.listdir(self.directory)
+             if filename.startswith(f"{name}-") and filename.endswith(".pkl")),
+            key=os.path.getmtime, reverse=True,
+        )
+        for path in paths[self.keep:]:
+            if os.path.basename(path) != current:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    # --- Notification des changements ---
+    def watch(self, on_change, interval=2.0):
+        """
+        Surveille le manifeste dans un thread de fond : `on_change(name)` est appelé pour chaque
+        entrée dont la version partagée a changé depuis le passage précédent.
+        """
+        if self._watcher is not None:
+            return self
+
+        def run():
+            seen = self.versions()
+            while True:
+                time.sleep(interval)
+                try:
+                    current = self.versions()
+                except Exception as e:
+                    logger.warning("Surveillance des instantanés partagés : %s", e)
+                    continue
+                for name, version in current.items():
+                    if version != seen.get(name):
+                        on_change(name)
+                seen = current
+
+        self._watcher = threading.Thread(target=run, name="shared-snapshots-watch", daemon=True)
+        self._watcher.start()
+        return self
@@ -0,0 +1,159 @@
+"""
+Lecture et pré-traitement des sources de données (exports XLSX Google Sheets,
+ou valeurs lues par l'API, voir sheets.SheetsValuesReader).
+Ce module n'importe pas Streamlit : il est utilisé par le rafraîchissement
+en arrière-plan (refresh.py) comme par les pages.
+"""
+import importlib.util
+import io
+import logging
+
+import pandas as pd
+
+import config
+from fetch import get_fetcher
+from keys import encode_columns
+
+logger = logging.getLogger(__name__)
+
+# Moteur XLSX plus rapide (lecteur Rust python-calamine) s'il est installé, openpyxl sinon
+XLSX_ENGINE = "calamine" if importlib.util.find_spec("python_calamine") else None
+
+
+def export_url(url):
+    """URL d'export au format config.EXPORT_FORMAT (les URLs Google Sheets sont déclarées en xlsx)."""
+    if config.EXPORT_FORMAT == "csv" and "format=xlsx" in url:
+        return url.replace("format=xlsx", "format=csv")
+    return url
+
+
+def _is_csv(url):
+    return "format=csv" in url or url.endswith(".csv")
+
+
+def _read(content, url, usecols=None, dtype=None):
+    """Lecture brute : `usecols` est un filtre sur les noms de colonnes ou une liste de positions."""
+    if _is_csv(url):
+        return pd.read_csv(io.BytesIO(content), usecols=usecols, dtype=dtype)
+    if XLSX_ENGINE:
+        return pd.read_excel(io.BytesIO(content), usecols=usecols, dtype=dtype, engine=XLSX_ENGINE)
+    df = pd.read_excel(io.BytesIO(content), dtype=dtype)
+    if usecols is None:
+        return df
+    return df[[column for column in df.columns if usecols(column)]] if callable(usecols) else df.iloc[:, usecols]
+
+
+# Colonnes lues par position pour les sources à colonnes de tête : {url: (positions, en-têtes attendus)}
+_positions = {}
+
+
+def _read_positions(content, url, columns, dtype, leading):
+    """
+    Lit les `leading` premières colonnes (quel que soit leur en-tête) et les colonnes `columns`.
+    Les positions sont relevées par une lecture complète à la première lecture de l'URL, puis
+    réutilisées et vérifiées par les en-têtes lus ; elles sont relevées à nouveau si les colonnes
+    ont été déplacées.
+    """
+    known = _positions.get(url)
+    if known is not None:
+        positions, header = known
+        df = _read(content, url, positions, dtype)
+        if [str(column).strip() for column in df.columns] == header:
+            return df
+    df = _read(content, url, None, dtype)
+    names = [str(column).strip() for column in df.columns]
+    positions = [index for index, name in enumerate(names) if index < leading or name in columns]
+    _positions[url] = (positions, [names[index] for index in positions])
+    return df.iloc[:, positions]
+
+
+def _parse(content, url, columns=None, dtype=None, dates=None, leading=0):
+    """
+    Lit le contenu téléchargé en ne gardant que `columns` (noms comparés sans espaces superflus)
+    et, s'il y a lieu, les `leading` premières colonnes lues par position.
+    openpyxl lit de toute façon chaque cellule : la projection n'y est appliquée qu'après lecture.
+    """
+    if columns and leading:
+        df = _read_positions(content, url, columns, dtype, leading)
+    else:
+        df = _read(content, url, (lambda column: str(column).strip() in columns) if columns else None, dtype)
+    if _is_csv(url):
+        df.columns = df.columns.str.strip()
+        # Le CSV ne porte pas de types : dates jj/mm/aaaa converties comme le ferait le classeur
+        for column in dates or []:
+            if column in df.columns:
+                df[column] = pd.to_datetime(df[column], dayfirst=True, errors='coerce')
+    return df
+
+
+def read_source(url, if_changed=False, fetcher=None, columns=None, dtype=None, dates=None, leading=0):
+    """
+    Télécharge un export, le lit depuis la mémoire et nettoie les noms de colonnes.
+    `columns` / `dtype` / `dates` / `leading` : projection, types, colonnes de dates et colonnes
+    de tête appliqués à la lecture (voir config.SOURCE_COLUMNS).
+    Avec `if_changed=True`, retourne None sans relire le classeur s'il n'a pas changé
+    depuis le précédent téléchargement par le même client (`fetcher`, partagé par défaut).
+    L'empreinte SHA-256 du contenu téléchargé est conservée dans df.attrs["digest"] :
+    elle identifie l'instantané d'un processus à l'autre (voir artifacts.py).
+    """
+    url = export_url(url)
+    fetcher = fetcher or get_fetcher()
+    result = fetcher.fetch(url, conditional=if_changed)
+    if not result.changed:
+        return None
+    try:
+        df = _parse(result.content, url, columns, dtype, dates, leading)
+    except Exception:
+        # Contenu illisible : il ne doit pas être reconnu comme inchangé au prochain téléchargement
+        fetcher.forget(url)
+        raise
+    df.columns = df.columns.str.strip()
+    df.attrs["digest"] = result.digest
+    return df
+
+
+def read_options(name):
+    """Projection, types, dates et colonnes de tête déclarés pour la source `name` (arguments de read_source)."""
+    return {
+        "columns": config.SOURCE_COLUMNS.get(name),
+        "dtype": config.SOURCE_DTYPES.get(name),
+        "dates": config.SOURCE_DATE_COLUMNS.get(name),
+        "leading": config.SOURCE_LEADING_COLUMNS.get(name, 0),
+    }
+
+
+def prepare_source(name, df):
+    """
+    Pré-traitements communs à toutes les pages, uniquement additifs :
+    numéros de rencontre en texte, colonnes de dates converties (rencontres_date_dt, DATE_dt)
+    et identifiants entiers des clés de jointure (config.KEY_COLUMNS, voir keys.py).
+    """
+    if df.empty:
+        return df
+    encode_columns(df, config.KEY_COLUMNS.get(name))
+    if name == "rencontres":
+        if config.COLUMN_MAPPING['rencontres_numero'] in df.columns:
+            df[config.COLUMN_MAPPING['rencontres_numero']] = df[config.COLUMN_MAPPING['rencontres_numero']].astype(str)
+        if config.COLUMN_MAPPING['rencontres_date'] in df.columns:
+            df['rencontres_date_dt'] = pd.to_datetime(df[config.COLUMN_MAPPING['rencontres_date']], errors='coerce')
+    elif name == "dispo":
+        if config.COLUMN_MAPPING['dispo_date'] in df.columns:
+            df['DATE_dt'] = pd.to_datetime(df[config.COLUMN_MAPPING['dispo_date']], errors='coerce')
+    return df
+
+
+def load_source(name, if_changed=False, fetcher=None, reader=None):
+    """
+    Lit et pré-traite la source `name` déclarée dans config.SOURCES (None si inchangée, voir read_source).
+    `reader` : lecteur par l'API Google Sheets (sheets.SheetsValuesReader), utilisé pour les URLs
+    qu'il prend en charge ; l'export est lu si la lecture par l'API échoue.
+    """
+    url = config.SOURCES[name]
+    if reader is not None and reader.handles(url):
+        try:
+            df = reader.read(url, if_changed=if_changed, **read_options(name))
+            return None if df is None else prepare_source(name, df)
+        except Exception as e:
+            logger.warning("Lecture de %s par l'API Google Sheets échouée, lecture de l'export : %s", name, e)
+    df = read_source(url, if_changed=if_changed, fetcher=fetcher, **read_options(name))
+    return None if df is None else prepare_source(name, df)
@@ -0,0 +1,274 @@
+"""
+Backends de stockage des feuilles Google Sheets.
+
+Les fonctions de lecture et d'écriture de sheets.py utilisent l'interface de gspread :
+    client.open_by_url(url) -> spreadsheet
+    spreadsheet.get_worksheet(index) -> worksheet
+    spreadsheet.values_batch_get(ranges, params) (lecture des sources par l'API)
+    worksheet.append_row / get_all_records / get_all_values / row_values
+             / update / clear / delete_rows
+Ce module fournit une implémentation locale de cette interface (SQLite),
+sans réseau ni identifiants, avec latence et erreurs de quota simulées,
+et un décompte des appels API pour les tests de charge.
+Le backend est choisi par config.SHEETS_BACKEND ("gspread" ou "local").
+"""
+import json
+import random
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+
+class LocalResponse:
+    """Réponse minimale exposée par les erreurs locales (comme gspread.exceptions.APIError.response)."""
+
+    def __init__(self, status_code, text):
+        self.status_code = status_code
+        self.text = text
+
+
+class QuotaExceededError(Exception):
+    """Erreur de quota simulée (HTTP 429), équivalente à une APIError gspread."""
+
+    def __init__(self, method):
+        self.response = LocalResponse(429, f"Quota exceeded for quota metric 'Read/Write requests' ({method})")
+        super().__init__(self.response.text)
+
+
+def spreadsheet_id_from_url(url):
+    """Extrait l'identifiant d'un classeur depuis une URL Google Sheets (export ou édition)."""
+    match = re.search(r'/d/([^/]+)', url)
+    return match.group(1) if match else url
+
+
+def _column_index(letters):
+    """Index (à partir de 0) d'une colonne en notation A1 ("A" -> 0, "AB" -> 27)."""
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - ord("A") + 1
+    return index - 1
+
+
+def parse_a1_range(range_name):
+    """
+    Plage A1 sans nom de feuille ("A1:C", "B2:D10", "1:1") -> (première colonne, dernière colonne
+    exclue, première ligne, dernière ligne exclue), à partir de 0 ; None pour une borne ouverte.
+    """
+    match = re.fullmatch(r"([A-Z]*)(\d*):([A-Z]*)(\d*)", range_name)
+    if not match:
+        raise ValueError(f"Plage non prise en charge : {range_name}")
+    first_col, first_row, last_col, last_row = match.groups()
+    return (
+        _column_index(first_col) if first_col else 0,
+        _column_index(last_col) + 1 if last_col else None,
+        int(first_row) - 1 if first_row else 0,
+        int(last_row) if last_row else None,
+    )
+
+
+def _trim(values):
+    """Retire les cellules vides en fin de liste, comme l'API Google Sheets."""
+    end = len(values)
+    while end and values[end - 1] in ("", None):
+        end -= 1
+    return values[:end]
+
+
+def _numericise(value):
+    """Convertit les valeurs numériques comme get_all_records de gspread."""
+    if isinstance(value, str) and value.strip():
+        try:
+            return int(value)
+        except ValueError:
+            try:
+                return float(value)
+            except ValueError:
+                return value
+    return value
+
+
+class LocalSheetsClient:
+    """
+    Client local émulant gspread.Client sur une base SQLite.
+    Chaque ligne de feuille est stockée en JSON, repérée par sa position (1 = en-tête).
+    """
+
+    def __init__(self, path, latency=0.0, quota_error_rate=0.0, seed=None):
+        self.path = path
+        self.latency = latency
+        self.quota_error_rate = quota_error_rate
+        self.call_counts = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS sheet_rows ("
+            " spreadsheet TEXT NOT NULL, worksheet INTEGER NOT NULL, position INTEGER NOT NULL, vals TEXT NOT NULL,"
+            " PRIMARY KEY (spreadsheet, worksheet, position))"
+        )
+
+    # --- Simulation de l'API ---
+    def _api_call(self, method):
+        """Compte l'appel, applique la latence et lève éventuellement une erreur de quota."""
+        with self._lock:
+            self.call_counts[method] += 1
+            thread_counts = getattr(self._local, "counts", None)
+            if thread_counts is not None:
+                thread_counts[method] += 1
+            quota_error = self.quota_error_rate and self._random.random() < self.quota_error_rate
+        if self.latency:
+            time.sleep(self.latency)
+        if quota_error:
+            raise QuotaExceededError(method)
+
+    def start_thread_count(self):
+        """Démarre le décompte des appels du thread courant (tests de charge par action)."""
+        self._local.counts = Counter()
+
+    def thread_call_counts(self):
+        return Counter(getattr(self._local, "counts", Counter()))
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            return self._connection.execute(sql, params).fetchall()
+
+    def _transaction(self, statements):
+        """Exécute une liste de (sql, params) dans une seule transaction."""
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                for sql, params in statements:
+                    self._connection.execute(sql, params)
+                self._connection.execute("COMMIT")
+            except Exception:
+                self._connection.execute("ROLLBACK")
+                raise
+
+    # --- Interface gspread.Client ---
+    def open_by_url(self, url):
+        self._api_call("open_by_url")
+        return LocalSpreadsheet(self, spreadsheet_id_from_url(url))
+
+    def close(self):
+        self._connection.close()
+
+
+class LocalSpreadsheet:
+    def __init__(self, client, spreadsheet_id):
+        self.client = client
+        self.id = spreadsheet_id
+
+    def get_worksheet(self, index):
+        self.client._api_call("get_worksheet")
+        return LocalWorksheet(self.client, self.id, index)
+
+    def values_batch_get(self, ranges, params=None):
+        """
+        Plages A1 de la première feuille, par lignes ou par colonnes (params["majorDimension"]),
+        sans les cellules vides de fin, comme spreadsheets.values.batchGet. Les valeurs sont
+        celles enregistrées (pas de numéros de série pour les dates).
+        """
+        self.client._api_call("values_batch_get")
+        rows = LocalWorksheet(self.client, self.id, 0)._rows()
+        by_columns = (params or {}).get("majorDimension") == "COLUMNS"
+        value_ranges = []
+        for range_name in ranges:
+            first_col, last_col, first_row, last_row = parse_a1_range(range_name)
+            selected = [list(row[first_col:last_col]) for row in rows[first_row:last_row]]
+            width = max((len(row) for row in selected), default=0)
+            if last_col is not None:
+                width = last_col - first_col
+            selected = [row + [""] * (width - len(row)) for row in selected]
+            if by_columns:
+                values = [_trim([row[i] for row in selected]) for i in range(width)]
+            else:
+                values = [_trim(row) for row in selected]
+            while values and not values[-1]:
+                values.pop()
+            value_ranges.append({"range": range_name, "majorDimension": "COLUMNS" if by_columns else "ROWS", "values": values})
+        return {"spreadsheetId": self.id, "valueRanges": value_ranges}
+
+
+class LocalWorksheet:
+    def __init__(self, client, spreadsheet_id, index):
+        self.client = client
+        self.spreadsheet_id = spreadsheet_id
+        self.index = index
+
+    def _key(self):
+        return (self.spreadsheet_id, self.index)
+
+    def _rows(self):
+        rows = self.client._execute(
+            "SELECT vals FROM sheet_rows WHERE spreadsheet = ? AND worksheet = ? ORDER BY position", self._key()
+        )
+        return [json.loads(vals) for (vals,) in rows]
+
+    def get_all_values(self):
+        self.client._api_call("get_all_values")
+        return self._rows()
+
+    def get_all_records(self):
+        self.client._api_call("get_all_records")
+        rows = self._rows()
+        if not rows:
+            return []
+        header = rows[0]
+        return [
+            {col: _numericise(row[i]) if i < len(row) else "" for i, col in enumerate(header)}
+            for row in rows[1:]
+        ]
+
+    def row_values(self, row):
+        self.client._api_call("row_values")
+        found = self.client._execute(
+            "SELECT vals FROM sheet_rows WHERE spreadsheet = ? AND worksheet = ? AND position = ?", self._key() + (row,)
+        )
+        return json.loads(found[0][0]) if found else []
+
+    def append_row(self, values):
+        self.client._api_call("append_row")
+        # La position est calculée dans la transaction : deux ajouts concurrents ne se chevauchent pas
+        self.client._transaction([(
+            "INSERT INTO sheet_rows (spreadsheet, worksheet, position, vals) "
+            "SELECT ?, ?, COALESCE(MAX(position), 0) + 1, ? FROM sheet_rows WHERE spreadsheet = ? AND worksheet = ?",
+            self._key() + (json.dumps(list(values), default=str),) + self._key(),
+        )])
+
+    def update(self, values, range_name=None):
+        """
+        Écrit `values` à partir de A1 (seul cas utilisé par l'application). Les lignes vidées
+        ne sont pas conservées : comme l'API, les lectures omettent les lignes vides de fin.
+        """
+        self.client._api_call("update")
+        statements = [(
+            "DELETE FROM sheet_rows WHERE spreadsheet = ? AND worksheet = ? AND position <= ?",
+            self._key() + (len(values),),
+        )]
+        statements += [
+            ("INSERT INTO sheet_rows (spreadsheet, worksheet, position, vals) VALUES (?, ?, ?, ?)",
+             self._key() + (position, json.dumps(list(row), default=str)))
+            for position, row in enumerate(values, start=1) if _trim(list(row))
+        ]
+        self.client._transaction(statements)
+
+    def clear(self):
+        self.client._api_call("clear")
+        self.client._transaction([("DELETE FROM sheet_rows WHERE spreadsheet = ? AND worksheet = ?", self._key())])
+
+    def delete_rows(self, start_index, end_index=None):
+        self.client._api_call("delete_rows")
+        end_index = end_index or start_index
+        # Décalage en deux temps pour ne pas violer la clé primaire pendant la mise à jour
+        self.client._transaction([
+            ("DELETE FROM sheet_rows WHERE spreadsheet = ? AND worksheet = ? AND position BETWEEN ? AND ?",
+             self._key() + (start_index, end_index)),
+            ("UPDATE sheet_rows SET position = -(position - ?) WHERE spreadsheet = ? AND worksheet = ? AND position > ?",
+             (end_index - start_index + 1,) + self._key() + (end_index,)),
+            ("UPDATE sheet_rows SET position = -position WHERE spreadsheet = ? AND worksheet = ? AND position < 0",
+             self._key()),
+        ])
+
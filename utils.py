@@ -1,11 +1,50 @@
-import re
 import pandas as pd
 import streamlit as st
-import gspread
-from google.oauth2.service_account import Credentials
-import os
-from datetime import timedelta
+import json
+from collections import Counter
+from functools import partial
 import config
+import pipeline
+import sheets
+from instrumentation import CATEGORIES, current_spans, end_run, export_metrics, instrumented, run_report, startup_report, summarize, timed
+from designations_store import SheetMirror
+from refresh import SnapshotRefresher
+from snapshot_store import SharedSnapshotStore
+from fetch import ExportFetcher
+from gateway import get_gateway
+from sources import load_source, read_options, read_source
+from partitions import WeeklyPartitions
+from conflicts import ConflictIndex
+from workload import WorkloadView
+from capacity import build_capacity
+from distances import DistanceMatrix
+from exports import ExportManager, sheets_by_competition, sheets_by_referee, weekend_designations, write_sheets
+from prefetch import PrefetchCache
+from artifacts import ArtifactStore, partitions_key, sources_key
+from sheets import create_client
+# Traitements sans Streamlit (pipeline.py), exposés aux pages depuis ce module
+from pipeline import (
+    build_candidates,
+    build_dispo_grid,
+    club_locations,
+    designation_record,
+    extract_club_code_from_team_string,
+    extract_club_name_from_team_string,
+    frame_fingerprint,
+    get_arbitre_status_for_date,
+    get_cp_from_club_code,
+    get_cp_from_club_name,
+    get_cp_from_club_name_or_code,
+    get_department_from_club_code,
+    get_department_from_club_name,
+    get_department_from_club_name_or_code,
+    highlight_designated_cells,
+    merge_ffr_data,
+)
+
+def source_name(url):
+    """Nom court d'une source (clé de config.SOURCES), ou l'URL si elle n'est pas déclarée."""
+    return next((name for name, source_url in config.SOURCES.items() if source_url == url), url)
 
 @st.cache_data
 def load_data(url):
@@ -13,43 +52,278 @@ def load_data(url):
     Charge des données depuis une URL Excel, avec gestion du cache et des erreurs.
     """
     try:
-        df = pd.read_excel(url)
-        df.columns = df.columns.str.strip()
-        return df
+        with timed(f"lecture XLSX {source_name(url)}", "chargement"):
+            return read_source(url, **read_options(source_name(url)))
     except Exception as e:
         st.error(f"Impossible de charger les données depuis {url}. Erreur: {e}")
         return pd.DataFrame()
 
+@st.cache_resource
+def get_artifact_store():
+    """
+    Artefacts de démarrage à chaud (voir artifacts.py), None si config.ARTIFACTS_DIR est vide.
+    Restaure les clés encodées sauvegardées : à créer avant le premier chargement d'une source.
+    """
+    if not config.ARTIFACTS_DIR:
+        return None
+    store = ArtifactStore(config.ARTIFACTS_DIR, max_per_name=config.ARTIFACTS_PER_NAME)
+    with timed("restauration des clés encodées", "chargement"):
+        store.restore_keys()
+    return store
+
+@st.cache_resource
+def get_shared_snapshots():
+    """Instantanés partagés entre réplicas (voir snapshot_store.py), None si config.SHARED_SNAPSHOTS_DIR est vide."""
+    if not config.SHARED_SNAPSHOTS_DIR:
+        return None
+    return SharedSnapshotStore(config.SHARED_SNAPSHOTS_DIR, keep=config.SHARED_SNAPSHOTS_KEEP)
+
+def warm_start(name, key, build):
+    """
+    Structure dérivée `name` relue depuis les artefacts sur disque si elle y a été enregistrée
+    pour la même clé, sinon calculée par `build()` puis enregistrée. `key` doit décrire toutes
+    les entrées (voir data_digest) ; sans clé (None) ni dossier d'artefacts, `build()` est appelée.
+    """
+    store = get_artifact_store()
+    if store is None or key is None:
+        return build()
+    return store.get_or_build(name, key, build)
+
+@st.cache_resource
+def get_refresher():
+    """Rafraîchissement en arrière-plan des sources de config.REFRESH_INTERVALS (un par processus)."""
+    # Les clés encodées sauvegardées sont restaurées avant le premier chargement
+    get_artifact_store()
+    # Client de téléchargement propre : ses empreintes ne sont mises à jour que par ce rafraîchissement
+    fetcher = ExportFetcher()
+    # Lecture par l'API Google Sheets (config.SOURCE_READER), avec les identifiants lus ici (hors des threads de fond)
+    reader = sheets.SheetsValuesReader(partial(create_client, _service_account_info())) if config.SOURCE_READER == "api" else None
+    loaders = {name: partial(load_source, name, fetcher=fetcher, reader=reader) for name in config.REFRESH_INTERVALS}
+    shared = get_shared_snapshots()
+    if shared is None:
+        return SnapshotRefresher(loaders, config.REFRESH_INTERVALS).start()
+    # Plusieurs réplicas : une source n'est téléchargée que par l'un d'eux, les autres relisent son instantané
+    loaders = {name: shared.loader(name, load, config.REFRESH_INTERVALS[name]) for name, load in loaders.items()}
+    refresher = SnapshotRefresher(loaders, config.REFRESH_INTERVALS).start()
+    shared.watch(lambda name: name in loaders and refresher.request_refresh(name), interval=config.SHARED_SNAPSHOTS_POLL)
+    return refresher
+
+def load_dataset(name, weekends=None):
+    """
+    Dernier instantané de la source `name`, sans attendre un rechargement en cours.
+    Retourne une copie superficielle : les pages peuvent ajouter ou renommer des colonnes.
+    Avec `weekends`, seuls le week-end courant et les suivants (source partitionnée) sont retournés.
+    """
+    if weekends and name in config.PARTITION_DATE_COLUMNS:
+        return get_partitions(name).upcoming(weekends).copy(deep=False)
+    refresher = get_refresher()
+    with timed(f"instantané {name}", "chargement"):
+        snapshot = refresher.get(name, timeout=config.FIRST_LOAD_TIMEOUT)
+    if snapshot.version == 0 and not refresher.error(name):
+        st.warning(f"Les données {name} sont encore en cours de chargement.")
+    elif snapshot.df.empty and refresher.error(name):
+        st.error(f"Impossible de charger les données {name}. Erreur: {refresher.error(name)}")
+    return snapshot.df.copy(deep=False)
+
+@st.cache_resource(max_entries=8)
+def _weekly_partitions(name, version, _df, _digest):
+    def build():
+        with timed(f"partitionnement {name}", "traitement"):
+            return WeeklyPartitions(_df, config.PARTITION_DATE_COLUMNS[name])
+    return warm_start(f"partitions_{name}", partitions_key(name, _digest), build)
+
+def get_partitions(name):
+    """Partitions hebdomadaires de la source `name` (voir partitions.py), recalculées à chaque nouvelle version."""
+    snapshot = get_refresher().get(name, timeout=config.FIRST_LOAD_TIMEOUT)
+    return _weekly_partitions(name, snapshot.version, snapshot.df, snapshot.digest)
+
+def data_version(*names):
+    """
+    Versions des instantanés des sources demandées (toutes par défaut), pour indexer les caches.
+    Avec plusieurs réplicas, "designations" donne aussi la version partagée des désignations manuelles,
+    incrémentée à chaque écriture par un autre réplica (les écritures de ce processus mettent à jour
+    ses caches directement).
+    """
+    versions = get_refresher().versions()
+    shared = get_shared_snapshots()
+    if shared is not None:
+        versions += (("designations", shared.external_version("designations")),)
+    return tuple((name, version) for name, version in versions if not names or name in names)
+
+def data_digest(*names):
+    """
+    Empreintes du contenu des instantanés `names`, identiques d'un processus à l'autre :
+    clé des artefacts de démarrage à chaud (None si une source n'est pas encore chargée).
+    """
+    refresher = get_refresher()
+    return sources_key({name: refresher.get(name, timeout=0).digest for name in names})
+
+def request_data_refresh(name=None):
+    """Lance le rechargement en arrière-plan d'une source (ou de toutes) sans bloquer la page."""
+    shared = get_shared_snapshots()
+    if shared is not None:
+        # Téléchargement même si un autre réplica vient de vérifier la source
+        for source in ([name] if name else config.REFRESH_INTERVALS):
+            shared.expire(source)
+    get_refresher().request_refresh(name)
+
+def display_data_freshness():
+    """Affiche dans la barre latérale la date des données servies pour chaque source."""
+    refresher = get_refresher()
+    with st.sidebar.expander("🕒 Données au", expanded=False):
+        for name in config.REFRESH_INTERVALS:
+            snapshot = refresher.get(name, timeout=0)
+            loaded_at = snapshot.loaded_at.strftime('%d/%m %H:%M:%S') if snapshot.loaded_at else "jamais"
+            statut = " 🔄" if refresher.is_refreshing(name) else (" ⚠️" if refresher.error(name) else "")
+            st.caption(f"**{name}** : {loaded_at}{statut}")
+
+def initialize_session_data():
+    """
+    Place les instantanés courants dans la session. Recharge les DataFrames de session
+    uniquement si une source a changé de version depuis le dernier passage.
+    """
+    versions = data_version()
+    if st.session_state.get('data_loaded') and st.session_state.get('data_versions') == versions:
+        return
+    with st.spinner("Chargement et préparation des données..."):
+        gc = get_gspread_client()
+        st.session_state.categories_df = config.load_static_categories()
+        st.session_state.competitions_df = config.load_static_competitions()
+        st.session_state.rencontres_df = load_dataset("rencontres", weekends=config.STARTUP_WEEKENDS)
+        st.session_state.dispo_df = load_dataset("dispo", weekends=config.STARTUP_WEEKENDS)
+        st.session_state.arbitres_df = load_dataset("arbitres")
+        st.session_state.club_df = load_dataset("clubs")
+        st.session_state.rencontres_ffr_df = load_dataset("rencontres_ffr")
+        st.session_state.designations_df = load_designations(gc)
+
+        # --- Pré-traitement centralisé ---
+        # Les jointures utilisent les colonnes rencontre_id / licence_id (config.KEY_COLUMNS)
+        for df_key in ['rencontres_ffr_df', 'designations_df']:
+            df = st.session_state[df_key]
+            if not df.empty and "NUMERO DE RENCONTRE" in df.columns:
+                df.rename(columns={"NUMERO DE RENCONTRE": "RENCONTRE NUMERO"}, inplace=True)
+
+        # Identifiant du jeu de données chargé : sert de clé aux caches dérivés
+        st.session_state.data_versions = data_version()
+        st.session_state.data_snapshot = f"{st.session_state.data_versions}|{pd.Timestamp.now().isoformat()}"
+        st.session_state.data_loaded = True
+
+def _service_account_info():
+    """Identifiants du compte de service déclarés dans les secrets Streamlit (None sinon)."""
+    try:
+        return st.secrets["gcp_service_account"] if "gcp_service_account" in st.secrets else None
+    except Exception: return None
+
 @st.cache_resource(ttl=3600)
+@instrumented("authentification Google Sheets", "sheets")
 def get_gspread_client():
+    """Client Google Sheets (ou son émulation locale si config.SHEETS_BACKEND == "local"), None sans identifiants."""
     try:
-        if os.path.exists(config.SERVICE_ACCOUNT_FILE):
-            creds = Credentials.from_service_account_file(config.SERVICE_ACCOUNT_FILE, scopes=['https://www.googleapis.com/auth/spreadsheets', 'https://www.googleapis.com/auth/drive'])
-        elif "gcp_service_account" in st.secrets:
-            creds = Credentials.from_service_account_info(st.secrets["gcp_service_account"], scopes=['https://www.googleapis.com/auth/spreadsheets', 'https://www.googleapis.com/auth/drive'])
-        else: return None
-        return gspread.authorize(creds)
+        return create_client(_service_account_info())
     except Exception: return None
 
+def designations_store_enabled():
+    return config.DESIGNATIONS_STORE == "sqlite"
+
+def can_write_designations(client):
+    """Vrai si une désignation peut être enregistrée (base locale ou client Google Sheets)."""
+    return designations_store_enabled() or client is not None
+
+@st.cache_resource
+def get_designation_store():
+    """
+    Base locale des désignations, importée depuis la feuille au premier démarrage,
+    avec sa publication en arrière-plan vers DESIGNATIONS_URL.
+    """
+    store = sheets.open_designation_store(get_gspread_client, on_error=lambda e: st.error(f"Erreur Google Sheets : {str(e)}"))
+    store.mirror = SheetMirror(store, get_gspread_client, config.DESIGNATIONS_URL, delay=config.DESIGNATIONS_EXPORT_DELAY)
+    return store
+
+@st.cache_resource(max_entries=2, ttl=600)
+def _conflict_index(versions):
+    with timed("index des conflits", "traitement"):
+        return ConflictIndex.from_sources(
+            load_dataset("rencontres_ffr"),
+            load_designations(get_gspread_client()),
+            load_dataset("dispo"),
+        )
+
+def get_conflict_index():
+    """
+    Index des doubles désignations (voir conflicts.py), reconstruit quand les désignations FFR
+    ou les disponibilités changent de version, mis à jour à chaque désignation manuelle
+    (reconstruit après un remplacement complet ou une écriture d'un autre réplica).
+    """
+    return _conflict_index(data_version("rencontres_ffr", "dispo") + designations_revision(incremental=True))
+
+@st.cache_resource(max_entries=2, ttl=600)
+def _workload_view(versions):
+    with timed("charge des arbitres", "traitement"):
+        return WorkloadView.from_sources(load_dataset("rencontres_ffr"), load_designations(get_gspread_client()))
+
+def get_workload_view():
+    """
+    Charge des arbitres (voir workload.py), reconstruite quand les désignations FFR
+    changent de version, mise à jour à chaque désignation manuelle (reconstruite après un
+    remplacement complet ou une écriture d'un autre réplica).
+    """
+    return _workload_view(data_version("rencontres_ffr") + designations_revision(incremental=True))
+
+def display_designations_sync_status():
+    """Affiche dans la barre latérale l'état de publication de la base locale vers Google Sheets."""
+    if not designations_store_enabled():
+        return
+    mirror = get_designation_store().mirror
+    if mirror.last_error:
+        st.sidebar.warning(f"Publication Google Sheets en échec : {mirror.last_error}")
+    elif mirror.pending:
+        st.sidebar.caption("⏳ Publication vers Google Sheets en attente")
+    elif mirror.last_export_at:
+        st.sidebar.caption(f"✅ Google Sheets à jour ({mirror.last_export_at.strftime('%H:%M:%S')})")
+
+@st.cache_resource
+def _designation_writes():
+    """Écritures de désignations faites par ce processus (voir designations_revision)."""
+    return Counter()
+
+def designations_revision(incremental=False):
+    """
+    Révision des désignations manuelles, pour indexer les caches qui les relisent entièrement :
+    écritures de ce processus et version partagée des écritures des autres réplicas.
+    `incremental=True` : révision des caches mis à jour à chaque ajout ou suppression
+    (add_manual / remove_manual), changée seulement par les remplacements complets.
+    """
+    writes = _designation_writes()
+    return (writes["remplacements" if incremental else "designations"],) + data_version("designations")
+
+def notify_designations_changed(incremental=False):
+    """
+    Signale une écriture de désignation : les caches indexés par designations_revision sont
+    invalidés, comme les caches dérivés des désignations des autres réplicas. `incremental=True` :
+    ajout ou suppression d'une ligne, déjà reportés dans les caches incrémentaux de ce processus.
+    """
+    writes = _designation_writes()
+    writes["designations"] += 1
+    if not incremental:
+        writes["remplacements"] += 1
+    shared = get_shared_snapshots()
+    if shared is not None:
+        try:
+            shared.bump("designations")
+        except OSError as e:
+            st.warning(f"Les autres instances de l'application ne verront cette modification qu'au prochain rafraîchissement : {e}")
+
 def enregistrer_designation(client, designation_url, rencontre_details, arbitre_details, dpt_terrain, role):
     try:
-        spreadsheet = client.open_by_url(designation_url)
-        worksheet = spreadsheet.get_worksheet(0)
-        nouvelle_ligne = [
-            rencontre_details.get("rencontres_date_dt", pd.NaT).strftime("%d/%m/%Y"),
-            role,
-            arbitre_details.get("Nom", "N/A"),
-            arbitre_details.get("Prénom", "N/A"),
-            arbitre_details.get("Département de Résidence", "N/A"),
-            arbitre_details.get("Numéro Affiliation", "N/A"), # Ajout du numéro de licence
-            rencontre_details.get("Structure Organisatrice Nom", "N/A"),
-            rencontre_details.get("COMPETITION NOM", "N/A"),
-            rencontre_details.get("RENCONTRE NUMERO", "N/A"),
-            rencontre_details.get("LOCAUX", "N/A"),
-            rencontre_details.get("VISITEURS", "N/A"),
-            dpt_terrain
-        ]
-        worksheet.append_row(nouvelle_ligne)
+        designation = designation_record(rencontre_details, arbitre_details, dpt_terrain, role)
+        if designations_store_enabled():
+            with timed("ajout désignation (base locale)", "traitement"):
+                get_designation_store().add(designation)
+        else:
+            sheets.append_row(client, designation_url, list(designation.values()))
+        get_conflict_index().add_manual(designation)
+        get_workload_view().add_manual(designation)
+        notify_designations_changed(incremental=True)
         return True
     except Exception as e:
         st.error(f"Erreur Google Sheets : {e}")
@@ -58,242 +332,291 @@ def enregistrer_designation(client, designation_url, rencontre_details, arbitre_
 def load_designations_from_sheets(client, designation_url):
     try:
         if client:
-            spreadsheet = client.open_by_url(designation_url)
-            worksheet = spreadsheet.get_worksheet(0)
-            return pd.DataFrame(worksheet.get_all_records())
+            return sheets.read_records(client, designation_url)
         return pd.DataFrame()
     except Exception as e:
         st.error(f"Erreur Google Sheets : {str(e)}")
         return pd.DataFrame()
 
-def get_arbitre_status_for_date(arbitre_affiliation, match_date, dispo_df):
-    start_of_week = match_date - timedelta(days=match_date.weekday())
-    saturday = start_of_week + timedelta(days=5)
-    sunday = start_of_week + timedelta(days=6)
-    weekend_dispo = dispo_df[(dispo_df['NO LICENCE'] == arbitre_affiliation) & (dispo_df['DATE_dt'].dt.date >= saturday.date()) & (dispo_df['DATE_dt'].dt.date <= sunday.date())]
-    if weekend_dispo.empty: return "🤷‍♂️ Non renseignée", False
-    match_day_status = weekend_dispo[weekend_dispo['DATE_dt'].dt.date == match_date.date()]
-    if not match_day_status.empty:
-        designation_val = match_day_status.iloc[0].get('DESIGNATION')
-        designation_str = str(designation_val).strip()
-        if pd.notna(designation_val) and designation_str != '' and designation_str != '0': return f"❌ Déjà désigné(e) sur : {designation_val}", False
-    available_keywords = ['oui', 'we', 'samedi', 'dimanche']
-    is_available = any(any(keyword in str(row.get('DISPONIBILITE', '')).lower() for keyword in available_keywords) for index, row in weekend_dispo.iterrows())
-    if is_available: return "✅ Disponible", True
-    else: return f"❓ Non disponible ({weekend_dispo.iloc[0].get('DISPONIBILITE', '')})", False
+def load_designations(client):
+    """
+    Charge les désignations manuelles depuis la feuille, avec repli sur l'export XLSX
+    si la feuille est vide ou inaccessible (sauf avec le backend local, sans réseau).
+    Avec la base locale (config.DESIGNATIONS_STORE == "sqlite"), lecture directe de la base.
+    Ajoute les identifiants rencontre_id et licence_id (config.KEY_COLUMNS).
+    """
+    return sheets.load_designations(
+        client,
+        store=get_designation_store() if designations_store_enabled() else None,
+        on_error=lambda e: st.error(f"Erreur Google Sheets : {str(e)}"),
+        read_export=load_data,
+    )
+
+def supprimer_designation(client, designation_url, rencontre_numero, nom, prenom, fonction):
+    """Supprime la première ligne de la feuille correspondant à la désignation. Retourne True si supprimée."""
+    try:
+        if designations_store_enabled():
+            supprimee = get_designation_store().delete_matching(rencontre_numero, nom, prenom, fonction)
+        else:
+            supprimee = sheets.delete_designation(client, designation_url, rencontre_numero, nom, prenom, fonction)
+        if not supprimee:
+            st.error("Impossible de trouver la désignation à supprimer.")
+            return False
+        get_conflict_index().remove_manual(rencontre_numero, nom, prenom, fonction)
+        get_workload_view().remove_manual(rencontre_numero, nom, prenom, fonction)
+        notify_designations_changed(incremental=True)
+        return True
+    except Exception as e:
+        st.error(f"Erreur lors de la suppression : {e}")
+        return False
+
+def remplacer_designations(client, designation_url, df):
+    """
+    Remplace toutes les désignations manuelles par celles de `df` : dans la base locale si elle est
+    activée (publiée ensuite vers la feuille par SheetMirror), sinon directement dans la feuille.
+    Retourne True si réussi.
+    """
+    if designations_store_enabled():
+        try:
+            get_designation_store().replace_all(sheets.dates_as_text(df.copy()))
+        except Exception as e:
+            st.error(f"Erreur lors du remplacement des désignations : {e}")
+            return False
+    elif not update_google_sheet(client, designation_url, df):
+        return False
+    notify_designations_changed()
+    return True
+
+def effacer_designations(client, designation_url):
+    """Efface toutes les désignations manuelles (base locale si elle est activée, sinon la feuille sauf l'en-tête)."""
+    if designations_store_enabled():
+        return remplacer_designations(client, designation_url, pd.DataFrame(columns=config.DESIGNATIONS_COLUMNS))
+    if not clear_sheet_except_header(client, designation_url):
+        return False
+    notify_designations_changed()
+    return True
 
+@instrumented("mise à jour feuille", "sheets")
 def update_google_sheet(client, sheet_url, df_new):
     try:
-        spreadsheet = client.open_by_url(sheet_url)
-        worksheet = spreadsheet.get_worksheet(0)
-        worksheet.clear()
-        for col in df_new.select_dtypes(include=['datetime64', 'datetime64[ns]']).columns:
-            df_new[col] = df_new[col].dt.strftime('%Y-%m-%d %H:%M:%S')
-        data_to_write = df_new.astype(object).where(pd.notna(df_new), None).values.tolist()
-        worksheet.update([df_new.columns.values.tolist()] + data_to_write)
+        sheets.replace_contents(client, sheet_url, df_new)
         st.success(f"Feuille Google Sheet mise à jour avec succès pour l'URL : {sheet_url}")
         return True
-    except gspread.exceptions.SpreadsheetNotFound:
+    except sheets.not_found_errors():
         st.error(f"Erreur : Feuille Google Sheet introuvable pour l'URL : {sheet_url}. Vérifiez l'ID et les permissions.")
         return False
-    except gspread.exceptions.APIError as e:
+    except sheets.api_errors() as e:
         st.error(f"Erreur API Google Sheets lors de la mise à jour ({sheet_url}) : {e.response.text}")
         return False
     except Exception as e:
         st.error(f"Erreur inattendue lors de la mise à jour de la feuille Google Sheet ({sheet_url}) : {e}")
         return False
 
+@instrumented("effacement feuille", "sheets")
 def clear_sheet_except_header(client, sheet_url):
     try:
-        spreadsheet = client.open_by_url(sheet_url)
-        worksheet = spreadsheet.get_worksheet(0)
-        header = worksheet.row_values(1)
-        worksheet.clear()
-        worksheet.update([header])
+        sheets.clear_except_header(client, sheet_url)
         st.success(f"Toutes les lignes (sauf l'en-tête) ont été effacées de la feuille : {sheet_url}")
         return True
-    except gspread.exceptions.SpreadsheetNotFound:
+    except sheets.not_found_errors():
         st.error(f"Erreur : Feuille Google Sheet introuvable pour l'URL : {sheet_url}. Vérifiez l'ID et les permissions.")
         return False
-    except gspread.exceptions.APIError as e:
+    except sheets.api_errors() as e:
         st.error(f"Erreur API Google Sheets lors de l'effacement ({sheet_url}) : {e.response.text}")
         return False
     except Exception as e:
         st.error(f"Erreur inattendue lors de l'effacement de la feuille Google Sheet ({sheet_url}) : {e}")
         return False
 
-def extract_club_name_from_team_string(team_string):
+@st.cache_data(max_entries=8)
+def build_recap(_rencontres_df, _designations_df, snapshot_id):
+    """
+    Récapitulatif des désignations par rencontre (voir pipeline.build_recap).
+    Les DataFrames ne sont pas hachés : le cache est indexé par `snapshot_id`.
+    """
+    return pipeline.build_recap(_rencontres_df, _designations_df)
+
+@st.cache_data(max_entries=4)
+@instrumented("plan de charge", "traitement")
+def build_capacity_plan(_rencontres_df, _rencontres_ffr_df, _gc, _dispo_df, _arbitres_df, snapshot_id):
+    """
+    Postes à pourvoir et arbitres disponibles par week-end et bande de niveaux (voir capacity.py).
+    Les DataFrames ne sont pas hachés : le cache est indexé par `snapshot_id`. Les désignations
+    manuelles ne sont lues (client `_gc`) que lorsque le plan est recalculé.
+    """
+    return build_capacity(
+        _rencontres_df, _rencontres_ffr_df, load_designations(_gc), _dispo_df, _arbitres_df,
+        config.load_static_categories(), config.load_static_competitions(),
+    )
+
+def get_capacity_plan(gc=None):
+    """Plan de charge des instantanés courants et des désignations manuelles, sans lecture Google Sheets s'il est en cache."""
+    snapshot_id = (data_version("rencontres", "rencontres_ffr", "dispo", "arbitres"), designations_revision())
+    return build_capacity_plan(
+        load_dataset("rencontres"), load_dataset("rencontres_ffr"), gc if gc is not None else get_gspread_client(),
+        load_dataset("dispo"), load_dataset("arbitres"), snapshot_id,
+    )
+
+@st.cache_data(max_entries=16)
+def query_match_list(_rencontres_df, snapshot_id, competitions, recherche, tri, croissant, groupe):
     """
-    Extrait le nom du club d'une chaîne d'équipe (sans le code entre parenthèses)
-    Ex: "STADE ROCHELAIS (SRO)" -> "STADE ROCHELAIS"
+    Liste des rencontres filtrée, triée ou groupée côté serveur (voir pipeline.query_match_list).
+    Le DataFrame n'est pas haché : le cache est indexé par `snapshot_id` et les paramètres de la requête.
     """
-    match = re.search(r'^(.*?)\s*(\(\w+\))?$', str(team_string))
-    if match:
-        return match.group(1).strip()
-    return str(team_string).strip()
+    return pipeline.query_match_list(_rencontres_df, competitions, recherche, tri, croissant, groupe)
+
+@st.cache_resource
+def get_distance_matrix():
+    """Matrice des distances entre départements (data/distances.npz, voir distances.py)."""
+    return DistanceMatrix.load()
+
+def travel_by_weekend(designations_df, rencontres_ffr_df):
+    """Kilométrage des désignations manuelles et FFR par week-end (voir pipeline.travel_by_weekend)."""
+    return pipeline.travel_by_weekend(designations_df, rencontres_ffr_df, get_distance_matrix())
+
+@st.cache_resource
+def get_candidate_cache():
+    """Listes de candidats par rencontre (voir prefetch.py), partagées par toutes les sessions."""
+    return PrefetchCache(max_entries=config.CANDIDATE_CACHE_SIZE)
+
+@st.cache_resource(max_entries=2)
+def _club_locations(versions):
+    rencontres_df = load_dataset("rencontres")
+    club_df = load_dataset("clubs")
+    equipes = rencontres_df[config.COLUMN_MAPPING['rencontres_locaux']] if config.COLUMN_MAPPING['rencontres_locaux'] in rencontres_df.columns else []
+    return warm_start("localisation_clubs", data_digest("rencontres", "clubs"), partial(club_locations, equipes, club_df))
+
+def get_club_locations():
+    """Département du club et du terrain de chaque équipe recevante (voir pipeline.club_locations)."""
+    return _club_locations(data_version("rencontres", "clubs"))
+
+def _candidates_task(rencontre_details, arbitres_df, categories_df, competitions_df, club_df, dispo_df, strict):
+    key = ("candidats", rencontre_details['rencontre_id'], strict, data_version("rencontres", "arbitres", "clubs", "dispo"))
+    build = partial(
+        build_candidates, rencontre_details, arbitres_df, categories_df, competitions_df, club_df, dispo_df, strict,
+        get_distance_matrix(), get_club_locations(),
+    )
+    return key, build
 
-def extract_club_code_from_team_string(team_string):
+def get_candidates(rencontre_details, arbitres_df, categories_df, competitions_df, club_df, dispo_df, strict):
+    """Candidats de la rencontre (voir build_candidates), servis sans calcul si la rencontre a été anticipée."""
+    key, build = _candidates_task(rencontre_details, arbitres_df, categories_df, competitions_df, club_df, dispo_df, strict)
+    with timed("liste des candidats", "traitement"):
+        return get_candidate_cache().get(key, build)
+
+def prefetch_candidates(rencontres, arbitres_df, categories_df, competitions_df, club_df, strict):
     """
-    Extrait le code club entre parenthèses d'une chaîne d'équipe
-    Ex: "STADE ROCHELAIS (SRO)" -> "SRO"
-    Ex: "A C BOBIGNY 93 RUGBY (4581E)" -> "4581E"
+    Programme en arrière-plan le calcul des candidats des `rencontres` (lignes de la liste des rencontres),
+    chacune avec les disponibilités de sa semaine.
     """
-    match = re.search(r'\((.*?)\)', str(team_string))
-    if match:
-        return match.group(1).strip()
-    return None
+    cache = get_candidate_cache()
+    partitions = get_partitions("dispo")
+    for _, rencontre in rencontres.iterrows():
+        dispo_df = partitions.for_date(rencontre['rencontres_date_dt'])
+        cache.prefetch(*_candidates_task(rencontre, arbitres_df, categories_df, competitions_df, club_df, dispo_df, strict))
+
+@st.cache_resource
+def get_export_manager():
+    """Génération des exports en arrière-plan (voir exports.py), partagée par toutes les sessions."""
+    return ExportManager(max_workers=config.BULK_EXPORT_WORKERS, max_artifacts=config.BULK_EXPORT_ARTIFACTS)
 
-def get_department_from_club_name(club_name_full, club_df, column_mapping):
+def start_weekend_export(kind, fmt, week, designations_df, rencontres_ffr_df):
     """
-    Récupère le département à partir du nom du club (méthode originale)
+    Lance (ou retrouve) l'export des désignations du week-end `week` : une feuille par compétition
+    ou une convocation par arbitre (config.BULK_EXPORT_KINDS), en XLSX ou CSV. Retourne la tâche.
     """
-    extracted_name = extract_club_name_from_team_string(club_name_full)
-    club_df[column_mapping['club_nom']] = club_df[column_mapping['club_nom']].astype(str)
-    matching_clubs = club_df[club_df[column_mapping['club_nom']].str.contains(extracted_name, case=False, na=False)]
-    if not matching_clubs.empty:
-        # Prioritize exact match if available
-        exact_match = matching_clubs[matching_clubs[column_mapping['club_nom']] == extracted_name]
-        if not exact_match.empty:
-            best_match = exact_match.iloc[0]
+    manual = designations_df.reindex(columns=config.DESIGNATIONS_COLUMNS) if not designations_df.empty else designations_df
+    key = ("week-end", kind, fmt, week, data_version("rencontres_ffr"), frame_fingerprint(manual))
+
+    def build(progress):
+        progress(0.0, "Préparation des désignations")
+        designations = weekend_designations(designations_df, rencontres_ffr_df, week)
+        sheets = sheets_by_competition(designations) if kind == "competitions" else sheets_by_referee(designations)
+        return write_sheets(sheets or [("Désignations", designations)], fmt, progress)
+
+    return get_export_manager().submit(key, f"designations_{kind}_{week:%Y-%m-%d}", build)
+
+def start_table_export(name, df, fmt):
+    """Lance (ou retrouve) l'export d'un tableau affiché, en XLSX ou CSV. Retourne la tâche."""
+    key = ("tableau", name, fmt, tuple(df.columns), frame_fingerprint(df))
+    return get_export_manager().submit(key, name, lambda progress: write_sheets([(name, df)], fmt, progress))
+
+@st.fragment(run_every=1)
+def _display_export_progress(key):
+    job = get_export_manager().get(key)
+    if job is None or job.done:
+        st.rerun()
+    st.progress(job.progress, text=f"⏳ {job.name} : {job.message}")
+
+def display_export_job(key):
+    """Progression de l'export `key` (actualisée chaque seconde sans recharger la page), puis bouton de téléchargement."""
+    job = get_export_manager().get(key) if key else None
+    if job is None:
+        return
+    if not job.done:
+        _display_export_progress(key)
+    elif job.error:
+        st.error(f"L'export {job.name} a échoué : {job.error}")
+    else:
+        st.download_button(f"📥 Télécharger {job.filename}", job.content, file_name=job.filename, mime=job.mime, key=f"telecharger_{job.filename}")
+
+def display_startup_profile():
+    """Première exécution de chaque page dans le processus : imports déclenchés et durée du rendu."""
+    reports = startup_report()
+    if not reports:
+        return
+    with st.sidebar.expander("🚀 Démarrage du processus", expanded=False):
+        st.dataframe(
+            pd.DataFrame(reports)[["page", "imports_ms", "render_ms"]].rename(
+                columns={"page": "Page", "imports_ms": "Imports (ms)", "render_ms": "Première exécution (ms)"}
+            ),
+            hide_index=True,
+            use_container_width=True,
+        )
+        imports = [dict(entry, page=report["page"]) for report in reports for entry in report["imports"]]
+        if imports:
+            st.caption("Imports les plus longs")
+            st.dataframe(
+                pd.DataFrame(imports).nlargest(15, "duration_ms")[["page", "module", "by", "duration_ms"]],
+                hide_index=True,
+                use_container_width=True,
+            )
         else:
-            # If no exact match, use the longest name as a heuristic
-            best_match = matching_clubs.loc[matching_clubs[column_mapping['club_nom']].str.len().idxmax()]
-        
-        cp = str(best_match[column_mapping['club_cp']])
-        if len(cp) >= 2:
-            return cp[:2]
-    return "Non trouvé"
+            st.caption("Durée des imports : lancer l'application avec DESIGNATION_PROFILE_STARTUP=1.")
 
-def get_department_from_club_code(club_code, club_df, column_mapping):
+def display_timing_panel():
     """
-    Récupère le département à partir du code club (nouvelle méthode plus précise)
+    Termine l'exécution (profil de démarrage de la page à sa première exécution), exporte
+    les mesures (si TIMINGS_EXPORT_FILE est défini) et affiche le détail des durées et
+    les profils de démarrage dans la barre latérale en mode débogage.
     """
-    if not club_code:
-        return None
-    
-    # La colonne du code club dans club_df est 'Code'
-    club_code_col = 'Code' # As specified by user
-    if club_code_col not in club_df.columns:
-        return None
-    
-    # Recherche par code club exact
-    matching_club = club_df[club_df[column_mapping['club_code']] == club_code]
-    
-    if not matching_club.empty:
-        cp = str(matching_club.iloc[0][column_mapping['club_cp']])
-        if len(cp) >= 2:
-            return cp[:2]
-    return None
-
-def get_department_from_club_name_or_code(club_name_full, club_df, column_mapping):
-    """
-    Fonction combinée qui essaie d'abord par code, puis par nom
-    """
-    # Tentative 1 : Par code club
-    club_code = extract_club_code_from_team_string(club_name_full)
-    if club_code:
-        dept_by_code = get_department_from_club_code(club_code, club_df, column_mapping)
-        if dept_by_code:
-            return dept_by_code
-    
-    # Tentative 2 : Par nom (fallback)
-    return get_department_from_club_name(club_name_full, club_df, column_mapping)
-
-def get_cp_from_club_name(club_name_full, club_df, column_mapping):
-    """
-    Récupère le code postal complet à partir du nom du club
-    """
-    extracted_name = extract_club_name_from_team_string(club_name_full)
-    club_df[column_mapping['club_nom']] = club_df[column_mapping['club_nom']].astype(str)
-    matching_clubs = club_df[club_df[column_mapping['club_nom']].str.contains(extracted_name, case=False, na=False)]
-    if not matching_clubs.empty:
-        best_match = matching_clubs.loc[matching_clubs[column_mapping['club_nom']].str.len().idxmax()]
-        return str(best_match[column_mapping['club_cp']])
-    return "Non trouvé"
-
-def get_cp_from_club_code(club_code, club_df, column_mapping):
-    """
-    Récupère le code postal complet à partir du code club
-    """
-    if not club_code:
-        return "Non trouvé"
-    
-    club_code_col = 'Code' # As specified by user
-    if club_code_col not in club_df.columns:
-        return "Non trouvé"
-    
-    # Recherche par code club exact
-    matching_club = club_df[club_df[column_mapping['club_code']] == club_code]
-    
-    if not matching_club.empty:
-        return str(matching_club.iloc[0][column_mapping['club_cp']])
-    return "Non trouvé"
-
-def get_cp_from_club_name_or_code(club_name_full, club_df, column_mapping):
-    """
-    Fonction combinée pour récupérer le CP qui essaie d'abord par code, puis par nom
-    """
-    # Tentative 1 : Par code club
-    club_code = extract_club_code_from_team_string(club_name_full)
-    if club_code:
-        cp_by_code = get_cp_from_club_code(club_code, club_df, column_mapping)
-        if cp_by_code != "Non trouvé":
-            return cp_by_code
-    
-    # Tentative 2 : Par nom (fallback)
-    return get_cp_from_club_name(club_name_full, club_df, column_mapping)
-
-def highlight_designated_cells(df_to_style, grille_dispo, column_mapping):
-    """
-    Met en évidence les cellules selon la disponibilité et les désignations
-    - Fond vert pour les disponibilités "OUI"
-    - Fond rouge pour les disponibilités "NON" 
-    - Icône 🏈 pour les arbitres désignés (qui ont un match)
-    """
-    # Crée une matrice de style vide de la même taille que le df à styler.
-    style_matrix = pd.DataFrame('', index=df_to_style.index, columns=df_to_style.columns)
-    
-    # Récupère la partie "DESIGNATION" de la grille complète.
-    designation_data = grille_dispo[column_mapping['dispo_designation']]
-    
-    # Récupère la partie "DISPONIBILITE" de la grille complète.
-    disponibilite_data = grille_dispo[column_mapping['dispo_disponibilite']]
-    
-    # Crée un masque booléen où la désignation est 1 (en remplissant les non-valeurs par 0).
-    mask_designated = (designation_data.fillna(0) == 1)
-    
-    # Crée des masques pour les disponibilités "OUI" et "NON" - colonne par colonne
-    mask_dispo_oui = pd.DataFrame(False, index=disponibilite_data.index, columns=disponibilite_data.columns)
-    mask_dispo_non = pd.DataFrame(False, index=disponibilite_data.index, columns=disponibilite_data.columns)
-    
-    for col in disponibilite_data.columns:
-        mask_dispo_oui[col] = disponibilite_data[col].fillna('').astype(str).str.upper() == 'OUI'
-        mask_dispo_non[col] = disponibilite_data[col].fillna('').astype(str).str.upper() == 'NON'
-    
-    # Applique les styles aux colonnes communes (colonnes de date seulement)
-    date_columns = [col for col in df_to_style.columns if col not in [
-        column_mapping['arbitres_nom'],
-        column_mapping['arbitres_prenom'], 
-        column_mapping['arbitres_categorie'],
-        'Club',
-        'Nbr matchs\nà arbitrer'
-    ]]
-    
-    common_cols = style_matrix.columns.intersection(date_columns)
-    
-    # Applique le fond vert pour les disponibilités "OUI"
-    style_matrix.loc[:, common_cols] = style_matrix.loc[:, common_cols].mask(
-        mask_dispo_oui[common_cols], 'background-color: #C8E6C9'  # Vert clair
-    )
-    
-    # Applique le fond rouge pour les disponibilités "NON"
-    style_matrix.loc[:, common_cols] = style_matrix.loc[:, common_cols].mask(
-        mask_dispo_non[common_cols], 'background-color: #FFCDD2'  # Rouge clair
-    )
-    
-    # Pour les arbitres désignés, on ajoute l'icône 🏈 au lieu du fond orange
-    # On modifie directement le DataFrame affiché pour ajouter l'icône
-    for col in common_cols:
-        df_to_style.loc[mask_designated[col], col] = '🏈'
-    
-    return style_matrix
+    end_run()
+    if config.TIMINGS_EXPORT_FILE:
+        export_metrics(config.TIMINGS_EXPORT_FILE)
+    if not (config.DEBUG_TIMINGS or st.query_params.get("debug") == "1"):
+        return
+    display_startup_profile()
+    spans = current_spans()
+    with st.sidebar.expander("⏱️ Durées de l'exécution", expanded=True):
+        if not spans:
+            st.caption("Aucune mesure pour cette exécution.")
+            return
+        totals = summarize(spans)
+        for category in CATEGORIES:
+            if category in totals:
+                st.write(f"**{category.capitalize()}** : {totals[category]:.0f} ms")
+        gateway_stats = get_gateway().stats()
+        st.caption(
+            f"Google Sheets (processus) : {gateway_stats.get('requetes', 0)} requêtes, "
+            f"{gateway_stats['partagees']} lectures partagées, {gateway_stats.get('nouvelles_tentatives', 0)} nouvelles tentatives, "
+            f"{gateway_stats['attente_s']} s d'attente de quota"
+        )
+        details_df = pd.DataFrame(spans)
+        details_df['label'] = details_df['depth'].map(lambda depth: "\u00a0\u00a0" * depth) + details_df['label']
+        st.dataframe(details_df[['label', 'category', 'duration_ms']], hide_index=True, use_container_width=True)
+        st.download_button(
+            "Exporter (JSON)",
+            data=json.dumps(run_report(), ensure_ascii=False, indent=2),
+            file_name="mesures.json",
+            mime="application/json",
+        )
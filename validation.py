@@ -0,0 +1,132 @@
+"""
+Validation d'un classeur téléversé avant sa publication vers Google Sheets
+(page Mise à jour des données) : type de classeur, colonnes obligatoires
+(config.REQUIRED_COLUMNS), identifiants renseignés (config.KEY_COLUMNS), dates
+lisibles (config.SOURCE_DATE_COLUMNS), doublons (config.UNIQUE_COLUMNS) et
+valeurs des référentiels statiques (config.REFERENCE_COLUMNS).
+Chaque contrôle est évalué en une opération vectorisée sur tout le DataFrame
+et produit un masque des lignes en défaut ; les anomalies sont rapportées avec
+les numéros de ligne du classeur (en-tête = ligne 1). Une anomalie de niveau
+ERROR bloque la publication.
+Ce module n'importe pas Streamlit.
+"""
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+import config
+
+ERROR = "erreur"
+WARNING = "avertissement"
+
+# Contrôle en défaut : `mask` (booléens par ligne) vaut None pour un contrôle portant sur le fichier entier
+Check = namedtuple("Check", ["level", "rule", "column", "mask"])
+# Rapport de validation : anomalies (une ligne par contrôle), lignes en défaut annotées, publication bloquée
+Report = namedtuple("Report", ["violations", "rows", "blocking"])
+
+# Première ligne de données du classeur (la ligne 1 est l'en-tête)
+FIRST_ROW = 2
+
+# Colonnes caractéristiques de chaque source, pour reconnaître le type d'un classeur
+SIGNATURES = {**config.SOURCE_COLUMNS, "designations": config.DESIGNATIONS_COLUMNS}
+
+
+def _references():
+    return {
+        "competitions": set(config.load_static_competitions()[config.COLUMN_MAPPING["competitions_nom"]]),
+        "categories": set(config.load_static_categories()[config.COLUMN_MAPPING["categories_nom"]]),
+    }
+
+
+def _blank(series):
+    """Cellules vides : manquantes ou texte sans caractère visible."""
+    blank = series.isna()
+    if not (pd.api.types.is_numeric_dtype(series) or pd.api.types.is_datetime64_any_dtype(series)):
+        blank |= series.astype(str).str.strip().eq("")
+    return blank
+
+
+def detect_source(df):
+    """Source (clé de SIGNATURES) dont le classeur contient la plus grande part des colonnes caractéristiques."""
+    columns = set(df.columns)
+    scores = {name: len(columns.intersection(expected)) / len(expected) for name, expected in SIGNATURES.items()}
+    return max(scores, key=scores.get), scores
+
+
+def run_checks(name, df, references=None):
+    """Contrôles en défaut du DataFrame `df` téléversé pour la source `name` (liste de Check)."""
+    references = references or _references()
+    df = df.rename(columns=lambda column: str(column).strip())
+    checks = []
+
+    detected, scores = detect_source(df)
+    if detected != name and scores[detected] > scores.get(name, 0):
+        checks.append(Check(ERROR, f"le classeur ressemble à la source « {detected} »", None, None))
+    for column in config.REQUIRED_COLUMNS.get(name, []):
+        if column not in df.columns:
+            checks.append(Check(ERROR, "colonne absente", column, None))
+
+    for kind, column in config.KEY_COLUMNS.get(name, {}).values():
+        if column in df.columns:
+            level = WARNING if kind in config.OPTIONAL_KEY_KINDS else ERROR
+            checks.append(Check(level, "identifiant non renseigné", column, _blank(df[column])))
+
+    for column in config.SOURCE_DATE_COLUMNS.get(name, []):
+        if column in df.columns:
+            blank = _blank(df[column])
+            dates = df[column] if pd.api.types.is_datetime64_any_dtype(df[column]) else pd.to_datetime(df[column], dayfirst=True, errors="coerce")
+            checks.append(Check(ERROR, "date illisible", column, dates.isna() & ~blank))
+            checks.append(Check(WARNING, "date non renseignée", column, blank))
+
+    unique = [column for column in config.UNIQUE_COLUMNS.get(name, []) if column in df.columns]
+    if unique and len(unique) == len(config.UNIQUE_COLUMNS[name]):
+        incomplete = np.logical_or.reduce([_blank(df[column]) for column in unique])
+        checks.append(Check(ERROR, "doublon", " + ".join(unique), df.duplicated(unique, keep=False) & ~incomplete))
+
+    for column, (reference, blocking) in config.REFERENCE_COLUMNS.get(name, {}).items():
+        if column in df.columns:
+            unknown = ~df[column].isin(references[reference]) & ~_blank(df[column])
+            checks.append(Check(ERROR if blocking else WARNING, f"valeur absente du référentiel {reference}", column, unknown))
+
+    # Contrôles sans ligne en défaut écartés
+    return [check for check in checks if check.mask is None or check.mask.any()]
+
+
+def _row_numbers(mask, limit):
+    rows = np.flatnonzero(mask.to_numpy()) + FIRST_ROW
+    text = ", ".join(map(str, rows[:limit]))
+    return text + (f"… (+{len(rows) - limit})" if len(rows) > limit else "")
+
+
+def validate_upload(name, df, references=None, max_rows=None):
+    """
+    Rapport de validation du DataFrame `df` téléversé pour la source `name` :
+    `violations` (Niveau, Contrôle, Colonne, Lignes en défaut, Lignes), `rows` (lignes en défaut
+    du classeur, précédées de leur numéro et de leurs anomalies) et `blocking` (au moins une erreur).
+    """
+    max_rows = max_rows or config.VALIDATION_MAX_ROWS
+    checks = run_checks(name, df, references)
+    violations = pd.DataFrame(
+        [
+            {
+                "Niveau": check.level,
+                "Contrôle": check.rule,
+                "Colonne": check.column or "",
+                "Lignes en défaut": int(check.mask.sum()) if check.mask is not None else None,
+                "Lignes": _row_numbers(check.mask, max_rows) if check.mask is not None else "fichier entier",
+            }
+            for check in checks
+        ],
+        columns=["Niveau", "Contrôle", "Colonne", "Lignes en défaut", "Lignes"],
+    )
+    # Anomalies de chaque ligne, concaténées sur l'ensemble des contrôles
+    row_checks = [check for check in checks if check.mask is not None]
+    anomalies = pd.Series("", index=df.index)
+    for check in row_checks:
+        anomalies = anomalies.where(~check.mask.to_numpy(), anomalies + f"{check.rule} ({check.column}) ; ")
+    failed = anomalies.ne("")
+    rows = df[failed].copy()
+    rows.insert(0, "Anomalies", anomalies[failed].str.rstrip(" ;"))
+    rows.insert(0, "Ligne", np.flatnonzero(failed.to_numpy()) + FIRST_ROW)
+    return Report(violations, rows, any(check.level == ERROR for check in checks))
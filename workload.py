@@ -0,0 +1,176 @@
+"""
+Charge des arbitres : rencontres arbitrées par arbitre, par rôle, par
+compétition et par mois, comparées à l'objectif « Nombre  de matchs à arbitrer ».
+La vue est construite une fois à partir des désignations FFR et manuelles,
+puis tenue à jour à chaque désignation manuelle ajoutée ou supprimée, sans
+recalcul. Une rencontre présente dans les deux sources n'est comptée qu'une fois.
+Les arbitres sont identifiés par licence_id et les rencontres par
+rencontre_id (voir keys.py).
+Ce module n'importe pas Streamlit.
+"""
+import threading
+from collections import Counter
+
+import pandas as pd
+
+import config
+from keys import MISSING, get_registry
+
+# Colonne de l'objectif dans la source arbitres
+TARGET_COLUMN = "Nombre  de matchs à arbitrer"
+
+ENTRY_COLUMNS = ["licence_id", "rencontre_id", "FONCTION", "COMPETITION", "MOIS"]
+
+
+def _months(dates):
+    return pd.Series(dates).dt.strftime("%Y-%m").reset_index(drop=True)
+
+
+def build_entries(rencontres_ffr_df, designations_df):
+    """Une ligne par désignation FFR ou manuelle (colonnes ENTRY_COLUMNS), FFR en premier."""
+    parts = []
+    date_col = config.COLUMN_MAPPING['rencontres_date']
+    if not rencontres_ffr_df.empty and {"licence_id", "rencontre_id"}.issubset(rencontres_ffr_df.columns):
+        parts.append(pd.DataFrame({
+            "licence_id": rencontres_ffr_df["licence_id"].to_numpy(),
+            "rencontre_id": rencontres_ffr_df["rencontre_id"].to_numpy(),
+            "FONCTION": rencontres_ffr_df[config.COLUMN_MAPPING['ffr_fonction_arbitre']].to_numpy(),
+            "COMPETITION": rencontres_ffr_df[config.COLUMN_MAPPING['rencontres_competition']].to_numpy(),
+            "MOIS": _months(pd.to_datetime(rencontres_ffr_df[date_col], errors='coerce')).to_numpy(),
+        }))
+    if not designations_df.empty and {"licence_id", "rencontre_id"}.issubset(designations_df.columns):
+        parts.append(pd.DataFrame({
+            "licence_id": designations_df["licence_id"].to_numpy(),
+            "rencontre_id": designations_df["rencontre_id"].to_numpy(),
+            "FONCTION": designations_df["FONCTION ARBITRE"].to_numpy(),
+            "COMPETITION": designations_df["COMPETITION NOM"].to_numpy(),
+            "MOIS": _months(pd.to_datetime(designations_df["DATE"], dayfirst=True, errors='coerce')).to_numpy(),
+        }))
+    if not parts:
+        return pd.DataFrame(columns=ENTRY_COLUMNS)
+    entries = pd.concat(parts, ignore_index=True)
+    return entries[entries["licence_id"] != MISSING]
+
+
+class WorkloadView:
+    """
+    Compteurs par arbitre (total, rôle, compétition, mois), lus en O(1) par licence_id.
+    `add_manual` / `remove_manual` ne mettent à jour que les compteurs de la désignation concernée.
+    """
+
+    def __init__(self, entries):
+        self._lock = threading.Lock()
+        # (licence_id, rencontre_id) -> [fonction, compétition, mois, nombre de désignations]
+        self._matches = {}
+        # Désignations manuelles : (rencontre_id, nom, prénom, fonction) -> licence_id
+        self._manual = {}
+        self._total = Counter()
+        self._role = Counter()
+        self._competition = Counter()
+        self._month = Counter()
+        for licence_id, rencontre_id, fonction, competition, mois in entries[ENTRY_COLUMNS].itertuples(index=False, name=None):
+            self._add(licence_id, rencontre_id, fonction, competition, mois)
+
+    @classmethod
+    def from_sources(cls, rencontres_ffr_df, designations_df):
+        view = cls(build_entries(rencontres_ffr_df, designations_df))
+        if not designations_df.empty and {"licence_id", "rencontre_id"}.issubset(designations_df.columns):
+            for rencontre_id, nom, prenom, fonction, licence_id in designations_df[
+                ["rencontre_id", "NOM", "PRENOM", "FONCTION ARBITRE", "licence_id"]
+            ].itertuples(index=False, name=None):
+                view._manual.setdefault((rencontre_id, nom, prenom, fonction), licence_id)
+        return view
+
+    # --- Compteurs ---
+    def _add(self, licence_id, rencontre_id, fonction, competition, mois):
+        key = (licence_id, rencontre_id)
+        match = self._matches.get(key)
+        if match is not None:
+            match[3] += 1
+            return
+        self._matches[key] = [fonction, competition, mois, 1]
+        self._total[licence_id] += 1
+        self._role[(licence_id, fonction)] += 1
+        self._competition[(licence_id, competition)] += 1
+        self._month[(licence_id, mois)] += 1
+
+    def _remove(self, licence_id, rencontre_id):
+        key = (licence_id, rencontre_id)
+        match = self._matches.get(key)
+        if match is None:
+            return
+        match[3] -= 1
+        if match[3] > 0:
+            return
+        fonction, competition, mois, _ = self._matches.pop(key)
+        for counter, counter_key in ((self._total, licence_id), (self._role, (licence_id, fonction)),
+                                     (self._competition, (licence_id, competition)), (self._month, (licence_id, mois))):
+            counter[counter_key] -= 1
+            if counter[counter_key] <= 0:
+                del counter[counter_key]
+
+    # --- Mise à jour incrémentale ---
+    def add_manual(self, record):
+        """Ajoute une désignation manuelle (dict aux colonnes de la feuille)."""
+        registry = get_registry()
+        licence_id = int(registry.encode("licence", [record.get("NUMERO LICENCE")])[0])
+        rencontre_id = int(registry.encode("rencontre", [record.get("RENCONTRE NUMERO")])[0])
+        if licence_id == MISSING:
+            return
+        mois = _months(pd.to_datetime([record.get("DATE")], dayfirst=True, errors='coerce'))[0]
+        with self._lock:
+            self._manual.setdefault((rencontre_id, record.get("NOM"), record.get("PRENOM"), record.get("FONCTION ARBITRE")), licence_id)
+            self._add(licence_id, rencontre_id, record.get("FONCTION ARBITRE"), record.get("COMPETITION NOM"), mois)
+
+    def remove_manual(self, rencontre_numero, nom, prenom, fonction):
+        """Retire une désignation manuelle (mêmes critères que la suppression dans la feuille)."""
+        rencontre_id = get_registry().lookup("rencontre", rencontre_numero)
+        with self._lock:
+            licence_id = self._manual.pop((rencontre_id, nom, prenom, fonction), None)
+            if licence_id is not None:
+                self._remove(licence_id, rencontre_id)
+
+    # --- Lecture ---
+    def total(self, licence_id):
+        """Nombre de rencontres de l'arbitre."""
+        return self._total.get(licence_id, 0)
+
+    def totals(self, licence_ids):
+        """Nombre de rencontres pour une série de licence_id (0 si aucune)."""
+        return pd.Series(licence_ids).map(lambda licence_id: self._total.get(licence_id, 0)).to_numpy()
+
+    def _breakdown(self, counter, licence_id):
+        return pd.Series({key[1]: count for key, count in counter.items() if key[0] == licence_id}, dtype=int).sort_index()
+
+    def by_competition(self, licence_id):
+        return self._breakdown(self._competition, licence_id)
+
+    def by_month(self, licence_id):
+        return self._breakdown(self._month, licence_id)
+
+    def table(self, arbitres_df):
+        """
+        Une ligne par arbitre : rencontres au total et par rôle, objectif et taux de réalisation
+        (rencontres / objectif, vide sans objectif).
+        """
+        with self._lock:
+            roles = pd.Series(self._role, dtype=int)
+        table = arbitres_df[[
+            "licence_id",
+            config.COLUMN_MAPPING['arbitres_nom'],
+            config.COLUMN_MAPPING['arbitres_prenom'],
+            config.COLUMN_MAPPING['arbitres_categorie'],
+        ]].reset_index(drop=True)
+        table["Rencontres"] = self.totals(table["licence_id"])
+        if not roles.empty:
+            par_role = roles.unstack(fill_value=0)
+            for role in config.ALL_ROLES + sorted(col for col in par_role.columns if col not in config.ALL_ROLES):
+                values = par_role[role] if role in par_role.columns else pd.Series(dtype=int)
+                table[role] = table["licence_id"].map(values).fillna(0).astype(int)
+        else:
+            for role in config.ALL_ROLES:
+                table[role] = 0
+        objectif = pd.to_numeric(arbitres_df[TARGET_COLUMN], errors='coerce').reset_index(drop=True) if TARGET_COLUMN in arbitres_df.columns else pd.Series(float("nan"), index=table.index)
+        table["Objectif"] = objectif
+        table["Réalisation"] = (table["Rencontres"] / objectif.where(objectif > 0))
+        return table